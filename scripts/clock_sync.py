@@ -0,0 +1,166 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: clock_sync.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Clock synchronization of recorded sensor streams. LSL time stamps are in
+ * the clock of the computer pushing each stream; LabRecorder measures the
+ * offset to its own clock every few seconds and stores it in the xdf file
+ * (ClockOffset chunks). Per stream, a line (offset + drift * t) is fitted to
+ * those measurements, with outlier rejection, and an optional constant lag
+ * is refined by cross-correlating a signal shared by two streams (e.g. ur5e
+ * wrench Fy and fabric voltage, which both react to the contact). The
+ * corrections are applied to whole time stamp arrays at once.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import json
+import numpy as np
+from scipy.signal import correlate, correlation_lags
+from time_alignment import sorted_stream, resample
+
+
+class ClockCorrection:
+    '''
+    Correction of the time stamps of one stream: corrected = t + offset + drift * t + lag.
+    'offset' [s] and 'drift' [s/s] come from the clock offset measurements, 'lag' [s] from cross-correlation.
+    '''
+
+    def __init__(self, offset=0.0, drift=0.0, lag=0.0):
+        self.offset = offset
+        self.drift = drift
+        self.lag = lag
+
+    def __repr__(self):
+        return f"ClockCorrection(offset={self.offset:.6f}, drift={self.drift:.3e}, lag={self.lag:.6f})"
+
+    def apply(self, time_stamps):
+        ''' Corrected copy of a time stamp array (float64). '''
+        time_stamps = np.asarray(time_stamps, dtype=np.float64)
+        return time_stamps + (self.offset + self.lag) + self.drift * time_stamps
+
+    def to_dict(self):
+        return {'offset': self.offset, 'drift': self.drift, 'lag': self.lag}
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(values['offset'], values['drift'], values['lag'])
+
+
+def fit_clock_offsets(collection_times, offset_values, outlier_threshold=4.0):
+    '''
+    Least-squares line through the clock offset measurements of a stream, refitted once without the measurements
+    whose residual is more than 'outlier_threshold' robust standard deviations (MAD) off, e.g. network hiccups.
+    OUTPUT: ClockCorrection (no measurement: no correction; one measurement: constant offset).
+    '''
+    collection_times = np.asarray(collection_times, dtype=np.float64)
+    offset_values = np.asarray(offset_values, dtype=np.float64)
+
+    if len(collection_times) == 0:
+        return ClockCorrection()
+    if len(collection_times) == 1 or np.ptp(collection_times) == 0:
+        return ClockCorrection(float(np.median(offset_values)))
+
+    # fit around the mean time: LSL times are large, the drift is tiny.
+    mean_time = collection_times.mean()
+    drift, offset = np.polyfit(collection_times - mean_time, offset_values, 1)
+
+    residuals = offset_values - (offset + drift * (collection_times - mean_time))
+    deviation = 1.4826 * np.median(np.abs(residuals - np.median(residuals)))
+    inliers = np.abs(residuals) <= outlier_threshold * deviation
+    if deviation > 0 and 2 <= inliers.sum() < len(inliers):
+        drift, offset = np.polyfit(collection_times[inliers] - mean_time, offset_values[inliers], 1)
+
+    return ClockCorrection(float(offset - drift * mean_time), float(drift))
+
+
+def estimate_lag(time_a, values_a, time_b, values_b, max_lag=0.5, rate=None, derivative=True, absolute=True):
+    '''
+    Delay [s] of signal b with respect to signal a, i.e. b(t) ~ a(t - lag), from the peak of their cross-correlation.
+    INPUT:
+        - 'max_lag': lags searched, in [-max_lag, max_lag] seconds.
+        - 'rate': rate [Hz] both signals are resampled at on their overlap, by default the faster of the two (at most 1 kHz).
+        - 'derivative': correlate the rates of change, so steps/contact events dominate over slow trends.
+        - 'absolute': use the strongest correlation of either sign (signals reacting in opposite directions).
+    OUTPUT: (lag, score) with 'score' the normalized correlation at the peak (-1 to 1).
+    '''
+    time_a, values_a = sorted_stream(time_a, np.asarray(values_a, dtype=np.float64))
+    time_b, values_b = sorted_stream(time_b, np.asarray(values_b, dtype=np.float64))
+
+    if rate is None:
+        rate = min(max(1.0 / np.median(np.diff(time_a)), 1.0 / np.median(np.diff(time_b))), 1000.0)
+
+    start, stop = max(time_a[0], time_b[0]), min(time_a[-1], time_b[-1])
+    if (stop - start) * rate < 4:
+        raise ValueError("the signals do not overlap enough to estimate their lag")
+
+    timebase = start + np.arange(int((stop - start) * rate) + 1) / rate
+    signals = []
+    for time_stamps, values in ((time_a, values_a), (time_b, values_b)):
+        signal = resample(time_stamps, values, timebase, 'linear')
+        if derivative:
+            signal = np.gradient(signal)
+        signal = signal - np.nanmean(signal)
+        signal = np.nan_to_num(signal / (np.nanstd(signal) or 1.0))
+        signals.append(signal)
+
+    correlation = correlate(signals[1], signals[0], mode='full', method='fft') / len(timebase)
+    lags = correlation_lags(len(timebase), len(timebase), mode='full')
+
+    window = np.abs(lags) <= int(np.ceil(max_lag * rate))
+    correlation, lags = correlation[window], lags[window]
+    peak = int(np.argmax(np.abs(correlation) if absolute else correlation))
+
+    # sub-sample peak position from a parabola through the peak and its neighbours
+    shift = 0.0
+    if 0 < peak < len(correlation) - 1:
+        left, center, right = np.abs(correlation[peak - 1:peak + 2]) if absolute else correlation[peak - 1:peak + 2]
+        curvature = left - 2 * center + right
+        if curvature < 0:
+            shift = 0.5 * (left - right) / curvature
+
+    return float((lags[peak] + shift) / rate), float(correlation[peak])
+
+
+def save_clock_corrections(file_name, corrections):
+    ''' {stream_name: ClockCorrection} to a json file. '''
+    with open(file_name, 'w') as f:
+        json.dump({name: correction.to_dict() for name, correction in corrections.items()}, f, indent=2)
+
+
+def load_clock_corrections(file_name):
+    ''' {stream_name: ClockCorrection} saved by save_clock_corrections. '''
+    with open(file_name, 'r') as f:
+        return {name: ClockCorrection.from_dict(values) for name, values in json.load(f).items()}
+
+
+def clock_corrections_file(xdf_file):
+    ''' Clock corrections saved next to an xdf file: '<file>.clock.json'. '''
+    return xdf_file + '.clock.json'
+
+
+def xdf_clock_corrections(reader, stream_names=None, outlier_threshold=4.0):
+    ''' {stream_name: ClockCorrection} fitted to the clock offsets of the streams of an XdfStreamReader (default: all). '''
+    if reader.index is None:
+        reader.load_index()
+
+    return {name: fit_clock_offsets(*reader.stream_clock_offsets(name), outlier_threshold=outlier_threshold)
+            for name in (stream_names or reader.stream_names())}
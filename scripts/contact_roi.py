@@ -0,0 +1,158 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: contact_roi.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Tracking of the contact patch on gelsight_mini frames, used to restrict the
+ * expensive per-pixel work of slip_detection.py and marker_detection.py to a
+ * region of interest (ROI). Each frame is reduced with an image pyramid
+ * (cv2.pyrDown), compared to a no-contact reference frame, and the bounding
+ * box of the pixels that changed, plus a margin, is the ROI. Without contact,
+ * or when the contact covers most of the gel, the full frame is used.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import cv2
+import numpy as np
+
+
+def pyramid_down(gray, levels, buffers=None):
+    '''
+    'gray' reduced 'levels' times by cv2.pyrDown (each level halves both sides).
+    'buffers' (as returned by pyramid_buffers) are written in place; without them new images are allocated.
+    '''
+    for level in range(levels):
+        gray = cv2.pyrDown(gray, dst=None if buffers is None else buffers[level])
+
+    return gray
+
+
+def pyramid_buffers(shape, levels):
+    ''' One preallocated uint8 image per pyramid level below 'shape' (pyrDown output sizes). '''
+    buffers = []
+    height, width = shape
+    for _ in range(levels):
+        height, width = (height + 1) // 2, (width + 1) // 2
+        buffers.append(np.empty((height, width), dtype=np.uint8))
+
+    return buffers
+
+
+class ContactRoi:
+    '''
+    INPUT:
+        - 'pyramid_levels': the contact is searched on frames reduced 2**levels times per side.
+        - 'contact_threshold': gray level change, with respect to the reference frame, of a pixel in contact.
+        - 'min_contact_pixels': fewer changed (reduced) pixels than this is no contact.
+        - 'margin': pixels (full resolution) added around the contact bounding box.
+        - 'full_frame_fraction': when the ROI would cover more than this fraction of the frame, the full frame is used.
+        - 'reference_alpha': weight of each no-contact frame in the running-average reference (lighting drift).
+    update() returns the ROI as (x, y, width, height) in full-resolution pixels, or None for the full frame.
+    'mask' holds the reduced contact mask of the last frame.
+    '''
+
+    def __init__(self, pyramid_levels=2, contact_threshold=12, min_contact_pixels=8, margin=16,
+                 full_frame_fraction=0.5, reference_alpha=0.05):
+        self.pyramid_levels = pyramid_levels
+        self.contact_threshold = contact_threshold
+        self.min_contact_pixels = min_contact_pixels
+        self.margin = margin
+        self.full_frame_fraction = full_frame_fraction
+        self.reference_alpha = reference_alpha
+
+        self.roi = None
+        self.contact = False
+        self.mask = None
+        self._reference = None
+        self._shape = None
+
+    def set_reference(self, frame):
+        ''' Use 'frame' (taken without contact) as the reference; by default the first frame given to update(). '''
+        small = self._reduce(frame)
+        self._reference = small.astype(np.float32)
+
+    def update(self, frame):
+        ''' Locate the contact patch on a BGR/RGB (or gray) frame. OUTPUT: ROI (x, y, width, height) or None. '''
+        if self._reference is None:
+            self.set_reference(frame)
+            self.roi, self.contact = None, False
+            return None
+
+        small = self._reduce(frame)
+        np.copyto(self._reference_u8, self._reference, casting='unsafe')
+        cv2.absdiff(small, self._reference_u8, dst=self.mask)
+        cv2.threshold(self.mask, self.contact_threshold, 255, cv2.THRESH_BINARY, dst=self.mask)
+        cv2.medianBlur(self.mask, 3, dst=self._mask_buffer)  # drop isolated noisy pixels
+        self.mask, self._mask_buffer = self._mask_buffer, self.mask
+
+        self.contact = cv2.countNonZero(self.mask) >= self.min_contact_pixels
+        if not self.contact:
+            cv2.accumulateWeighted(small, self._reference, self.reference_alpha)
+            self.roi = None
+            return None
+
+        x, y, w, h = cv2.boundingRect(self.mask)
+        scale = 2 ** self.pyramid_levels
+        height, width = self._shape
+
+        left = max(x * scale - self.margin, 0)
+        top = max(y * scale - self.margin, 0)
+        right = min((x + w) * scale + self.margin, width)
+        bottom = min((y + h) * scale + self.margin, height)
+
+        if (right - left) * (bottom - top) > self.full_frame_fraction * width * height:
+            self.roi = None
+        else:
+            self.roi = (left, top, right - left, bottom - top)
+
+        return self.roi
+
+    def _reduce(self, frame):
+        self._allocate(frame.shape[:2])
+
+        gray = frame
+        if frame.ndim == 3:
+            gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY, dst=self._gray)
+
+        return pyramid_down(gray, self.pyramid_levels, self._pyramid)
+
+    def _allocate(self, shape):
+        if self._shape == shape:
+            return
+
+        self._shape = shape
+        self._gray = np.empty(shape, dtype=np.uint8)
+        self._pyramid = pyramid_buffers(shape, self.pyramid_levels)
+
+        small_shape = self._pyramid[-1].shape if self._pyramid else shape
+        self._reference_u8 = np.empty(small_shape, dtype=np.uint8)
+        self.mask = np.empty(small_shape, dtype=np.uint8)
+        self._mask_buffer = np.empty(small_shape, dtype=np.uint8)
+        self._reference = None
+
+
+def roi_slices(roi):
+    ''' (rows, columns) slices of an (x, y, width, height) ROI, full frame for None. '''
+    if roi is None:
+        return slice(None), slice(None)
+
+    x, y, w, h = roi
+    return slice(y, y + h), slice(x, x + w)
@@ -27,14 +27,299 @@
 #!/usr/bin/env python3
 
 import csv
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from os.path import splitext, dirname, abspath
+from npz_columns import mmap_npz, write_npz_from_files
+
+
+class CsvSink:
+    '''
+    Keeps a csv file open and buffers rows in memory, writing them out in chunks.
+
+    Rows are flushed to disk once `chunk_rows` rows are pending or `flush_interval`
+    seconds have passed since the last flush, whichever comes first. Use it as a
+    context manager so the remaining rows are written when the block exits:
+
+        with CsvSink(file_name, fieldnames) as sink:
+            sink.write_block(np.column_stack((time_stamps, values)))
+    '''
+
+    def __init__(self, file_name, fieldnames=None, mode='w', chunk_rows=4096, flush_interval=1.0):
+        self.file_name = file_name
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+
+        self._file = open(file_name, mode=mode, newline='')
+        self._writer = csv.writer(self._file)
+        self._rows = []
+        self._last_flush = time.monotonic()
+
+        if fieldnames is not None:
+            self._rows.append(list(fieldnames))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_row(self, data):
+        self._rows.append(data)
+        self._maybe_flush()
+
+    def write_rows(self, rows):
+        self._rows.extend(rows)
+        self._maybe_flush()
+
+    def write_block(self, array):
+        ''' Write a whole (N, M) block at once, e.g. time stamps stacked with samples. '''
+        block = np.asarray(array)
+        if block.ndim == 1:
+            block = block.reshape(-1, 1)
+
+        self._rows.extend(block.tolist())
+        self._maybe_flush()
+
+    def write_columns(self, columns):
+        ''' Write a block given as a list of 1D columns, keeping each column's type (ints stay ints). '''
+        self.write_rows(zip(*[np.asarray(column).tolist() for column in columns]))
+
+    def flush(self):
+        if self._rows:
+            self._writer.writerows(self._rows)
+            self._rows = []
+
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._file.closed:
+            return
+
+        self.flush()
+        self._file.close()
+
+    def _maybe_flush(self):
+        if len(self._rows) >= self.chunk_rows or \
+           time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
 
 def setup_csv(file_name, fieldnames):
-    """ Preparing csv data file in order to write data on it."""
-    with open(file_name, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(fieldnames)
+    ''' Preparing csv data file in order to write data on it.'''
+    with CsvSink(file_name, fieldnames, mode='w'):
+        pass
 
 def save_to_csv(file_name, data):
-    with open(file_name, mode='a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(data)
\ No newline at end of file
+    ''' Append a single row; prefer a `CsvSink` when writing many rows. '''
+    with CsvSink(file_name, mode='a') as sink:
+        sink.write_row(data)
+
+
+def save_columns(file_name, fieldnames, columns):
+    '''
+    Save typed columns (e.g. float64 time stamps next to float32/int samples) in the format given by
+    the file extension: '.csv', '.npz', '.feather'/'.arrow' or '.parquet'.
+    The binary formats keep each column's dtype, so loading them skips the text parse entirely.
+    '''
+    columns = [np.asarray(column) for column in columns]
+    extension = splitext(file_name)[1].lower()
+
+    if extension == '.csv':
+        with CsvSink(file_name, fieldnames) as sink:
+            sink.write_columns(columns)
+
+    elif extension == '.npz':
+        # stored uncompressed so load_columns can memory-map the members.
+        np.savez(file_name, **dict(zip(fieldnames, columns)))
+
+    elif extension in ('.feather', '.arrow'):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        table = pa.table(dict(zip(fieldnames, columns)))
+        feather.write_feather(table, file_name, compression='uncompressed')
+
+    elif extension == '.parquet':
+        pd.DataFrame(dict(zip(fieldnames, columns))).to_parquet(file_name)
+
+    else:
+        raise ValueError(f"unsupported file format '{extension}' for {file_name}")
+
+
+def load_columns(file_name, mmap=True):
+    '''
+    Load a file written by save_columns (or any plain csv) into a DataFrame, detecting the format by extension.
+    With mmap=True, '.npz' and '.feather'/'.arrow' files are memory-mapped instead of read into RAM.
+    '''
+    extension = splitext(file_name)[1].lower()
+
+    if extension == '.npz':
+        if mmap:
+            columns = mmap_npz(file_name)
+        else:
+            with np.load(file_name) as npz:
+                columns = {name: npz[name] for name in npz.files}
+        return pd.DataFrame(columns, copy=False)
+
+    if extension in ('.feather', '.arrow'):
+        import pyarrow.feather as feather
+        return feather.read_table(file_name, memory_map=mmap).to_pandas()
+
+    if extension == '.parquet':
+        return pd.read_parquet(file_name)
+
+    return pd.read_csv(file_name)
+
+
+class ColumnSink:
+    '''
+    Writes column blocks to a binary file ('.npz', '.feather'/'.arrow' or '.parquet') in chunks of `chunk_rows` rows,
+    so memory stays bounded by one chunk whatever the number of blocks. Each column keeps the dtype of its first block.
+
+    Parquet gets one row group and Feather/Arrow one record batch per chunk. An npz archive cannot be appended to,
+    so each column is spilled to a temporary file next to the output and the (uncompressed, memory-mappable)
+    archive is assembled from those files on close.
+    '''
+
+    def __init__(self, file_name, fieldnames, chunk_rows=65536):
+        self.file_name = file_name
+        self.fieldnames = list(fieldnames)
+        self.chunk_rows = chunk_rows
+        self.extension = splitext(file_name)[1].lower()
+
+        if self.extension not in ('.npz', '.feather', '.arrow', '.parquet'):
+            raise ValueError(f"unsupported file format '{self.extension}' for {file_name}")
+
+        self._blocks = [[] for _ in self.fieldnames]
+        self._pending_rows = 0
+        self._writer = None     # pyarrow writer of the feather/arrow/parquet formats
+        self._schema = None
+        self._spills = None     # [(temporary file, dtype)] per column of the npz format
+        self._rows = 0
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_columns(self, columns):
+        columns = [np.asarray(column) for column in columns]
+        for blocks, column in zip(self._blocks, columns):
+            blocks.append(column)
+
+        self._pending_rows += len(columns[0]) if columns else 0
+        if self._pending_rows >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if self._pending_rows == 0:
+            return
+
+        columns = [np.concatenate(blocks) for blocks in self._blocks]
+        self._blocks = [[] for _ in self.fieldnames]
+        self._pending_rows = 0
+
+        if self.extension == '.npz':
+            self._spill_chunk(columns)
+        else:
+            self._write_table_chunk(columns)
+        self._rows += len(columns[0])
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+
+        try:
+            self.flush()
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+
+        if self._spills is not None:
+            self._assemble_npz()
+        elif self._writer is None:
+            # nothing was written: an empty file with the columns.
+            save_columns(self.file_name, self.fieldnames, [np.empty(0) for _ in self.fieldnames])
+
+    def _write_table_chunk(self, columns):
+        import pyarrow as pa
+
+        table = pa.table(dict(zip(self.fieldnames, columns)))
+        if self._writer is None:
+            self._schema = table.schema
+            if self.extension == '.parquet':
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.file_name, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self.file_name, self._schema)
+
+        self._writer.write_table(table.cast(self._schema))
+
+    def _spill_chunk(self, columns):
+        if self._spills is None:
+            directory = dirname(abspath(self.file_name))
+            self._spills = [(tempfile.TemporaryFile(dir=directory), column.dtype) for column in columns]
+
+        for (spill, dtype), column in zip(self._spills, columns):
+            spill.write(np.ascontiguousarray(column, dtype=dtype).tobytes())
+
+    def _assemble_npz(self):
+        try:
+            write_npz_from_files(self.file_name, [(name, spill, dtype) for name, (spill, dtype)
+                                                  in zip(self.fieldnames, self._spills)], self._rows)
+        finally:
+            for spill, _ in self._spills:
+                spill.close()
+            self._spills = None
+
+
+def open_column_sink(file_name, fieldnames):
+    ''' Sink accepting `write_columns(columns)` blocks, streaming them to disk: a CsvSink for csv, a ColumnSink otherwise. '''
+    if splitext(file_name)[1].lower() == '.csv':
+        return CsvSink(file_name, fieldnames)
+
+    return ColumnSink(file_name, fieldnames)
+
+
+def benchmark_csv_writers(file_name, num_rows=20000, num_cols=19):
+    ''' Compare rows/sec of per-row `save_to_csv` against `CsvSink` (row by row and as one block). '''
+    fieldnames = ['col_' + str(i) for i in range(num_cols)]
+    data = np.random.rand(num_rows, num_cols)
+    rows = data.tolist()
+    results = {}
+
+    start = time.perf_counter()
+    setup_csv(file_name, fieldnames)
+    for row in rows:
+        save_to_csv(file_name, row)
+    results['save_to_csv'] = num_rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with CsvSink(file_name, fieldnames) as sink:
+        for row in rows:
+            sink.write_row(row)
+    results['CsvSink.write_row'] = num_rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with CsvSink(file_name, fieldnames) as sink:
+        sink.write_block(data)
+    results['CsvSink.write_block'] = num_rows / (time.perf_counter() - start)
+
+    return results
+
+
+if __name__ == '__main__':
+
+    from os.path import join
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = benchmark_csv_writers(join(tmp_dir, 'benchmark.csv'))
+
+    for name, rows_per_sec in results.items():
+        print(f"{name:>22}: {rows_per_sec:12.0f} rows/sec")
@@ -0,0 +1,82 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: frame_export.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Parallel dumping of gelsight_mini frames into image files (.jpg/.png).
+ * Encoding every frame is independent, so frames are handed to a pool of
+ * threads (cv2.imwrite releases the GIL) or processes, while the number of
+ * frames waiting to be written is kept bounded.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import cv2
+import numpy as np
+from os import cpu_count, makedirs
+from os.path import join
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+def export_frames(frames, dir, name_format='{}.jpg', first_index=0, workers=None, use_processes=False,
+                  max_in_flight=None, progress=None, total=None):
+    '''
+    Write every frame of 'frames' (any iterable of HxWx3 uint8 arrays) as dir/name_format.format(index).
+    INPUT:
+        - 'first_index': index of the first frame, so consecutive blocks of one stream keep numbering in order.
+        - 'workers': pool size (default: number of cpus); 'use_processes' swaps the thread pool for a process pool.
+        - 'max_in_flight': at most this many frames are queued/being encoded at once (default: 4 * workers),
+          which bounds the memory held by the pool when 'frames' is a lazy generator.
+        - 'progress': optional callback progress(num_written, total), called in frame order.
+    OUTPUT: the index following the last frame written.
+    '''
+    workers = workers or cpu_count() or 1
+    max_in_flight = max_in_flight or 4 * workers
+    makedirs(dir, exist_ok=True)
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    in_flight = deque()
+    index = first_index
+    num_written = 0
+
+    with executor_class(max_workers=workers) as executor:
+        for frame in frames:
+            if len(in_flight) >= max_in_flight:
+                in_flight.popleft().result()
+                num_written = num_written + 1
+                if progress is not None:
+                    progress(num_written, total)
+
+            in_flight.append(executor.submit(_write_frame, join(dir, name_format.format(index)), frame))
+            index = index + 1
+
+        while in_flight:
+            in_flight.popleft().result()
+            num_written = num_written + 1
+            if progress is not None:
+                progress(num_written, total)
+
+    return index
+
+
+def _write_frame(path, frame):
+    if not cv2.imwrite(path, np.asarray(frame, dtype=np.uint8)):
+        raise IOError(f"could not write image {path}")
@@ -0,0 +1,159 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: frame_index.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Per-frame index of a gelsight_mini recording: for every frame number its
+ * capture time stamp, where the frame is stored in its source (byte offset
+ * and size in an xdf file, row of an hdf5 dataset, number of an exported
+ * image) and how many frames were dropped just before it.
+ * The index is one structured numpy array, so frame lookups are O(1), time
+ * lookups are a binary search and ranges are slices. It is saved next to the
+ * frames ('<source>.frames.npz') so a session can be seeked into without
+ * re-reading the recording or a csv of time stamps.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import numpy as np
+from os import stat
+from os.path import exists, isfile
+
+
+# One record per frame, the frame number is the position in the index.
+#   time:    capture time stamp [s]
+#   offset:  where the frame is in its source (xdf: byte offset of the sample values; hdf5: row; image folder: image number)
+#   size:    bytes of the stored frame (xdf), 0 otherwise
+#   dropped: number of frames estimated to be missing just before this one (0 = none)
+FRAME_INDEX_DTYPE = np.dtype([('time', '<f8'), ('offset', '<i8'), ('size', '<i8'), ('dropped', '<i4')])
+
+
+class FrameIndex:
+    '''
+    INPUT: 'records' is a structured array of FRAME_INDEX_DTYPE, one record per frame, in frame order.
+    index[i] is the record of frame i, index[a:b] a FrameIndex of frames [a, b) (a view, 'first_frame' keeps the numbering).
+    '''
+
+    def __init__(self, records, first_frame=0):
+        self.records = records
+        self.first_frame = first_frame
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self.records))
+            if step != 1:
+                raise ValueError("frame index slices must be contiguous")
+            return FrameIndex(self.records[start:stop], self.first_frame + start)
+
+        return self.records[key]
+
+    @property
+    def time_stamps(self):
+        return self.records['time']
+
+    @property
+    def dropped(self):
+        ''' True for every frame with missing frames just before it. '''
+        return self.records['dropped'] > 0
+
+    def frame_at(self, time_stamp):
+        ''' Number of the last frame captured at or before 'time_stamp' (binary search, -1 if before the first frame). '''
+        return self.first_frame + int(np.searchsorted(self.records['time'], time_stamp, side='right')) - 1
+
+    def frames_between(self, start_time, stop_time):
+        ''' FrameIndex of the frames captured in [start_time, stop_time). '''
+        start, stop = np.searchsorted(self.records['time'], [start_time, stop_time])
+        return self[start:stop]
+
+    def intervals(self):
+        ''' Time [s] since the previous frame for every frame (NaN for the first one). '''
+        intervals = np.full(len(self.records), np.nan)
+        intervals[1:] = np.diff(self.records['time'])
+        return intervals
+
+    def save(self, file_name, source_file=None):
+        ''' Save as an uncompressed .npz; with 'source_file' its size and mtime are stored to detect a stale index. '''
+        source_stat = stat(source_file) if source_file is not None else None
+        np.savez(file_name, records=self.records, first_frame=self.first_frame,
+                 source_size=-1 if source_stat is None else source_stat.st_size,
+                 source_mtime=-1.0 if source_stat is None else source_stat.st_mtime)
+
+    @classmethod
+    def load(cls, file_name, source_file=None):
+        ''' The saved index, or None when it does not exist or no longer matches 'source_file'. '''
+        if not exists(file_name):
+            return None
+
+        with np.load(file_name) as saved:
+            if source_file is not None:
+                source_stat = stat(source_file)
+                if saved['source_size'] != source_stat.st_size or saved['source_mtime'] != source_stat.st_mtime:
+                    return None
+
+            return cls(saved['records'], int(saved['first_frame']))
+
+    @classmethod
+    def from_time_stamps(cls, time_stamps, offsets=None, sizes=None, nominal_srate=0):
+        '''
+        Index of frames with the given time stamps ('offsets' default to the frame numbers).
+        Dropped frames are estimated from gaps longer than 1.5 frame periods; the period is 1 / 'nominal_srate',
+        or the median interval when the rate is not known.
+        '''
+        time_stamps = np.asarray(time_stamps, dtype=np.float64)
+
+        records = np.zeros(len(time_stamps), dtype=FRAME_INDEX_DTYPE)
+        records['time'] = time_stamps
+        records['offset'] = np.arange(len(time_stamps)) if offsets is None else offsets
+        records['size'] = 0 if sizes is None else sizes
+
+        if len(time_stamps) > 1:
+            intervals = np.diff(time_stamps)
+            period = 1.0 / nominal_srate if nominal_srate > 0 else np.median(intervals)
+            if period > 0:
+                missing = np.rint(intervals / period).astype(np.int64) - 1
+                records['dropped'][1:] = np.where(intervals > 1.5 * period, np.maximum(missing, 1), 0)
+
+        return cls(records)
+
+
+def frame_index_file(source_path):
+    ''' Where the index of a recording (file or image folder) is saved. '''
+    return source_path.rstrip('/') + '.frames.npz'
+
+
+def load_frame_index(source_path, build, save=True):
+    '''
+    The saved index of 'source_path' if it is up to date, otherwise build() (a FrameIndex) and save it.
+    Image folders are not checked for staleness.
+    '''
+    source_file = source_path if isfile(source_path) else None
+    index_file = frame_index_file(source_path)
+
+    index = FrameIndex.load(index_file, source_file)
+    if index is None:
+        index = build()
+        if save:
+            index.save(index_file, source_file)
+
+    return index
+
@@ -0,0 +1,260 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: frame_sources.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Uniform access to recorded gelsight_mini frames, wherever they are stored:
+ * the GelSightMini stream of an xdf file, the 'images' dataset written by
+ * gelsight_mini_interface.save_img_in_hdf5, or a directory of exported
+ * images. Every source has 'index' (frame_index.py), 'time_stamps', len() and
+ * read(first, last), which yields (frame_index, frame) with raw uint8 frames,
+ * so consumers such as velocity_estimation.py work on the original pixels
+ * without writing and re-decoding intermediate jpeg files.
+ * Sources hold file names and the frame index, never open files, so they can
+ * be handed to worker processes.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import cv2
+import base64
+import numpy as np
+from os.path import isdir, join
+from frame_index import FrameIndex, frame_index_file, load_frame_index
+from xdf_stream_reader import XdfStreamReader
+
+
+# Frame shape used when the GelSightMini stream header carries no frame geometry.
+DEFAULT_FRAME_SHAPE = (240, 320, 3)  # (img_height, img_width, rgb_channels)
+
+
+def xdf_frame_shape(stream_info):
+    '''
+    (height, width, channels) of the GelSightMini frames, read from the <desc> of the stream header
+    (as written by lsl_gelsight.py); falls back to DEFAULT_FRAME_SHAPE for recordings without it.
+    INPUT: 'stream_info' is the pyxdf stream["info"] dict (or None).
+    '''
+    if not stream_info:
+        return DEFAULT_FRAME_SHAPE
+
+    desc = stream_info.get('desc', [None])[0]
+    if isinstance(desc, dict) and all(key in desc for key in ('height', 'width', 'channels')):
+        return tuple(int(desc[key][0]) for key in ('height', 'width', 'channels'))
+
+    return DEFAULT_FRAME_SHAPE
+
+
+def xdf_frame_encoding(stream_info):
+    ''' Frame encoding of the GelSightMini stream ('raw', 'jpeg' or 'png', see lsl_gelsight.py); 'raw' for older recordings. '''
+    if not stream_info:
+        return 'raw'
+
+    desc = stream_info.get('desc', [None])[0]
+    if isinstance(desc, dict) and 'encoding' in desc:
+        return desc['encoding'][0]
+
+    return 'raw'
+
+
+def decode_xdf_frames(time_series, frame_shape):
+    ''' Decode base64 jpeg/png frames (one string channel per sample) into one (N, H, W, C) uint8 array. '''
+    frames = np.empty((len(time_series),) + tuple(frame_shape), dtype=np.uint8)
+
+    for i, sample in enumerate(time_series):
+        buffer = np.frombuffer(base64.b64decode(sample[0]), dtype=np.uint8)
+        frames[i] = cv2.imdecode(buffer, cv2.IMREAD_UNCHANGED).reshape(frame_shape)
+
+    return frames
+
+
+class XdfFrameSource:
+    '''
+    Frames of an image stream of an xdf file (raw, jpeg or png encoded, see lsl_gelsight.py).
+    Every frame is read with a single seek through the frame index (see frame_index.py), built with one pass over the
+    stream on first use and saved next to the file, as is the chunk index of the file (unless 'save_index' is False).
+    'clock_correction' (a clock_sync.ClockCorrection of the stream, e.g. from '<xdf>.clock.json') is applied to
+    'time_stamps'; the saved frame index keeps the recorded time stamps.
+    '''
+
+    def __init__(self, xdf_file, stream_name='GelSightMini', save_index=True, clock_correction=None):
+        self.xdf_file = xdf_file
+        self.stream_name = stream_name
+        self.save_index = save_index
+        self.clock_correction = clock_correction
+        self._index = None
+        self._time_stamps = None
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = load_frame_index(self.xdf_file, self._build_index, self.save_index)
+
+        return self._index
+
+    @property
+    def time_stamps(self):
+        if self._time_stamps is None:
+            self._time_stamps = self.index.time_stamps if self.clock_correction is None \
+                else self.clock_correction.apply(self.index.time_stamps)
+
+        return self._time_stamps
+
+    def read(self, first=0, last=None):
+        ''' Yields (frame_index, frame) for frames [first, last). '''
+        records = self.index.records
+        last = len(records) if last is None else min(last, len(records))
+
+        reader = self._reader()
+        stream_info = reader.stream_info(self.stream_name)
+        frame_shape = xdf_frame_shape(stream_info)
+        encoded = xdf_frame_encoding(stream_info) != 'raw'
+
+        samples = reader.read_samples(self.stream_name, records['offset'][first:last], records['size'][first:last])
+        for i, values in enumerate(samples, first):
+            if encoded:
+                yield i, decode_xdf_frames([values], frame_shape)[0]
+            else:
+                yield i, values.view(np.uint8).reshape(frame_shape)
+
+    def _reader(self):
+        reader = XdfStreamReader(self.xdf_file)
+        reader.load_index(self.save_index)
+        return reader
+
+    def _build_index(self):
+        reader = self._reader()
+        blocks = [(time_stamps, offsets, sizes) for _, time_stamps, offsets, sizes
+                  in reader.iter_sample_offsets([self.stream_name])]
+        if not blocks:
+            return FrameIndex.from_time_stamps(np.zeros(0))
+
+        time_stamps, offsets, sizes = (np.concatenate(columns) for columns in zip(*blocks))
+        nominal_srate = float(reader.stream_info(self.stream_name)['nominal_srate'][0])
+
+        return FrameIndex.from_time_stamps(time_stamps, offsets, sizes, nominal_srate)
+
+
+class Hdf5FrameSource:
+    '''
+    Frames of an hdf5 recording of gelsight_mini_interface.save_img_in_hdf5.
+    INPUT:
+        - 'block_size': frames read from the file at a time.
+        - 'time_stamps': overrides the 'timestamps' dataset (needed for recordings made without one); the frame index
+          is then not saved.
+    '''
+
+    def __init__(self, file_name, block_size=64, time_stamps=None):
+        self.file_name = file_name
+        self.block_size = block_size
+        self._index = None if time_stamps is None else FrameIndex.from_time_stamps(time_stamps)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = load_frame_index(self.file_name, self._build_index)
+
+        return self._index
+
+    @property
+    def time_stamps(self):
+        return self.index.time_stamps
+
+    def read(self, first=0, last=None):
+        ''' Yields (frame_index, frame) for frames [first, last), reading 'block_size' frames at a time. '''
+        import h5py
+        with h5py.File(self.file_name, 'r') as f:
+            images = f['images']
+            last = len(images) if last is None else min(last, len(images))
+
+            for start in range(first, last, self.block_size):
+                block = images[start:min(start + self.block_size, last)].astype(np.uint8, copy=False)
+                for k, frame in enumerate(block):
+                    yield start + k, frame
+
+    def _build_index(self):
+        import h5py
+        with h5py.File(self.file_name, 'r') as f:
+            if 'timestamps' not in f:
+                raise KeyError(f"{self.file_name} has no 'timestamps' dataset, pass time_stamps explicitly")
+
+            return FrameIndex.from_time_stamps(f['timestamps'][:])
+
+
+class ImageDirFrameSource:
+    '''
+    Frames exported as one image file per frame, 'img_dir/name_format.format(image_number)'
+    (e.g. by xdf_post_processing.save_xdf_images).
+    INPUT: 'time_stamps' and 'image_numbers' (default: 0, 1, ...) of the frames, e.g. the 'time' and 'index' columns
+    of the csv of xdf_post_processing.py; when not given, the frame index saved next to the folder is used.
+    '''
+
+    def __init__(self, img_dir, time_stamps=None, image_numbers=None, name_format='{}.jpg'):
+        self.img_dir = img_dir
+        self.name_format = name_format
+
+        if time_stamps is not None:
+            self.index = FrameIndex.from_time_stamps(time_stamps, image_numbers)
+        else:
+            self.index = FrameIndex.load(frame_index_file(img_dir))
+            if self.index is None:
+                raise FileNotFoundError(f"no frame index {frame_index_file(img_dir)}, pass the time stamps explicitly")
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def time_stamps(self):
+        return self.index.time_stamps
+
+    def read(self, first=0, last=None):
+        ''' Yields (frame_index, frame) for frames [first, last). '''
+        image_numbers = self.index.records['offset']
+        last = len(image_numbers) if last is None else min(last, len(image_numbers))
+
+        for i in range(first, last):
+            path = join(self.img_dir, self.name_format.format(image_numbers[i]))
+            frame = cv2.imread(path)
+            if frame is None:
+                raise FileNotFoundError(f"Image not found at {path}")
+
+            yield i, frame
+
+
+def open_frame_source(path, time_stamps=None, image_numbers=None, stream_name='GelSightMini', clock_correction=None):
+    '''
+    Frame source matching 'path': an .xdf/.xdfz file, an .h5/.hdf5 file or a directory of .jpg frames
+    (see ImageDirFrameSource for 'time_stamps' and 'image_numbers', XdfFrameSource for 'clock_correction').
+    '''
+    if path.endswith(('.xdf', '.xdfz', '.xdf.gz')):
+        return XdfFrameSource(path, stream_name, clock_correction=clock_correction)
+
+    if path.endswith(('.h5', '.hdf5')):
+        return Hdf5FrameSource(path, time_stamps=time_stamps)
+
+    if isdir(path):
+        return ImageDirFrameSource(path, time_stamps, image_numbers)
+
+    raise ValueError(f"unsupported frame source {path}")
@@ -0,0 +1,177 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: gelsight_camera.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Asynchronous reader of the gelsight_mini camera. The device is connected on
+ * first use (never at import), and a background thread keeps grabbing frames
+ * into a small ring buffer of the latest frames with their capture time
+ * stamps. Display, recording and cv code share one device: latest() never
+ * blocks, wait_next() waits for a frame newer than the last one seen, and
+ * stats() reports the measured frame rate and grab latency.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import threading
+import time
+from ring_buffer import RingBuffer
+from latency_histogram import LatencyHistogram
+
+
+class AsyncGelsightCamera:
+    '''
+    Usage:
+        with AsyncGelsightCamera() as camera:
+            frame, time_stamp, frame_number = camera.wait_next(timeout=1.0)
+    INPUT:
+        - 'device': any object with connect() and get_image() (e.g. replay_camera.ReplayCamera);
+          by default gsdevice.Camera('device_name'), created when the camera is first used.
+        - 'history': number of latest frames kept (see history()).
+        - 'clock': capture time stamp source (monotonic), e.g. pylsl.local_clock for LSL time stamps.
+    Frame numbers count every frame grabbed since connect(), starting at 0.
+    '''
+
+    def __init__(self, device=None, device_name="GelSight Mini", history=8, clock=time.monotonic):
+        self.device = device
+        self.device_name = device_name
+        self.history_size = history
+        self.clock = clock
+
+        self.grab_latency = LatencyHistogram()
+        self._ring = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._connect_lock = threading.Lock()
+        self._start_time = None
+        self._last_seen = -1  # frame number returned by the last get_image()
+        self.error = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def connected(self):
+        return self._thread is not None
+
+    @property
+    def num_frames(self):
+        return 0 if self._ring is None else self._ring.num_put
+
+    def connect(self):
+        ''' Connect the device and start the grab thread (no-op when already connected). '''
+        with self._connect_lock:
+            if self._thread is not None:
+                return
+
+            if self.device is None:
+                from gelsight import gsdevice
+                self.device = gsdevice.Camera(self.device_name)
+            self.device.connect()
+
+            frame = self.device.get_image()
+            self.error = None
+            self._last_seen = -1
+            self._ring = RingBuffer(self.history_size, frame.shape, frame.dtype)
+            self._ring.put(frame, self.clock())
+            self._start_time = time.monotonic()
+
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._grab_loop, daemon=True)
+            self._thread.start()
+
+    def close(self):
+        ''' Stop the grab thread; the device is reconnected by the next call needing a frame. '''
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+        self._thread.join(timeout=2.0)
+        self._thread = None
+
+        if hasattr(self.device, 'disconnect'):
+            self.device.disconnect()
+
+    def latest(self, out=None):
+        ''' The most recent frame, without waiting. OUTPUT: (frame, time_stamp, frame_number). '''
+        self.connect()
+        frame_number = self._ring.num_put - 1
+        frame, time_stamp = self._ring.latest(out)
+        return frame, time_stamp, frame_number
+
+    def wait_next(self, timeout=None, after=None, out=None):
+        '''
+        Wait up to 'timeout' seconds for a frame newer than frame number 'after' (default: the latest frame now).
+        OUTPUT: (frame, time_stamp, frame_number), or (None, None, None) on timeout.
+        '''
+        self.connect()
+        if after is None:
+            after = self._ring.num_put - 1
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # wait in short slices so a failing device surfaces here instead of blocking forever.
+        while not self._ring.wait_for_put(after + 1, 0.1 if deadline is None else
+                                          min(0.1, max(deadline - time.monotonic(), 0))):
+            if self.error is not None:
+                raise RuntimeError("camera grab thread stopped") from self.error
+            if deadline is not None and time.monotonic() >= deadline:
+                return None, None, None
+
+        return self.latest(out)
+
+    def get_image(self):
+        '''
+        Drop-in for gsdevice.Camera.get_image(): the next frame not returned yet by get_image (a copy), so a
+        consumer loop never processes the same frame twice.
+        '''
+        frame, _, self._last_seen = self.wait_next(after=self._last_seen)
+        return frame
+
+    def history(self, count=None):
+        ''' Copies of the last 'count' (default: all kept) frames, oldest first. OUTPUT: (frames, time_stamps). '''
+        self.connect()
+        return self._ring.recent(self.history_size if count is None else count)
+
+    def stats(self):
+        ''' Frames grabbed, measured fps since connect(), and grab latency percentiles [ms] of the device reads. '''
+        elapsed = 0.0 if self._start_time is None else time.monotonic() - self._start_time
+        stats = {'frames': self.num_frames, 'fps': (self.num_frames - 1) / elapsed if elapsed > 0 else 0.0}
+        stats.update({'grab_' + key: value for key, value in self.grab_latency.summary().items()})
+
+        _, time_stamp, _ = self.latest() if self.connected else (None, None, None)
+        stats['age_ms'] = None if time_stamp is None else 1e3 * (self.clock() - time_stamp)
+
+        return stats
+
+    def _grab_loop(self):
+        try:
+            while not self._stop_event.is_set():
+                start = time.perf_counter()
+                frame = self.device.get_image()
+                time_stamp = self.clock()
+                self.grab_latency.add(time.perf_counter() - start)
+
+                self._ring.put(frame, time_stamp)
+        except Exception as error:  # surfaced to consumers by wait_next
+            self.error = error
@@ -34,7 +34,7 @@
 
 import cv2
 import sys
-from os import makedirs
+import argparse
 from os.path import join, abspath, dirname
 import h5py
 import yaml
@@ -42,7 +42,13 @@ import numpy as np
 import time
 import select
 from pynput import keyboard
-from gelsight import gsdevice 
+from frame_export import export_frames
+from gelsight_camera import AsyncGelsightCamera
+from replay_camera import add_replay_arguments, replay_camera_from_args
+from hdf5_recorder import Hdf5FrameRecorder
+from contact_roi import ContactRoi
+from marker_detection import MarkerDetector, LIVE_SENSOR_PARAMS, centroids_of
+from marker_tracking import MarkerTracker
 
 
 gelsight_mini_interface_dir = dirname(abspath(__file__))  # WHATEVER/digit_FT_sensors/scripts
@@ -54,26 +60,26 @@ with open(dir_to_config, 'r') as file:
 
 
 class GelsightMiniClass:
-    # Class attribute (shared by all instances of the class)
-    sensor = gsdevice.Camera("GelSight Mini")
-    sensor.connect()
 
-    def __init__(self, hdf5_file_name):
+    def __init__(self, hdf5_file_name, use_roi=False, sensor=None):
         # Instance attribute (unique to each instance of the class)
         self.hdf5_file_name = hdf5_file_name
+        # connected on first use (see gelsight_camera.py); pass one camera to share the device between objects.
+        self.sensor = sensor if sensor is not None else AsyncGelsightCamera()
+        self.marker_detector = MarkerDetector(**LIVE_SENSOR_PARAMS)
+        self.contact_roi = ContactRoi() if use_roi else None  # markers only detected around the contact patch
 
 
-    def save_png_image(cls, dir, image_name):
+    def save_png_image(self, dir, image_name):
         ''' Read the gelsight camera and capture the image. '''
-        cls.sensor.get_image()
-        cls.sensor.save_image(dir + image_name)
+        cv2.imwrite(dir + image_name, self.sensor.get_image())
         
     
-    def show_image(cls):
+    def show_image(self):
 
-        while cls.sensor.while_condition:
+        while True:
 
-            f1 = cls.sensor.get_image()
+            f1 = self.sensor.get_image()
             bigframe = cv2.resize(f1, (f1.shape[0]*2, f1.shape[1]*2))
             cv2.imshow('Image', bigframe)
 
@@ -91,95 +97,100 @@ class GelsightMiniClass:
 
 
 
-    def save_img_in_hdf5(self):
-        ''' INPUT: is an instance attribute to defining name of hdf5 file to save images. '''
+    def save_img_in_hdf5(self, compression_level=5, chunk_frames=16, buffer_size=64):
+        ''' 
+        INPUT: is an instance attribute to defining name of hdf5 file to save images.
+        Frames are streamed to disk by a background writer (see hdf5_recorder.py) together with a 'timestamps'
+        dataset holding their capture time stamps (clock of the AsyncGelsightCamera), so memory use stays constant
+        whatever the recording length.
+        'compression_level' (gzip, None to disable) and 'chunk_frames' trade capture-time CPU for disk space.
+        '''
 
         print("Start recording images from gelsight-mini (press q to stop)...")
 
-        imgs = []
-        resp_time = []
-
         listener = keyboard.Listener(on_press=self.on_press)
         listener.start()
 
-        start_time = time.time()
+        img, time_stamp, frame_number = self.sensor.latest()
+        file_name = config["gelsight_mini_interface"]["img_data_dir"] + self.hdf5_file_name
 
-        while listener.running:
-            img = self.sensor.get_image()
-            imgs.append(img)
+        with Hdf5FrameRecorder(file_name, img.shape, chunk_frames, compression_level, buffer_size) as recorder:
+            start_time = time.time()
+            recorder.put(img, time_stamp)
 
-            # end_time = time.time()
-            # resp_time.append(end_time - start_time)
-            # start_time = end_time
-            
-        average_time = sum(resp_time) / len(resp_time)
-        print("average time: ", average_time)
+            while listener.running:
+                img, time_stamp, next_frame_number = self.sensor.wait_next(timeout=1.0, after=frame_number)
+                if img is not None:
+                    recorder.put(img, time_stamp)
+                    frame_number = next_frame_number
 
-        print("\nrecording images stopped...")
-
-        imgs = np.array(imgs)
+            duration = time.time() - start_time
 
-        with h5py.File(config["gelsight_mini_interface"]["img_data_dir"] + self.hdf5_file_name, 'w') as f:
-            f.create_dataset('images', data=imgs, compression='gzip', compression_opts=5)
+        print("\nrecording images stopped...")
+        print(f"{recorder.num_written} frames saved ({recorder.num_written / duration:.1f} fps), "
+              f"{recorder.dropped} dropped")
 
 
-    def save_hdf5_as_png(self):
+    def save_hdf5_as_png(self, workers=None, block_size=256):
         ''' 
         For post processing.
         INPUT: is an instance attribute to defining name of hdf5 file to save images.
+        Frames are read 'block_size' at a time and encoded in parallel by 'workers' threads.
         '''
 
         print("Post processing; saving hdf5 image data into '.png'...")
 
         save_images_dir = join(config["gelsight_mini_interface"]["img_data_dir"], self.hdf5_file_name.replace(".h5", ""))
-        makedirs(save_images_dir, exist_ok=True)  # create the directory for .png images if does not exist.
+
+        def print_progress(num_written, total):
+            if num_written % 500 == 0 or num_written == total:
+                print(f"  {num_written}/{total} images saved")
 
         with h5py.File(config["gelsight_mini_interface"]["img_data_dir"] + self.hdf5_file_name, 'r') as f:
-                img_array = f['images'][:] 
+            images = f['images']
+            num_images = len(images)
 
-        for i, image_data in enumerate(img_array):
-            # Convert the image data to uint8 if necessary
-            image_data = np.array(image_data, dtype=np.uint8)
-            image_name = '/hdf5_image_' + str(i) + '.png'
-            cv2.imwrite(save_images_dir + image_name, image_data)
+            def iter_images():
+                for start in range(0, num_images, block_size):
+                    yield from images[start:start + block_size].astype(np.uint8, copy=False)
 
+            export_frames(iter_images(), save_images_dir, 'hdf5_image_{}.png', workers=workers,
+                          progress=print_progress, total=num_images)
 
 
 
 
-    def do_cv_stuff(self, rgb_gelsight_image):
 
-        grayScaledImg = cv2.cvtColor(rgb_gelsight_image, cv2.COLOR_RGB2GRAY)
+    def do_cv_stuff(self, rgb_gelsight_image):
 
-        thresholdedImg = cv2.adaptiveThreshold(grayScaledImg ,255,cv2.ADAPTIVE_THRESH_MEAN_C,\
-                cv2.THRESH_BINARY_INV,21,4)
-        
-        thresholdedImg=cv2.medianBlur(thresholdedImg, 9)
-        thresholdedImg=cv2.dilate(thresholdedImg, (3,3), iterations=2)
-        thresholdedImg=cv2.medianBlur(thresholdedImg, 3)
-        thresholdedImg=cv2.dilate(thresholdedImg, (3,3), iterations=2)
+        roi = None if self.contact_roi is None else self.contact_roi.update(rgb_gelsight_image)
+        roi_x, roi_y = (0, 0) if roi is None else roi[:2]
 
-        num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(thresholdedImg , 8 , cv2.CV_32S)
+        markers = self.marker_detector.detect(rgb_gelsight_image, roi=roi)
+        grayScaledImg = self.marker_detector.gray
+        thresholdedImg = self.marker_detector.thresholded
+        stats = self.marker_detector.stats
 
         centroidLabeledImg = cv2.cvtColor(thresholdedImg,cv2.COLOR_GRAY2BGR)
 
         for i in range(len(stats)):
             stat = stats[i]
             x,y,w,h,area = stat
+            x,y = x + roi_x, y + roi_y
             if area < 100:
                 centroidLabeledImg[y:y+h,x:x+w]=0
 
-        for i in range(len(stats)):
-            stat = stats[i]
-            x,y,w,h,area = stat
+        if roi is not None:
+            x,y,w,h = roi
+            cv2.rectangle(centroidLabeledImg,[x,y],[x+w,y+h], (0,255,0), 1)
+
+        for marker in markers:
+            x,y,w,h = int(marker['left']), int(marker['top']), int(marker['width']), int(marker['height'])
+            cv2.rectangle(centroidLabeledImg,[x,y],[x+w,y+h], (255,0,0), 2)    # img, bbox starting corner, bbox ending corner, color, line thickness
 
-            if area != np.max(stats[:,4]): # background pixel intensity is the largest area in stats
-                if area > 55:
-                    cv2.rectangle(centroidLabeledImg,[x,y],[x+w,y+h], (255,0,0), 2)    # img, bbox starting corner, bbox ending corner, color, line thickness
+            x,y = int(marker['x']), int(marker['y'])
 
-                    x,y = centroids[i].astype(int)
-                    
-                    cv2.circle(centroidLabeledImg,(x,y),2,(0,0,255),2)
+            cv2.circle(centroidLabeledImg,(x,y),2,(0,0,255),2)
 
 
         # converting back to color so the bboxs are still in red
@@ -193,6 +204,36 @@ class GelsightMiniClass:
         if cv2.waitKey(1) & 0xFF==ord('q'):
             print('quitting program')
             exit()
+
+
+    def track_markers(self, redetect_every=30):
+        '''
+        Live marker tracking with persistent IDs (see marker_tracking.py): markers are detected on the first frame
+        and then followed frame to frame inside small windows; a full detection every 'redetect_every' frames picks
+        up new markers. Press 'q' to stop. OUTPUT: (ids, trajectory) as returned by MarkerTracker.trajectories().
+        '''
+        tracker = MarkerTracker()
+
+        while True:
+            gray = cv2.cvtColor(self.sensor.get_image(), cv2.COLOR_RGB2GRAY)
+
+            detections = None  # frame_index is -1 before the first frame, so the first frame is always detected
+            if tracker.frame_index % redetect_every == redetect_every - 1:
+                detections = centroids_of(self.marker_detector.detect(gray))
+            ids, positions = tracker.update(gray, detections)
+
+            tracked_img = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+            for marker_id, (x, y) in zip(ids, positions.astype(int)):
+                cv2.circle(tracked_img, (x, y), 2, (0, 0, 255), 2)
+                cv2.putText(tracked_img, str(marker_id), (x + 3, y - 3), cv2.FONT_HERSHEY_PLAIN, 0.7, (255, 0, 0), 1)
+
+            cv2.imshow('tracked markers', tracked_img)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+
+        cv2.destroyAllWindows()
+
+        return tracker.trajectories()
     
 
 
@@ -200,7 +241,11 @@ class GelsightMiniClass:
 
 if __name__ == '__main__':
 
-    gelsight_mini_obj = GelsightMiniClass('test.h5')
+    parser = argparse.ArgumentParser(description="Show gelsight mini frames.")
+    add_replay_arguments(parser)
+    args = parser.parse_args()
+
+    gelsight_mini_obj = GelsightMiniClass('test.h5', sensor=AsyncGelsightCamera(replay_camera_from_args(args)))
 
     gelsight_mini_obj.show_image()
 
@@ -213,5 +258,7 @@ if __name__ == '__main__':
 
     # gelsight_mini_obj.save_png_image(config["gelsight_mini_interface"]["img_data_dir"], 'test_img.png')
 
+    # ids, trajectory = gelsight_mini_obj.track_markers()
+
     # gelsight_mini_obj.save_img_in_hdf5()
     # gelsight_mini_obj.save_hdf5_as_png()
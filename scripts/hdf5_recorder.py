@@ -0,0 +1,142 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: hdf5_recorder.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Streaming recorder of gelsight_mini frames into an hdf5 file. Frames are
+ * handed over through a bounded ring buffer to a background writer thread
+ * that appends them to a chunked, resizable 'images' dataset (next to a
+ * 'timestamps' dataset), so memory use does not grow with recording length.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import threading
+import h5py
+import numpy as np
+from ring_buffer import RingBuffer
+
+
+class Hdf5FrameRecorder:
+    '''
+    Usage:
+        with Hdf5FrameRecorder(file_name, frame_shape=(240, 320, 3)) as recorder:
+            recorder.put(frame, time_stamp)
+    INPUT:
+        - 'chunk_frames': frames per hdf5 chunk, also the size of each write to disk.
+        - 'compression_level': gzip level (0-9, None for no compression); trades capture-time CPU for disk.
+        - 'buffer_size': frames held in memory for the writer; when it falls behind, the oldest are dropped (see 'dropped').
+    If writing fails (e.g. disk full), the error is kept in 'error' and raised by the next put() and by stop().
+    '''
+
+    def __init__(self, file_name, frame_shape, chunk_frames=16, compression_level=5, buffer_size=64):
+        self.file_name = file_name
+        self.frame_shape = tuple(frame_shape)
+        self.chunk_frames = chunk_frames
+        self.compression_level = compression_level
+
+        self.num_written = 0
+        self._ring = RingBuffer(buffer_size, self.frame_shape, np.uint8)
+        self._stop_event = threading.Event()
+        self._writer = None
+        self._file = None
+        self.error = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def dropped(self):
+        return self._ring.dropped
+
+    def start(self):
+        self._file = h5py.File(self.file_name, 'w')
+
+        compression = {} if self.compression_level is None else {'compression': 'gzip',
+                                                                 'compression_opts': self.compression_level}
+        self._images = self._file.create_dataset(
+            'images', shape=(0,) + self.frame_shape, maxshape=(None,) + self.frame_shape, dtype=np.uint8,
+            chunks=(self.chunk_frames,) + self.frame_shape, **compression)
+        self._time_stamps = self._file.create_dataset(
+            'timestamps', shape=(0,), maxshape=(None,), dtype=np.float64, chunks=(max(self.chunk_frames, 1024),))
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def put(self, frame, time_stamp):
+        ''' Queue one frame for writing; never blocks on disk. '''
+        self._raise_error()
+        self._ring.put(frame, time_stamp)
+
+    def stop(self):
+        ''' Write every queued frame and close the file. '''
+        if self._writer is None:
+            return
+
+        self._stop_event.set()
+        self._writer.join()
+        self._writer = None
+        self._file.close()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise RuntimeError(f"writing frames to {self.file_name} failed") from self.error
+
+    def _write_loop(self):
+        try:
+            self._write_frames()
+        except Exception as error:  # surfaced to the producer by put() and stop()
+            self.error = error
+
+    def _write_frames(self):
+        batch = np.empty((self.chunk_frames,) + self.frame_shape, dtype=np.uint8)
+        batch_time_stamps = np.zeros(self.chunk_frames)
+        num_batched = 0
+
+        while True:
+            _, time_stamp = self._ring.get(out=batch[num_batched], timeout=0.1)
+
+            if time_stamp is not None:
+                batch_time_stamps[num_batched] = time_stamp
+                num_batched = num_batched + 1
+
+            draining = self._stop_event.is_set() and self._ring.depth == 0
+            if num_batched == self.chunk_frames or (draining and num_batched > 0):
+                self._append(batch[:num_batched], batch_time_stamps[:num_batched])
+                num_batched = 0
+
+            if draining and time_stamp is None:
+                break
+
+    def _append(self, frames, time_stamps):
+        start = self.num_written
+        stop = start + len(frames)
+
+        self._images.resize(stop, axis=0)
+        self._images[start:stop] = frames
+        self._time_stamps.resize(stop, axis=0)
+        self._time_stamps[start:stop] = time_stamps
+
+        self.num_written = stop
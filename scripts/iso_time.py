@@ -0,0 +1,80 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: iso_time.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * ISO8601 time stamp columns (e.g. of the RFT44-SB01 FT sensor logs) as
+ * float seconds, converted in one numpy cast and cached per file.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ * 
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import numpy as np
+import pandas as pd
+from os import stat
+from os.path import splitext, exists
+from data_logger_methods import load_columns
+
+
+def iso8601_to_seconds(time_stamps, start=None):
+    '''
+    Seconds since 'start' (default: the earliest time stamp) of ISO8601 time stamps, e.g. the '2024-06-25T14:03:07.123'
+    time_stamp column of the RFT44-SB01 logger (src_main/FT_sensor.cpp), converted in one numpy datetime64 cast.
+    Hours and days are kept, so sessions crossing the hour do not wrap.
+    '''
+    time_stamps = np.asarray(time_stamps).astype('datetime64[us]')
+    start = time_stamps.min() if start is None else np.datetime64(start, 'us')
+    return (time_stamps - start).astype(np.float64) / 1e6
+
+
+# {(file_name, column): (size, mtime, seconds)} of load_time_seconds
+_time_seconds_cache = {}
+
+
+def load_time_seconds(file_name, column='time_stamp'):
+    '''
+    The ISO8601 'column' of a csv (or any load_columns) file as float seconds since its first time stamp
+    (iso8601_to_seconds). The result is cached in memory and in '<file>.<column>.npz', keyed by the size and mtime
+    of the file, so a log is parsed once and re-parsed only when it changes.
+    '''
+    file_stat = stat(file_name)
+    key = (file_name, column)
+
+    cached = _time_seconds_cache.get(key)
+    if cached is not None and cached[:2] == (file_stat.st_size, file_stat.st_mtime):
+        return cached[2]
+
+    cache_file = f"{file_name}.{column}.npz"
+    seconds = None
+    if exists(cache_file):
+        with np.load(cache_file) as saved:
+            if saved['source_size'] == file_stat.st_size and saved['source_mtime'] == file_stat.st_mtime:
+                seconds = saved['seconds']
+
+    if seconds is None:
+        if splitext(file_name)[1].lower() == '.csv':
+            time_stamps = pd.read_csv(file_name, usecols=[column])[column]
+        else:
+            time_stamps = load_columns(file_name)[column]
+        seconds = iso8601_to_seconds(time_stamps.to_numpy())
+        np.savez(cache_file, seconds=seconds, source_size=file_stat.st_size, source_mtime=file_stat.st_mtime)
+
+    _time_seconds_cache[key] = (file_stat.st_size, file_stat.st_mtime, seconds)
+    return seconds
@@ -0,0 +1,81 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: latency_histogram.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Fixed-size, log-spaced latency histograms for the live loops (one per
+ * processing stage). Recording a sample is a binary search and an integer
+ * increment, so it can run every frame; percentiles are read from the bins.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import numpy as np
+from bisect import bisect_right
+
+
+class LatencyHistogram:
+    '''
+    INPUT: latencies [s] from 'min_latency' to 'max_latency' are binned with 'bins_per_decade' log-spaced bins;
+    anything outside goes to an underflow/overflow bin. Percentiles are the upper edge of their bin.
+    '''
+
+    def __init__(self, min_latency=1e-5, max_latency=1.0, bins_per_decade=20):
+        num_bins = int(round(np.log10(max_latency / min_latency) * bins_per_decade))
+        self.edges = np.logspace(np.log10(min_latency), np.log10(max_latency), num_bins + 1)
+        self._edges = self.edges.tolist()  # bisect on a list is faster than numpy for one value
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self._edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency):
+        self.counts[bisect_right(self._edges, latency)] += 1
+        self.count = self.count + 1
+        self.total = self.total + latency
+        self.max = max(self.max, latency)
+
+    def percentile(self, q):
+        ''' Latency [s] below which 'q' percent of the samples fall (upper bin edge), NaN when empty. '''
+        if self.count == 0:
+            return np.nan
+
+        rank = np.searchsorted(np.cumsum(self.counts), q / 100.0 * self.count)
+        return self.max if rank >= len(self._edges) else min(self._edges[rank], self.max)
+
+    def summary(self):
+        ''' count, mean, p50, p90, p99 and max, latencies in milliseconds. '''
+        mean = self.total / self.count if self.count else np.nan
+        return {'count': self.count, 'mean_ms': 1e3 * mean, 'p50_ms': 1e3 * self.percentile(50),
+                'p90_ms': 1e3 * self.percentile(90), 'p99_ms': 1e3 * self.percentile(99), 'max_ms': 1e3 * self.max}
+
+
+def format_latencies(histograms):
+    ''' One line per stage of a {stage: LatencyHistogram} dict. '''
+    lines = []
+    for stage, histogram in histograms.items():
+        s = histogram.summary()
+        lines.append(f"{stage:>8}: n={s['count']} mean={s['mean_ms']:.2f} p50={s['p50_ms']:.2f} "
+                     f"p90={s['p90_ms']:.2f} p99={s['p99_ms']:.2f} max={s['max_ms']:.2f} ms")
+
+    return '\n'.join(lines)
@@ -0,0 +1,360 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: live_synchronizer.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Live counterpart of time_synch_fabric_gelsight.py: subscribes to LSL
+ * streams (GelSightMini, Sensor_mV, ur5e, FT_Stream of the RFT44 sensor),
+ * pulls them in chunks into one ring buffer per stream, and emits
+ * time-aligned multi-sensor samples (see time_alignment.py) for closed-loop
+ * use. A time is emitted as soon as every stream has data past it, or at the
+ * latest 'lookahead' seconds after it, holding the last sample of the streams
+ * that are late, so the latency of the fused data is bounded.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import argparse
+import threading
+import time
+import numpy as np
+from pylsl import StreamInlet, resolve_byprop, local_clock, proc_clocksync, proc_dejitter
+from ring_buffer import RingBuffer
+from latency_histogram import LatencyHistogram, format_latencies
+from time_alignment import INTERPOLATIONS, resample, sample_indices
+from frame_sources import DEFAULT_FRAME_SHAPE
+
+
+# LSL streams fused by default, with their interpolation onto the emitted times (see time_alignment.py)
+LIVE_STREAMS = {
+    'GelSightMini': 'nearest',
+    'Sensor_mV': 'linear',
+    'ur5e_wrench': 'linear',
+    'ur5e_tool_velocity': 'linear',
+    'FT_Stream': 'linear',  # RFT44-SB01 force-torque sensor (src_main/LSL_FT.cpp)
+}
+
+LSL_FORMATS = {1: np.float32, 2: np.float64, 4: np.int32, 5: np.int16, 6: np.int8, 7: np.int64}
+LSL_STRING_FORMAT = 3
+
+# A stream is taken as a stream of frames when it has a frame <encoding> in its <desc> (lsl_gelsight.py), is of type
+# 'Video', is named as below or has more channels than any signal stream; it is then buffered as uint8 images.
+FRAME_STREAM_NAMES = ('GelSightMini',)
+MAX_SIGNAL_CHANNELS = 1024
+
+
+class LiveStream:
+    '''
+    One LSL inlet and the ring buffer of its recent samples.
+    INPUT:
+        - 'inlet': pylsl.StreamInlet (opened with clock synchronization, see open_inlet).
+        - 'interpolation': one of time_alignment.INTERPOLATIONS; frame streams (GelSightMini) use nearest or zoh.
+        - 'buffer_seconds': history kept, at the nominal rate; irregular streams (nominal rate 0, e.g. GelSightMini)
+          keep 'capacity' samples, by default 1024 (64 frames).
+        - 'lag' [s]: removed from the time stamps, e.g. the lag of clock_sync.estimate_lag.
+    String streams (e.g. the '[value]' of Sensor_mV) are parsed to float channels. 'raw' frame streams (see
+    FRAME_STREAM_NAMES) are kept as (height, width, channels) uint8 images; without a frame geometry in their <desc>
+    (older lsl_gelsight.py) they must have DEFAULT_FRAME_SHAPE frames, other frame streams raise ValueError.
+    '''
+
+    def __init__(self, inlet, interpolation='linear', buffer_seconds=5.0, capacity=None, lag=0.0):
+        info = inlet.info()
+        self.inlet = inlet
+        self.name = info.name()
+        self.lag = lag
+        self.channel_count = info.channel_count()
+        self.is_string = info.channel_format() == LSL_STRING_FORMAT
+
+        self.frame_shape = frame_stream_shape(info)
+
+        if interpolation not in INTERPOLATIONS or (self.frame_shape is not None and interpolation == 'linear'):
+            raise ValueError(f"invalid interpolation '{interpolation}' for '{self.name}'")
+        self.interpolation = interpolation
+
+        if info.nominal_srate() > 0:
+            capacity = max(int(np.ceil(buffer_seconds * info.nominal_srate())), 16)
+        elif capacity is None:
+            capacity = 1024 if self.frame_shape is None else 64
+
+        if self.frame_shape is not None:
+            self.ring = RingBuffer(capacity, self.frame_shape, np.uint8)
+        else:
+            self.ring = RingBuffer(capacity, (self.channel_count,),
+                                   np.float64 if self.is_string else LSL_FORMATS[info.channel_format()])
+
+        # pull_chunk destination (numeric streams): liblsl writes straight into it.
+        self._chunk = None if self.is_string else \
+            np.empty((min(capacity, 256), self.channel_count), dtype=LSL_FORMATS[info.channel_format()])
+
+    @property
+    def latest_time(self):
+        ''' Time stamp of the newest sample, -inf before the first one. '''
+        slots = self.ring.recent_slots(1)
+        return self.ring.time_stamps[slots[0]] if len(slots) else -np.inf
+
+    def pull(self):
+        ''' Move every sample waiting in the inlet into the ring buffer. OUTPUT: number of samples pulled. '''
+        pulled = 0
+        while True:
+            if self.is_string:
+                samples, time_stamps = self.inlet.pull_chunk(timeout=0.0, max_samples=256)
+                samples = np.array([[float(value.strip('[]')) for value in sample] for sample in samples])
+            else:
+                _, time_stamps = self.inlet.pull_chunk(timeout=0.0, max_samples=len(self._chunk), dest_obj=self._chunk)
+                samples = self._chunk[:len(time_stamps)]
+                if self.frame_shape is not None:
+                    samples = samples.view(np.uint8).reshape((-1,) + self.frame_shape)
+
+            if not time_stamps:
+                return pulled
+
+            self.ring.put_chunk(samples, np.asarray(time_stamps, dtype=np.float64) - self.lag)
+            pulled = pulled + len(time_stamps)
+            if self.is_string or len(time_stamps) < len(self._chunk):
+                return pulled
+
+    def values_at(self, times):
+        '''
+        Samples at 'times' (sorted), interpolated over the buffered history. Times past the newest sample hold it;
+        times before the oldest kept sample give NaN (None for frames).
+        OUTPUT: (N, channels) float64 array, or a list of N frames (copies) for frame streams.
+        '''
+        slots = self.ring.recent_slots()
+        time_stamps = self.ring.time_stamps[slots]
+
+        if len(time_stamps):  # only the samples around 'times' are gathered
+            slots = slots[max(np.searchsorted(time_stamps, times[0]) - 1, 0):]
+            time_stamps = self.ring.time_stamps[slots]
+
+        held = times > time_stamps[-1] if len(time_stamps) else np.zeros(len(times), dtype=bool)
+
+        if self.frame_shape is not None:
+            indices = sample_indices(time_stamps, times, self.interpolation)
+            indices[held] = len(time_stamps) - 1
+            return [None if index < 0 else self.ring.samples[slots[index]].copy() for index in indices]
+
+        values = resample(time_stamps, self.ring.samples[slots], times, self.interpolation)
+        values[held] = self.ring.samples[slots[-1]]
+        return values
+
+
+def frame_stream_shape(info):
+    '''
+    (height, width, channels) of the frames of a raw frame stream, None for a signal stream.
+    INPUT: 'info' is the pylsl.StreamInfo of the stream. Raises ValueError for frame streams that cannot be buffered:
+    compressed frames, or frames of unknown geometry.
+    '''
+    name = info.name()
+    desc = info.desc()
+    encoding = desc.child_value('encoding')
+    if not encoding and info.type() != 'Video' and name not in FRAME_STREAM_NAMES and \
+            info.channel_count() <= MAX_SIGNAL_CHANNELS:
+        return None
+
+    if encoding not in ('', 'raw') or info.channel_format() == LSL_STRING_FORMAT:
+        raise ValueError(f"'{name}' frames are {encoding or 'string'} encoded; "
+                         f"stream them with lsl_gelsight.py --encoding raw")
+
+    if desc.child_value('height'):
+        frame_shape = tuple(int(desc.child_value(key)) for key in ('height', 'width', 'channels'))
+    else:
+        frame_shape = DEFAULT_FRAME_SHAPE  # streamed without <desc>
+
+    if int(np.prod(frame_shape)) != info.channel_count() or LSL_FORMATS.get(info.channel_format()) is not np.int8:
+        raise ValueError(f"'{name}' looks like a frame stream ({info.channel_count()} channels) but its frames are not "
+                         f"{frame_shape} bytes; give the frame geometry in its <desc> (see lsl_gelsight.py)")
+
+    return frame_shape
+
+
+class LiveSynchronizer:
+    '''
+    Usage:
+        synchronizer = LiveSynchronizer(open_live_streams(LIVE_STREAMS), reference='GelSightMini', lookahead=0.02)
+        for time_stamp, values, late in synchronizer.samples():
+            ...
+    INPUT:
+        - 'streams': LiveStream list.
+        - 'reference': name of the stream whose sample times are emitted; or 'rate' [Hz] for a uniform grid.
+        - 'lookahead' [s]: how long to wait for late streams; a time is emitted at the latest at time + lookahead.
+    Emitted samples: (time_stamp, {stream_name: value}, late) with 'late' the names of the streams whose last sample
+    was held because no newer one arrived within the lookahead. 'latency' holds emission time - time stamp.
+    '''
+
+    def __init__(self, streams, reference=None, rate=None, lookahead=0.05, clock=local_clock):
+        if (reference is None) == (rate is None):
+            raise ValueError("give either a reference stream or a rate")
+
+        self.streams = {stream.name: stream for stream in streams}
+        self.reference = None if reference is None else self.streams[reference]
+        self.rate = rate
+        self.lookahead = lookahead
+        self.clock = clock
+
+        self.latency = LatencyHistogram()
+        self.num_emitted = 0
+        self.num_late = {name: 0 for name in self.streams}
+        self._last_time = -np.inf
+        self._next_grid_time = None
+
+    def poll(self):
+        ''' Pull every inlet and return the samples ready to be emitted, oldest first (possibly none). '''
+        for stream in self.streams.values():
+            stream.pull()
+
+        now = self.clock()
+        times = self._pending_times(now)
+        if self._last_time == -np.inf:  # times already overdue when the first poll happens are skipped
+            times = times[times + self.lookahead >= now]
+        if len(times) == 0:
+            return []
+
+        others = [stream for stream in self.streams.values() if stream is not self.reference]
+        available = min([stream.latest_time for stream in others], default=np.inf)
+        times = times[(times <= available) | (times + self.lookahead <= now)]  # a prefix: times are sorted
+        if len(times) == 0:
+            return []
+
+        self._last_time = times[-1]
+        if self.rate is not None:
+            self._next_grid_time = times[-1] + 1.0 / self.rate
+
+        values = {name: stream.values_at(times) for name, stream in self.streams.items()}
+        latest_times = {name: stream.latest_time for name, stream in self.streams.items()}
+
+        emitted = []
+        for i, time_stamp in enumerate(times):
+            late = tuple(stream.name for stream in others if latest_times[stream.name] < time_stamp)
+            for name in late:
+                self.num_late[name] = self.num_late[name] + 1
+            emitted.append((time_stamp, {name: value[i] for name, value in values.items()}, late))
+            self.latency.add(max(now - time_stamp, 0.0))
+
+        self.num_emitted = self.num_emitted + len(emitted)
+        return emitted
+
+    def samples(self, stop_event=None, period=0.001):
+        ''' Yields emitted samples until 'stop_event' is set, polling every 'period' seconds when idle. '''
+        while stop_event is None or not stop_event.is_set():
+            emitted = self.poll()
+            if not emitted:
+                time.sleep(period)
+            yield from emitted
+
+    def stats(self):
+        return {'emitted': self.num_emitted, 'late': dict(self.num_late),
+                'received': {name: stream.ring.num_put for name, stream in self.streams.items()}}
+
+    def _pending_times(self, now):
+        ''' Times not emitted yet: new reference time stamps, or grid times up to now. '''
+        if self.reference is not None:
+            slots = self.reference.ring.recent_slots()
+            time_stamps = self.reference.ring.time_stamps[slots]
+            return time_stamps[np.searchsorted(time_stamps, self._last_time, side='right'):]
+
+        if self._next_grid_time is None:
+            if not all(stream.ring.num_put for stream in self.streams.values()):
+                return np.zeros(0)
+            self._next_grid_time = max(stream.latest_time for stream in self.streams.values())
+
+        count = int(np.floor((now - self._next_grid_time) * self.rate)) + 1
+        return self._next_grid_time + np.arange(max(count, 0)) / self.rate
+
+
+def open_inlet(stream_name, timeout=5.0, max_buflen=10, dejitter=False):
+    '''
+    Inlet of the first LSL stream named 'stream_name', None if not found. Time stamps are converted to the local clock;
+    'dejitter' also smooths them (only for streams really sampled at their nominal rate).
+    '''
+    infos = resolve_byprop('name', stream_name, timeout=timeout)
+    if not infos:
+        return None
+
+    inlet = StreamInlet(infos[0], max_buflen=max_buflen,
+                        processing_flags=proc_clocksync | (proc_dejitter if dejitter else 0))
+    inlet.open_stream(timeout=timeout)
+    inlet.time_correction(timeout=timeout)  # the first clock offset estimate blocks: get it before streaming starts
+    return inlet
+
+
+def open_live_streams(interpolations, buffer_seconds=5.0, lags=None, timeout=5.0, dejitter=False):
+    ''' LiveStream of every found stream of {stream_name: interpolation}; missing streams are reported and skipped. '''
+    lags = lags or {}
+    streams = []
+    for stream_name, interpolation in interpolations.items():
+        inlet = open_inlet(stream_name, timeout, dejitter=dejitter)
+        if inlet is None:
+            print(f"LSL stream '{stream_name}' not found, skipped")
+            continue
+        streams.append(LiveStream(inlet, interpolation, buffer_seconds, lag=lags.get(stream_name, 0.0)))
+
+    return streams
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Fuse live LSL streams into time-aligned samples.")
+    parser.add_argument('--streams', nargs='+', default=[f"{name}={method}" for name, method in LIVE_STREAMS.items()],
+                        metavar='NAME=METHOD', help=f"LSL streams and their interpolation, one of {INTERPOLATIONS}")
+    parser.add_argument('--reference', default=None, help="emit at the sample times of this stream (default: GelSightMini)")
+    parser.add_argument('--rate', type=float, default=None, help="emit on a uniform grid at this rate [Hz] instead")
+    parser.add_argument('--lookahead', type=float, default=0.05, help="longest wait [s] for late streams")
+    parser.add_argument('--buffer-seconds', type=float, default=5.0, help="history kept per stream [s]")
+    parser.add_argument('--lags-from', default=None, help="remove the lags saved by xdf_post_processing.py --clock-sync "
+                                                          "('<xdf>.clock.json')")
+    parser.add_argument('--dejitter', action='store_true', help="smooth the time stamps of regularly sampled streams")
+    parser.add_argument('--duration', type=float, default=None, help="stop after this many seconds")
+    parser.add_argument('--stats-period', type=float, default=5.0, help="seconds between statistics printouts")
+    args = parser.parse_args()
+
+    lags = {}
+    if args.lags_from is not None:
+        from clock_sync import load_clock_corrections
+        lags = {name: -correction.lag for name, correction in load_clock_corrections(args.lags_from).items()}
+
+    interpolations = dict(option.split('=') for option in args.streams)
+    streams = open_live_streams(interpolations, args.buffer_seconds, lags, dejitter=args.dejitter)
+    if not streams:
+        raise SystemExit("no LSL stream found")
+
+    reference = args.reference
+    if args.rate is None and reference is None:
+        reference = 'GelSightMini' if any(s.name == 'GelSightMini' for s in streams) else streams[0].name
+    synchronizer = LiveSynchronizer(streams, reference=reference, rate=args.rate, lookahead=args.lookahead)
+
+    stop_event = threading.Event()
+    if args.duration is not None:
+        threading.Timer(args.duration, stop_event.set).start()
+
+    def print_stats():
+        print(synchronizer.stats())
+        print(format_latencies({'fused': synchronizer.latency}))
+
+    last_print = time.monotonic()
+    try:
+        for time_stamp, values, late in synchronizer.samples(stop_event):
+            if time.monotonic() - last_print >= args.stats_period:
+                print_stats()
+                last_print = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        print_stats()
@@ -28,31 +28,138 @@
 #!/usr/bin/env python3
 
 import cv2
+import base64
+import argparse
+import threading
 import numpy as np
 import time
-from os import getcwd
-from os.path import join, abspath
-from pylsl import StreamInfo, StreamOutlet
-from gelsight import gsdevice
+from pylsl import StreamInfo, StreamOutlet, local_clock
+from replay_camera import add_replay_arguments, replay_camera_from_args
+from ring_buffer import RingBuffer
 
 
+# Frame encodings of the 'GelSightMini' LSL stream, stored in the stream's <desc><encoding>.
+#   raw:  one int8 channel per pixel value; the uint8 frame buffer is pushed as is (int8 is
+#         only the LSL container type, decoders reinterpret the bytes as uint8).
+#   jpeg: one string channel holding the base64 of the .jpg encoded frame (lossy).
+#   png:  one string channel holding the base64 of the .png encoded frame (lossless).
+FRAME_ENCODINGS = ('raw', 'jpeg', 'png')
+
+
+def make_stream_info(encoding, img_height, img_width, rgb_channels, jpeg_quality=90):
+    ''' LSL stream description of the gelsight frames, with the frame geometry and encoding in <desc>. '''
+    if encoding == 'raw':
+        info = StreamInfo('GelSightMini', 'Video', img_width * img_height * rgb_channels, 0, 'int8')
+    else:
+        info = StreamInfo('GelSightMini', 'Video', 1, 0, 'string')
+
+    desc = info.desc()
+    desc.append_child_value('height', str(img_height))
+    desc.append_child_value('width', str(img_width))
+    desc.append_child_value('channels', str(rgb_channels))
+    desc.append_child_value('encoding', encoding)
+    if encoding == 'jpeg':
+        desc.append_child_value('jpeg_quality', str(jpeg_quality))
+
+    return info
+
+
+def push_frame(outlet, frame, encoding, timestamp=0.0, jpeg_quality=90):
+    ''' Push one HxWx3 uint8 frame on the outlet in the given encoding. '''
+    if encoding == 'raw':
+        # a (1, channels) chunk viewing the frame memory: no flatten/astype copy before LSL takes the buffer.
+        outlet.push_chunk(np.ascontiguousarray(frame).reshape(1, -1).view(np.int8), timestamp)
+        return
+
+    if encoding == 'jpeg':
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    else:
+        ok, buffer = cv2.imencode('.png', frame)
+
+    if not ok:
+        raise RuntimeError(f"could not encode frame as {encoding}")
+
+    outlet.push_sample([base64.b64encode(buffer).decode('ascii')], timestamp)
+
+
+
+def capture_frames(sensor, ring, stop_event):
+    '''
+    Capture thread: stamp every frame with local_clock() as soon as it is read and hand it to the ring buffer.
+    The end of a replayed recording (see replay_camera.py) sets 'stop_event'.
+    '''
+    while not stop_event.is_set():
+        try:
+            frame = sensor.get_image()
+        except EOFError:
+            stop_event.set()
+            break
+        capture_time = local_clock()
+        ring.put(frame, capture_time)
+
+
+def publish_frames(outlet, ring, stop_event, encoding, jpeg_quality=90):
+    ''' Publisher thread: push buffered frames with their capture time stamps, so LSL stalls never block the camera. '''
+    frame = np.empty_like(ring.samples[0])
+
+    while not stop_event.is_set() or ring.depth > 0:  # frames still queued at stop are published
+        _, capture_time = ring.get(out=frame, timeout=0.5)
+        if capture_time is None:
+            continue
+
+        push_frame(outlet, frame, encoding, capture_time, jpeg_quality)
+
 
 
 if __name__ == '__main__':
 
-    sensor = gsdevice.Camera("GelSight Mini")
+    parser = argparse.ArgumentParser(description="Stream gelsight mini frames to LSL.")
+    parser.add_argument('--encoding', choices=FRAME_ENCODINGS, default='raw',
+                        help="raw uint8 frames, or per-frame jpeg/png compressed frames")
+    parser.add_argument('--jpeg-quality', type=int, default=90)
+    parser.add_argument('--buffer-size', type=int, default=64, help="frames held between capture and publisher threads")
+    parser.add_argument('--stats-period', type=float, default=5.0, help="seconds between buffer statistics printouts")
+    add_replay_arguments(parser)
+    args = parser.parse_args()
+
+    sensor = replay_camera_from_args(args)
+    if sensor is None:
+        from gelsight import gsdevice
+        sensor = gsdevice.Camera("GelSight Mini")
     sensor.connect()
 
     ## Define LSL stream
     img_width = 320
     img_height = 240
     rgb_channels = 3
-    info = StreamInfo('GelSightMini', 'Video', img_width * img_height * rgb_channels, 0, 'int8')  # Adjust based on your data type
+    info = make_stream_info(args.encoding, img_height, img_width, rgb_channels, args.jpeg_quality)
     outlet = StreamOutlet(info)
 
-    ## Stream data to LSL:
-    while True:
-        frame = sensor.get_image()
-        frame = frame.flatten()
-        outlet.push_sample(frame)
+    ## Stream data to LSL: capture and publish on separate threads
+    ring = RingBuffer(args.buffer_size, (img_height, img_width, rgb_channels), np.uint8)
+    stop_event = threading.Event()
+
+    threads = [threading.Thread(target=capture_frames, args=(sensor, ring, stop_event), daemon=True),
+               threading.Thread(target=publish_frames, args=(outlet, ring, stop_event, args.encoding, args.jpeg_quality),
+                                daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    def print_stats():
+        stats = ring.stats()
+        print(f"captured: {stats['put']}, published: {stats['get']}, dropped: {stats['dropped']}, "
+              f"queue depth: {stats['depth']} (max {stats['max_depth']})")
+
+    start_time = time.monotonic()
+    try:
+        while not stop_event.wait(args.stats_period):
+            print_stats()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        for thread in threads:
+            thread.join(timeout=2.0)
 
+        print_stats()
+        print(f"{ring.num_get / (time.monotonic() - start_time):.1f} frames published per second")
@@ -0,0 +1,139 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: marker_detection.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Detection of the gelsight_mini markers (grayscale, adaptive threshold,
+ * median blur/dilate, connected components, area filter), shared by
+ * velocity_estimation.py, gelsight_mini_interface.py and marker_tracking.py.
+ * Intermediate images are allocated once and reused for every frame, and
+ * the markers are returned as a compact structured numpy array.
+ * Detection can be restricted to a region of interest (see contact_roi.py).
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import cv2
+import numpy as np
+from contact_roi import roi_slices
+
+
+# One record per detected marker.
+MARKER_DTYPE = np.dtype([('frame', '<i4'), ('x', '<f4'), ('y', '<f4'), ('area', '<i4'),
+                         ('left', '<i2'), ('top', '<i2'), ('width', '<i2'), ('height', '<i2')])
+
+# Tuning used so far by each script.
+VELOCITY_ESTIMATION_PARAMS = {'block_size': 51, 'C': 4, 'min_area': 150}  # velocity_estimation.py (jpeg frames)
+LIVE_SENSOR_PARAMS = {'block_size': 21, 'C': 4, 'min_area': 55}           # gelsight_mini_interface.py (live frames)
+
+
+class MarkerDetector:
+    '''
+    INPUT:
+        - 'block_size', 'C': neighbourhood size and offset of the adaptive (mean) threshold.
+        - 'min_area': components with an area (pixels) not above this are ignored.
+    After detect(), 'gray' holds the grayscale frame, 'thresholded' the binary image and 'stats' the stats of all
+    connected components (buffers reused by the next call, copy them to keep them).
+    '''
+
+    def __init__(self, block_size=21, C=4, min_area=55):
+        self.block_size = block_size
+        self.C = C
+        self.min_area = min_area
+
+        self.gray = None
+        self.thresholded = None
+        self.stats = None
+        self._shape = None
+
+    def detect(self, frame, frame_index=0, roi=None):
+        '''
+        Markers of one RGB or grayscale frame. OUTPUT: structured array of MARKER_DTYPE.
+        With 'roi' ((x, y, width, height), e.g. from contact_roi.ContactRoi) only that region is thresholded and
+        labelled, 'thresholded' is zero outside it and 'stats' is in ROI coordinates; positions are in frame pixels.
+        '''
+        gray = self.grayscale(frame)
+        self._allocate(gray.shape)
+        self.gray = gray
+
+        rows, columns = roi_slices(roi)
+        if roi is not None:
+            self._buffer_a.fill(0)
+        buffer_a, buffer_b = self._buffer_a[rows, columns], self._buffer_b[rows, columns]
+
+        cv2.adaptiveThreshold(gray[rows, columns], 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV,
+                              self.block_size, self.C, dst=buffer_a)
+        cv2.medianBlur(buffer_a, 9, dst=buffer_b)
+        cv2.dilate(buffer_b, (3, 3), dst=buffer_a, iterations=2)
+        cv2.medianBlur(buffer_a, 3, dst=buffer_b)
+        cv2.dilate(buffer_b, (3, 3), dst=buffer_a, iterations=2)
+        self.thresholded = self._buffer_a
+
+        _, _, stats, centroids = cv2.connectedComponentsWithStats(buffer_a, labels=self._labels[rows, columns],
+                                                                  connectivity=8, ltype=cv2.CV_32S)
+        self.stats = stats
+
+        areas = stats[:, cv2.CC_STAT_AREA]
+        keep = (areas != areas.max()) & (areas > self.min_area)  # background is the largest component
+        x_offset, y_offset = (0, 0) if roi is None else roi[:2]
+
+        markers = np.empty(np.count_nonzero(keep), dtype=MARKER_DTYPE)
+        markers['frame'] = frame_index
+        markers['x'] = centroids[keep, 0] + x_offset
+        markers['y'] = centroids[keep, 1] + y_offset
+        markers['area'] = areas[keep]
+        markers['left'] = stats[keep, cv2.CC_STAT_LEFT] + x_offset
+        markers['top'] = stats[keep, cv2.CC_STAT_TOP] + y_offset
+        markers['width'] = stats[keep, cv2.CC_STAT_WIDTH]
+        markers['height'] = stats[keep, cv2.CC_STAT_HEIGHT]
+
+        return markers
+
+    def detect_stack(self, frames, first_frame_index=0):
+        ''' Markers of every frame of a stack/iterable, tagged with their frame index, as one structured array. '''
+        markers = [self.detect(frame, first_frame_index + i) for i, frame in enumerate(frames)]
+
+        if not markers:
+            return np.zeros(0, dtype=MARKER_DTYPE)
+
+        return np.concatenate(markers)
+
+    def grayscale(self, frame):
+        ''' Grayscale version of the frame, written into the detector's own buffer (no-op for gray frames). '''
+        if frame.ndim == 2:
+            return frame
+
+        self._allocate(frame.shape[:2])
+        return cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY, dst=self._gray)
+
+    def _allocate(self, shape):
+        if self._shape == shape:
+            return
+
+        self._shape = shape
+        self._gray = np.empty(shape, dtype=np.uint8)
+        self._buffer_a = np.empty(shape, dtype=np.uint8)
+        self._buffer_b = np.empty(shape, dtype=np.uint8)
+        self._labels = np.empty(shape, dtype=np.int32)
+
+
+def centroids_of(markers):
+    ''' (K, 2) float array of the (x, y) centroids of a MARKER_DTYPE array. '''
+    return np.stack([markers['x'], markers['y']], axis=1).astype(np.float64)
@@ -0,0 +1,185 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: marker_tracking.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Incremental tracker of the gelsight_mini markers that keeps marker IDs
+ * across frames. Every marker's position is predicted from its last
+ * displacement and refined inside a small window around the prediction, so
+ * the per-frame cost scales with the number of markers, not the image area.
+ * Full-frame detections (occasionally, see marker_detection.py) add new
+ * markers and re-anchor tracks.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class MarkerTracker:
+    '''
+    INPUT:
+        - 'window_radius': half size [px] of the search window around each predicted marker position;
+          keep it below half the marker spacing so a window never holds two markers.
+        - 'C': a pixel belongs to a marker when it is darker than the window mean minus C (as in the adaptive threshold).
+        - 'min_pixels': fewer marker pixels than this in the window counts as a miss.
+        - 'max_missed': a marker is dropped after this many consecutive misses.
+        - 'match_radius': max distance [px] between a track and a full-frame detection to be considered the same marker.
+    '''
+
+    def __init__(self, window_radius=8, C=4, min_pixels=4, max_missed=3, match_radius=8):
+        self.window_radius = window_radius
+        self.C = C
+        self.min_pixels = min_pixels
+        self.max_missed = max_missed
+        self.match_radius = match_radius
+
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.positions = np.zeros((0, 2))
+        self.velocities = np.zeros((0, 2))  # last displacement [px/frame]
+        self.missed = np.zeros(0, dtype=np.int64)
+
+        self.frame_index = -1
+        self._next_id = 0
+        self._history = []  # per frame: (frame_index, ids, positions)
+
+        offsets = np.arange(-window_radius, window_radius + 1)
+        self._window_dy, self._window_dx = np.meshgrid(offsets, offsets, indexing='ij')
+
+    def __len__(self):
+        return len(self.ids)
+
+    def update(self, gray, detections=None):
+        '''
+        Track every marker into the new grayscale frame; 'detections' ((K, 2) full-frame centroids, optional)
+        re-anchor the tracks they match and start new tracks for the rest.
+        OUTPUT: (ids, positions) of the markers tracked in this frame.
+        '''
+        self.frame_index = self.frame_index + 1
+
+        if len(self.ids):
+            self._refine(gray, self.positions + self.velocities)
+
+        if detections is not None:
+            self._associate(gray, np.asarray(detections, dtype=np.float64).reshape(-1, 2))
+
+        alive = self.missed <= self.max_missed
+        self.ids = self.ids[alive]
+        self.positions = self.positions[alive]
+        self.velocities = self.velocities[alive]
+        self.missed = self.missed[alive]
+
+        seen = self.missed == 0
+        self._history.append((self.frame_index, self.ids[seen].copy(), self.positions[seen].copy()))
+
+        return self.ids[seen], self.positions[seen]
+
+    def trajectories(self):
+        '''
+        OUTPUT: (ids, trajectory) where trajectory is a (num_frames, num_ids, 2) array of marker positions,
+        NaN wherever a marker was not seen.
+        '''
+        ids = np.unique(np.concatenate([frame_ids for _, frame_ids, _ in self._history])) \
+            if self._history else np.zeros(0, dtype=np.int64)
+        trajectory = np.full((len(self._history), len(ids), 2), np.nan)
+
+        for row, (_, frame_ids, positions) in enumerate(self._history):
+            trajectory[row, np.searchsorted(ids, frame_ids)] = positions
+
+        return ids, trajectory
+
+    def _refine(self, gray, predicted):
+        ''' Move every track to its marker centroid around the predicted position (see _centroids). '''
+        refined, found = self._centroids(gray, predicted)
+
+        self.velocities[found] = refined[found] - self.positions[found]
+        self.positions[found] = refined[found]
+        self.positions[~found] = predicted[~found]
+        self.missed[found] = 0
+        self.missed[~found] = self.missed[~found] + 1
+
+    def _centroids(self, gray, predicted, max_iterations=4):
+        '''
+        Darkness-weighted centroid of the marker inside a window around each of the 'predicted' positions.
+        The window is re-centred on the centroid until it stops moving, so a marker cut by the window edge
+        does not bias the estimate; pixels outside the image are left out instead of repeating the border.
+        OUTPUT: (centroids, found) with 'found' False where the window holds fewer than 'min_pixels' marker pixels.
+        '''
+        height, width = gray.shape[:2]
+        centers = np.rint(predicted).astype(np.int64)
+        inside = (centers[:, 0] >= 0) & (centers[:, 0] < width) & (centers[:, 1] >= 0) & (centers[:, 1] < height)
+
+        for _ in range(max_iterations):
+            ys = centers[:, 1, None, None] + self._window_dy
+            xs = centers[:, 0, None, None] + self._window_dx
+            valid = (ys >= 0) & (ys < height) & (xs >= 0) & (xs < width)
+            windows = gray[np.clip(ys, 0, height - 1), np.clip(xs, 0, width - 1)].astype(np.float32)  # (M, 2r+1, 2r+1)
+
+            num_valid = np.maximum(np.count_nonzero(valid, axis=(1, 2)), 1)
+            threshold = (windows * valid).sum(axis=(1, 2), keepdims=True) / num_valid[:, None, None] - self.C
+            weights = np.where(valid, np.maximum(threshold - windows, 0), 0)
+            total = weights.sum(axis=(1, 2))
+
+            found = inside & (np.count_nonzero(weights, axis=(1, 2)) >= self.min_pixels)
+            safe_total = np.where(total > 0, total, 1)
+            centroids = np.stack([(weights * xs).sum(axis=(1, 2)) / safe_total,
+                                  (weights * ys).sum(axis=(1, 2)) / safe_total], axis=1)
+
+            recentered = np.where(found[:, None], np.rint(centroids).astype(np.int64), centers)
+            if np.array_equal(recentered, centers):
+                break
+            centers = recentered
+
+        return centroids, found
+
+    def _associate(self, gray, detections):
+        if len(detections) == 0:
+            return
+
+        # same estimator as the tracking, so re-anchoring a track or starting a new one does not move the marker.
+        refined, found = self._centroids(gray, detections)
+        detections = np.where(found[:, None], refined, detections)
+
+        unmatched = np.ones(len(detections), dtype=bool)
+
+        if len(self.ids):
+            distances, nearest = cKDTree(detections).query(self.positions, distance_upper_bound=self.match_radius)
+            matched = np.isfinite(distances)
+
+            # one detection per track: keep the closest track when several claim the same detection.
+            order = np.argsort(distances[matched])
+            tracks = np.flatnonzero(matched)[order]
+            _, first = np.unique(nearest[tracks], return_index=True)
+            tracks = tracks[first]
+
+            self.positions[tracks] = detections[nearest[tracks]]
+            self.velocities[tracks] = 0
+            self.missed[tracks] = 0
+            unmatched[nearest[tracks]] = False
+
+        new = detections[unmatched]
+        new_ids = np.arange(self._next_id, self._next_id + len(new))
+        self._next_id = self._next_id + len(new)
+
+        self.ids = np.concatenate([self.ids, new_ids])
+        self.positions = np.concatenate([self.positions, new])
+        self.velocities = np.concatenate([self.velocities, np.zeros((len(new), 2))])
+        self.missed = np.concatenate([self.missed, np.zeros(len(new), dtype=np.int64)])
@@ -0,0 +1,81 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: npz_columns.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Columns stored as the members of an uncompressed .npz archive: memory-
+ * mapped in place when loading, and assembled from per-column files when
+ * writing, so neither direction needs the whole table in RAM.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ * 
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import shutil
+import zipfile
+import numpy as np
+
+
+def mmap_npz(file_name):
+    ''' Memory-map every (uncompressed) member of an .npz archive, keeping the column order. '''
+    columns = {}
+
+    with zipfile.ZipFile(file_name) as archive, open(file_name, 'rb') as file:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+
+            if info.compress_type != zipfile.ZIP_STORED:
+                columns[name] = np.load(archive.open(info))
+                continue
+
+            # skip the zip local file header to reach the .npy payload.
+            file.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(file.read(4), dtype='<u2')
+            file.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+
+            if np.lib.format.read_magic(file) == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+
+            if np.prod(shape) == 0:
+                columns[name] = np.empty(shape, dtype=dtype)
+                continue
+
+            order = 'F' if fortran_order else 'C'
+            columns[name] = np.memmap(file_name, dtype=dtype, mode='r', offset=file.tell(),
+                                      shape=shape, order=order)
+
+    return columns
+
+
+def write_npz_from_files(file_name, members, num_rows):
+    '''
+    Write an uncompressed .npz archive whose members are 1D arrays of 'num_rows' values, copying each from a file
+    holding its raw data (e.g. a temporary file a column was spilled to block by block).
+    INPUT: 'members' is a list of (name, file, dtype), 'file' an open binary file positioned anywhere.
+    '''
+    with zipfile.ZipFile(file_name, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for name, file, dtype in members:
+            header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False,
+                      'shape': (num_rows,)}
+            with archive.open(name + '.npy', mode='w', force_zip64=True) as member:
+                np.lib.format.write_array_header_2_0(member, header)
+                file.seek(0)
+                shutil.copyfileobj(file, member, 1 << 20)
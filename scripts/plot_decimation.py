@@ -0,0 +1,128 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: plot_decimation.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Level-of-detail line plots for long recordings (ur5e streams at 500 Hz,
+ * FT logs over hours, ...). A min/max pyramid of the signal is built once:
+ * each level keeps the minimum and maximum (with their times) of blocks of
+ * 'base' times more samples than the level below. A plotted line shows at
+ * most one min/max pair per pixel of the axis, taken from the finest level
+ * that fits the visible time range, and is re-decimated whenever the axis is
+ * zoomed, panned or resized, so peaks are never lost and matplotlib only
+ * draws a few thousand points whatever the recording length.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import numpy as np
+
+
+class MinMaxPyramid:
+    '''
+    INPUT: 'time' (sorted) and 'values' of one signal; level k > 0 holds, for every block of base**k samples, the time
+    of its first sample and the time/value of its minimum and maximum. Level 0 is the signal itself.
+    '''
+
+    def __init__(self, time, values, base=4):
+        self.time = np.asarray(time, dtype=np.float64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.base = base
+        self.levels = []  # (block_start_time, min_time, min_value, max_time, max_value) of levels 1, 2, ...
+
+        start_time, min_time, min_value, max_time, max_value = (self.time, self.time, self.values,
+                                                                self.time, self.values)
+        while len(start_time) > 1:
+            start_time = start_time[::base]
+            min_time, min_value = self._reduce(min_time, min_value, np.argmin)
+            max_time, max_value = self._reduce(max_time, max_value, np.argmax)
+            self.levels.append((start_time, min_time, min_value, max_time, max_value))
+
+    def _reduce(self, time, values, arg_function):
+        ''' (time, value) of the extremum of every block of 'base' samples (the last block is padded with its last sample). '''
+        pad = -len(values) % self.base
+        if pad:
+            time = np.concatenate((time, np.repeat(time[-1:], pad)))
+            values = np.concatenate((values, np.repeat(values[-1:], pad)))
+
+        rows = np.arange(len(values) // self.base)
+        columns = arg_function(values.reshape(-1, self.base), axis=1)
+        return time.reshape(-1, self.base)[rows, columns], values.reshape(-1, self.base)[rows, columns]
+
+    def decimate(self, start, stop, max_pairs):
+        '''
+        (time, values) to draw the signal between times 'start' and 'stop' with at most 'max_pairs' min/max pairs:
+        the raw samples when few enough, otherwise the min/max envelope of the finest level that fits.
+        One sample or block beyond each end is included so the line runs to the edges of the axis.
+        '''
+        first = max(np.searchsorted(self.time, start, side='right') - 1, 0)
+        last = np.searchsorted(self.time, stop, side='right') + 1
+        if last - first <= 2 * max_pairs or not self.levels:
+            return self.time[first:last], self.values[first:last]
+
+        for start_time, min_time, min_value, max_time, max_value in self.levels:
+            first = max(np.searchsorted(start_time, start, side='right') - 2, 0)
+            last = np.searchsorted(start_time, stop, side='right') + 1
+            if last - first <= max_pairs:
+                break
+
+        blocks = slice(first, last)
+        min_first = min_time[blocks] <= max_time[blocks]  # draw each pair in time order
+        time = np.column_stack((np.where(min_first, min_time[blocks], max_time[blocks]),
+                                np.where(min_first, max_time[blocks], min_time[blocks]))).ravel()
+        values = np.column_stack((np.where(min_first, min_value[blocks], max_value[blocks]),
+                                  np.where(min_first, max_value[blocks], min_value[blocks]))).ravel()
+        return time, values
+
+
+class DecimatedLine:
+    '''
+    A matplotlib line drawn from a MinMaxPyramid: redrawn at the axis resolution on every zoom/pan (x limits change)
+    and figure resize. 'line' is the matplotlib Line2D.
+    '''
+
+    def __init__(self, ax, time, values, *args, pairs_per_pixel=1.0, base=4, **kwargs):
+        self.ax = ax
+        self.pairs_per_pixel = pairs_per_pixel
+        self.pyramid = MinMaxPyramid(time, values, base)
+
+        time, values = self.pyramid.decimate(self.pyramid.time[0], self.pyramid.time[-1], self._max_pairs()) \
+            if len(self.pyramid.time) else (self.pyramid.time, self.pyramid.values)
+        self.line, = ax.plot(time, values, *args, **kwargs)
+
+        # lambdas (not bound methods): matplotlib keeps only weak references to bound method callbacks.
+        ax.callbacks.connect('xlim_changed', lambda ax: self.update())
+        ax.figure.canvas.mpl_connect('resize_event', lambda event: self.update())
+
+    def update(self):
+        ''' Re-decimate for the current x limits and axis width. '''
+        if len(self.pyramid.time) == 0:
+            return
+
+        start, stop = sorted(self.ax.get_xlim())
+        self.line.set_data(*self.pyramid.decimate(start, stop, self._max_pairs()))
+
+    def _max_pairs(self):
+        return max(int(self.ax.bbox.width * self.pairs_per_pixel), 16)
+
+
+def plot_decimated(ax, time, values, *args, **kwargs):
+    ''' Drop-in for ax.plot(time, values, *args, **kwargs) of a long signal, drawn as a DecimatedLine. OUTPUT: the Line2D. '''
+    return DecimatedLine(ax, time, values, *args, **kwargs).line
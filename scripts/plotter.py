@@ -27,13 +27,14 @@
  ****************************************************************************** '''
 #!/usr/bin/env python3
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-import pyxdf
 import yaml
 from os.path import join, abspath, dirname
 from scipy.fftpack import fft, ifft
+from data_logger_methods import load_columns
+from iso_time import load_time_seconds
+from plot_decimation import plot_decimated
 
 
 gelsight_mini_interface_dir = dirname(abspath(__file__))  # WHATEVER/digit_FT_sensors/scripts
@@ -44,52 +45,39 @@ with open(dir_to_config, 'r') as file:
     config = yaml.load(file, Loader=yaml.SafeLoader)
 
 
-def extract_seconds_from_timestamp(timestamp):
-    '''
-    Note: data sampling must take less than 60 min.
-    '''
-    time_in_seconds = timestamp.minute * 60 + timestamp.second + timestamp.microsecond / 1e6
-
-    return time_in_seconds
-
-
 def plotter(csv_file, data_array, main_title):
-    df = pd.read_csv(csv_file)
-    df['time'] = pd.to_datetime(df['time_stamp'])
-
-    df['time'] = df['time'].apply(extract_seconds_from_timestamp)
-    df['time'] = df['time'] - df['time'].min()  # shift time to zero
+    time = load_time_seconds(csv_file, 'time_stamp')  # seconds since the first sample, cached per file
 
     num_of_plots = 6
     figure, axis = plt.subplots(3, 2, figsize=(10, 2*num_of_plots), sharex=True)
     figure.suptitle(main_title, fontsize=10)
 
-    axis[0, 0].plot(np.array(df['time']), data_array[0])
+    plot_decimated(axis[0, 0], time, data_array[0])
     axis[0, 0].set_xlabel("time [s]")
     axis[0, 0].set_ylabel("Fx [N]")
     axis[0, 0].grid(True)
 
-    axis[1, 0].plot(np.array(df['time']), data_array[1])
+    plot_decimated(axis[1, 0], time, data_array[1])
     axis[1, 0].set_xlabel("time [s]")
     axis[1, 0].set_ylabel("Fy [N]")
     axis[1, 0].grid(True)
 
-    axis[2, 0].plot(np.array(df['time']), data_array[2])
+    plot_decimated(axis[2, 0], time, data_array[2])
     axis[2, 0].set_xlabel("time [s]")
     axis[2, 0].set_ylabel("Fz [N]")
     axis[2, 0].grid(True)
 
-    axis[0, 1].plot(np.array(df['time']), data_array[3])
+    plot_decimated(axis[0, 1], time, data_array[3])
     axis[0, 1].set_xlabel("time [s]")
     axis[0, 1].set_ylabel("Tx [Nm]")
     axis[0, 1].grid(True)
 
-    axis[1, 1].plot(np.array(df['time']), data_array[4])
+    plot_decimated(axis[1, 1], time, data_array[4])
     axis[1, 1].set_xlabel("time [s]")
     axis[1, 1].set_ylabel("Ty [Nm]")
     axis[1, 1].grid(True)
 
-    axis[2, 1].plot(np.array(df['time']), data_array[5])
+    plot_decimated(axis[2, 1], time, data_array[5])
     axis[2, 1].set_xlabel("time [s]")
     axis[2, 1].set_ylabel("Tz [Nm]")
     axis[2, 1].grid(True)
@@ -102,7 +90,7 @@ def plotter(csv_file, data_array, main_title):
 
 def plot_FT(csv_file_name):
 
-    df = pd.read_csv(csv_file_name)
+    df = load_columns(csv_file_name)
 
     # Extract actual joint currents
     Fx = np.array(df['Fx'])
@@ -118,7 +106,7 @@ def plot_FT(csv_file_name):
 
 def plot_csv_fabric_sensor(csv_file_name):
 
-    df = pd.read_csv(csv_file_name)
+    df = load_columns(csv_file_name)
 
     header = df.columns.tolist()
 
@@ -129,7 +117,7 @@ def plot_csv_fabric_sensor(csv_file_name):
     time_shifted_to_zero = [num - min_value for num in time]
 
     plt.figure()
-    plt.plot(time, values, label="fabric_sensor")
+    plot_decimated(plt.gca(), time, values, label="fabric_sensor")
 
     plt.title("fabric sensor (csv)", fontsize=15)
     plt.xlabel("time [s]", fontsize=15)
@@ -140,7 +128,7 @@ def plot_csv_fabric_sensor(csv_file_name):
 
 def plot_ur5e_tool_lin_velocity(csv_file_name):
 
-    df = pd.read_csv(csv_file_name)
+    df = load_columns(csv_file_name)
     header = df.columns.tolist()
     time = np.array(df[header[0]])
     lin_vel_x = np.array(df[header[1]])
@@ -151,9 +139,9 @@ def plot_ur5e_tool_lin_velocity(csv_file_name):
     ang_vel_y = np.array(df[header[5]])
     ang_vel_z = np.array(df[header[6]])
 
-    plt.plot(time, lin_vel_x, label="lin_vel_x")
-    plt.plot(time, lin_vel_y, label="lin_vel_y")
-    plt.plot(time, lin_vel_z, label="lin_vel_z")
+    plot_decimated(plt.gca(), time, lin_vel_x, label="lin_vel_x")
+    plot_decimated(plt.gca(), time, lin_vel_y, label="lin_vel_y")
+    plot_decimated(plt.gca(), time, lin_vel_z, label="lin_vel_z")
 
     plt.title("UR5e actual tool velocity", fontsize=15)
     plt.xlabel("time [s]", fontsize=15)
@@ -164,7 +152,7 @@ def plot_ur5e_tool_lin_velocity(csv_file_name):
 
 def plot_img_velocity_estimation(csv_file_name):
 
-    df = pd.read_csv(csv_file_name)
+    df = load_columns(csv_file_name)
 
     header = df.columns.tolist()
 
@@ -183,12 +171,12 @@ def plot_img_velocity_estimation(csv_file_name):
     filtered_signal = ifft(fft_signal_filtered)
 
     plt.subplot(2, 1, 1)
-    plt.plot(time, vel, label="vel")
+    plot_decimated(plt.gca(), time, vel, label="vel")
     plt.xlabel("time [s]", fontsize=15)
     plt.ylabel("velocity from images [m/s^2]", fontsize=15)
 
     plt.subplot(2, 1, 2)
-    plt.plot(time, np.real(filtered_signal), label="Filtered Signal")
+    plot_decimated(plt.gca(), time, np.real(filtered_signal), label="Filtered Signal")
     plt.xlabel("time [s]", fontsize=15)
     plt.ylabel("velocity after filtering [m/s^2]", fontsize=15)
 
@@ -197,7 +185,7 @@ def plot_img_velocity_estimation(csv_file_name):
 
 def plot_csv_ur5e_wrench(csv_file_name):
 
-    df = pd.read_csv(csv_file_name)
+    df = load_columns(csv_file_name)
     header = df.columns.tolist()
     time = np.array(df[header[0]])
     F_x = np.array(df[header[1]])
@@ -208,9 +196,9 @@ def plot_csv_ur5e_wrench(csv_file_name):
     T_y = np.array(df[header[5]])
     T_z = np.array(df[header[6]])
 
-    plt.plot(time, F_x, label="Force_x")
-    plt.plot(time, F_y, label="Force_y")
-    plt.plot(time, F_z, label="Force_z")
+    plot_decimated(plt.gca(), time, F_x, label="Force_x")
+    plot_decimated(plt.gca(), time, F_y, label="Force_y")
+    plot_decimated(plt.gca(), time, F_z, label="Force_z")
 
     plt.title("UR5e wrench (tools' FT)", fontsize=15)
     plt.xlabel("time [s]", fontsize=15)
@@ -222,27 +210,18 @@ def plot_csv_ur5e_wrench(csv_file_name):
 
 def plot_various_data():
     
-    df_est_vel = pd.read_csv(config["plotter"]["img_velocity_estimation"])
-    # df_fabric = pd.read_csv(config["plotter"]["fabric_data"])
-    df_time_synch_fabric = pd.read_csv(config["plotter"]["time_synched_fabric_data"])
-    df_time_synched_ur5e_tool_velocity = pd.read_csv(config["plotter"]["time_synched_ur5e_tool_velocity"])
-    df_time_synched_ur5e_wrench = pd.read_csv(config["plotter"]["time_synched_ur5e_wrench"])
+    df_est_vel = load_columns(config["plotter"]["img_velocity_estimation"])
+    # df_fabric = load_columns(config["plotter"]["fabric_data"])
+    df_time_synched = load_columns(config["plotter"]["time_synched_data"])  # aligned table of time_synch_fabric_gelsight.py
     
     header_est_vel = df_est_vel.columns.tolist()
     time_est_vel = np.array(df_est_vel[header_est_vel[0]])[1:]
     est_vel = np.array(df_est_vel[header_est_vel[1]])[1:]  # discarding the first element (inf)
 
-    header_time_synch_fabric = df_time_synch_fabric.columns.tolist()
-    time_synch_fabric_time = np.array(df_time_synch_fabric[header_time_synch_fabric[0]])
-    time_synch_fabric_voltage = np.array(df_time_synch_fabric[header_time_synch_fabric[1]])
-
-    header_time_synch_ur5e_tool_velocity = df_time_synched_ur5e_tool_velocity.columns.tolist()
-    time_synch_ur5e_tool_velocity_time = np.array(df_time_synched_ur5e_tool_velocity[header_time_synch_ur5e_tool_velocity[0]])
-    time_synch_ur5e_tool_velocity = np.array(df_time_synched_ur5e_tool_velocity[header_time_synch_ur5e_tool_velocity[1]])
-
-    header_time_synch_ur5e_wrench = df_time_synched_ur5e_wrench.columns.tolist()
-    time_synch_ur5e_wrench_time = np.array(df_time_synched_ur5e_wrench[header_time_synch_ur5e_wrench[0]])
-    time_synch_ur5e_wrench = np.array(df_time_synched_ur5e_wrench[header_time_synch_ur5e_wrench[1]])
+    time_synched = np.array(df_time_synched['time'])
+    time_synch_fabric_voltage = np.array(df_time_synched['voltage'])
+    time_synch_ur5e_tool_velocity = np.array(df_time_synched['tool_vel_y'])
+    time_synch_ur5e_wrench = np.array(df_time_synched['Fy'])
 
     
     # Perform FFT
@@ -255,19 +234,22 @@ def plot_various_data():
     plt.figure()
 
     plt.subplot(4, 1, 1)
-    plt.plot(time_synch_ur5e_wrench_time, time_synch_ur5e_wrench,'b-.')
+    synched = ~np.isnan(time_synch_ur5e_wrench)  # NaN where the stream has no sample (e.g. gaps)
+    plot_decimated(plt.gca(), time_synched[synched], time_synch_ur5e_wrench[synched],'b-.')
     plt.ylabel("ur5e tool force [N]", fontsize=8)
 
     plt.subplot(4, 1, 2)
-    plt.plot(time_synch_ur5e_tool_velocity_time, time_synch_ur5e_tool_velocity,'b-.')
+    synched = ~np.isnan(time_synch_ur5e_tool_velocity)
+    plot_decimated(plt.gca(), time_synched[synched], time_synch_ur5e_tool_velocity[synched],'b-.')
     plt.ylabel("ur5e tool linear vel [m/s^2]", fontsize=8)
 
     plt.subplot(4, 1, 3)
-    plt.plot(time_synch_fabric_time, time_synch_fabric_voltage,'b-.')
+    synched = ~np.isnan(time_synch_fabric_voltage)
+    plot_decimated(plt.gca(), time_synched[synched], time_synch_fabric_voltage[synched],'b-.')
     plt.ylabel("synched voltage [v]", fontsize=8)
 
     plt.subplot(4, 1, 4)
-    plt.plot(time_est_vel, est_vel,'b-.')
+    plot_decimated(plt.gca(), time_est_vel, est_vel,'b-.')
     plt.ylabel("estimated velocity (gelsight) [m/s^2]", fontsize=8)
 
     # plt.subplot(4, 1, 5)
@@ -0,0 +1,137 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: replay_camera.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Drop-in replacement of gsdevice.Camera that replays a recording (hdf5 file
+ * of save_img_in_hdf5, GelSightMini stream of an xdf file, see
+ * frame_sources.py) instead of reading the sensor, so the live scripts can be
+ * run, benchmarked and regression-tested without hardware. Frames are served
+ * at their recorded timing, at a fixed rate, or as fast as the consumer
+ * reads them.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import time
+from frame_sources import open_frame_source
+
+
+# Replay timing of ReplayCamera
+#   recorded: frames are served at their recorded time stamps (scaled by 'speed')
+#   fixed:    frames are served at 'rate' frames per second
+#   fast:     frames are served as soon as they are asked for
+REPLAY_MODES = ('recorded', 'fixed', 'fast')
+
+
+class ReplayCamera:
+    '''
+    INPUT:
+        - 'source': path of an .h5/.xdf recording, or a frame source object (see frame_sources.py).
+        - 'mode': one of REPLAY_MODES; 'rate' [fps] is used by 'fixed', 'speed' by 'recorded'.
+        - 'loop': start over at the end of the recording instead of raising EOFError from get_image().
+        - 'first_frame', 'last_frame': range of frames replayed (last excluded, None for the end).
+    Like gsdevice.Camera: connect() then get_image(); 'while_condition' turns False at the end of the recording.
+    '''
+
+    def __init__(self, source, mode='recorded', rate=25.0, speed=1.0, loop=False, first_frame=0, last_frame=None,
+                 stream_name='GelSightMini'):
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"replay mode must be one of {REPLAY_MODES}, not {mode}")
+
+        self.source = open_frame_source(source, stream_name=stream_name) if isinstance(source, str) else source
+        self.mode = mode
+        self.rate = rate
+        self.speed = speed
+        self.loop = loop
+        self.first_frame = first_frame
+        self.last_frame = last_frame
+
+        self.num_frames = 0  # frames served since connect()
+        self.while_condition = False
+        self._frames = None
+
+    def connect(self):
+        self.num_frames = 0
+        self.while_condition = True
+        self._restart()
+
+    def disconnect(self):
+        self._frames = None
+        self.while_condition = False
+
+    def close(self):
+        self.disconnect()
+
+    def get_image(self):
+        ''' Next frame of the recording, once it is due. '''
+        if self._frames is None:
+            raise RuntimeError("ReplayCamera is not connected")
+
+        index, frame = next(self._frames, (None, None))
+        if index is None:
+            if not self.loop:
+                self.while_condition = False
+                raise EOFError("end of the replayed recording")
+            self._restart()
+            index, frame = next(self._frames)
+
+        delay = self._due(index) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        self.num_frames = self.num_frames + 1
+        return frame
+
+    def _restart(self):
+        self._frames = self.source.read(self.first_frame, self.last_frame)
+        self._start_time = time.monotonic()
+        self._num_served = 0
+        if self.mode == 'recorded':
+            self._time_stamps = self.source.time_stamps
+            self._first_time_stamp = self._time_stamps[self.first_frame]
+
+    def _due(self, index):
+        ''' time.monotonic() at which frame 'index' is to be served. '''
+        self._num_served = self._num_served + 1
+
+        if self.mode == 'recorded':
+            return self._start_time + (self._time_stamps[index] - self._first_time_stamp) / self.speed
+        if self.mode == 'fixed':
+            return self._start_time + (self._num_served - 1) / self.rate
+
+        return 0.0
+
+
+def add_replay_arguments(parser):
+    ''' --replay/--replay-mode/--replay-rate/--replay-speed/--replay-loop options of the live scripts. '''
+    parser.add_argument('--replay', default=None, help="replay this .h5/.xdf recording instead of reading the sensor")
+    parser.add_argument('--replay-mode', choices=REPLAY_MODES, default='recorded')
+    parser.add_argument('--replay-rate', type=float, default=25.0, help="frames per second of the 'fixed' replay mode")
+    parser.add_argument('--replay-speed', type=float, default=1.0, help="speed factor of the 'recorded' replay mode")
+    parser.add_argument('--replay-loop', action='store_true', help="start over at the end of the recording")
+
+
+def replay_camera_from_args(args):
+    ''' ReplayCamera configured by add_replay_arguments options, None when no --replay was given. '''
+    if args.replay is None:
+        return None
+
+    return ReplayCamera(args.replay, args.replay_mode, args.replay_rate, args.replay_speed, args.replay_loop)
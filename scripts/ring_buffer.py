@@ -0,0 +1,160 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: ring_buffer.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Preallocated, thread-safe ring buffer of time stamped samples (e.g. camera
+ * frames) used to hand data from a producer thread to a consumer thread.
+ * When the buffer is full the oldest sample is overwritten and counted as
+ * dropped, so a slow consumer never blocks the producer.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import threading
+import numpy as np
+
+
+class RingBuffer:
+    '''
+    'capacity' slots of 'sample_shape'/'dtype' allocated once, plus one float64 time stamp per slot.
+    Counters: 'num_put' samples written, 'num_get' samples consumed, 'dropped' samples overwritten
+    before being consumed, and 'max_depth' the largest number of pending samples seen.
+    '''
+
+    def __init__(self, capacity, sample_shape, dtype=np.uint8):
+        self.capacity = capacity
+        self.samples = np.empty((capacity,) + tuple(sample_shape), dtype=dtype)
+        self.time_stamps = np.zeros(capacity)
+
+        self.num_put = 0
+        self.num_get = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+        self._head = 0  # next slot to write
+        self._depth = 0
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        return self._depth
+
+    @property
+    def depth(self):
+        ''' Number of samples waiting to be consumed. '''
+        return self._depth
+
+    def put(self, sample, time_stamp):
+        ''' Copy 'sample' into the next slot, overwriting the oldest pending sample if the buffer is full. '''
+        with self._condition:
+            np.copyto(self.samples[self._head], sample)
+            self.time_stamps[self._head] = time_stamp
+            self._head = (self._head + 1) % self.capacity
+            self.num_put = self.num_put + 1
+
+            if self._depth == self.capacity:
+                self.dropped = self.dropped + 1
+            else:
+                self._depth = self._depth + 1
+            self.max_depth = max(self.max_depth, self._depth)
+
+            self._condition.notify_all()
+
+    def put_chunk(self, samples, time_stamps):
+        ''' put() for a block of samples at once (two slice copies at most); only the last 'capacity' are kept. '''
+        count = len(time_stamps)
+        if count == 0:
+            return
+
+        with self._condition:
+            kept = min(count, self.capacity)
+            slots = (self._head + np.arange(count - kept, count)) % self.capacity
+            self.samples[slots] = samples[count - kept:]
+            self.time_stamps[slots] = time_stamps[count - kept:]
+            self._head = (self._head + count) % self.capacity
+            self.num_put = self.num_put + count
+
+            overflow = max(self._depth + count - self.capacity, 0)
+            self.dropped = self.dropped + overflow
+            self._depth = self._depth + count - overflow
+            self.max_depth = max(self.max_depth, self._depth)
+
+            self._condition.notify_all()
+
+    def get(self, out=None, timeout=None):
+        '''
+        Pop the oldest pending sample, waiting up to 'timeout' seconds for one.
+        The sample is copied into 'out' (or a new array). OUTPUT: (sample, time_stamp), or (None, None) on timeout.
+        '''
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._depth > 0, timeout):
+                return None, None
+
+            tail = (self._head - self._depth) % self.capacity
+            if out is None:
+                out = self.samples[tail].copy()
+            else:
+                np.copyto(out, self.samples[tail])
+
+            self._depth = self._depth - 1
+            self.num_get = self.num_get + 1
+
+            return out, self.time_stamps[tail]
+
+    def latest(self, out=None):
+        ''' Copy of the most recently written sample without consuming anything. OUTPUT: (sample, time_stamp) or (None, None). '''
+        with self._condition:
+            if self.num_put == 0:
+                return None, None
+
+            last = (self._head - 1) % self.capacity
+            if out is None:
+                out = self.samples[last].copy()
+            else:
+                np.copyto(out, self.samples[last])
+
+            return out, self.time_stamps[last]
+
+    def wait_for_put(self, num_put, timeout=None):
+        ''' Wait up to 'timeout' seconds until more than 'num_put' samples have been written. OUTPUT: True if so. '''
+        with self._condition:
+            return self._condition.wait_for(lambda: self.num_put > num_put, timeout)
+
+    def recent(self, count):
+        '''
+        Copies of the last 'count' written samples (fewer if not available), oldest first, whether consumed or not.
+        OUTPUT: (samples, time_stamps).
+        '''
+        with self._condition:
+            slots = self.recent_slots(count)
+            return self.samples[slots], self.time_stamps[slots]
+
+    def recent_slots(self, count=None):
+        '''
+        Slots of the last 'count' (default: all kept) written samples, oldest first, to index 'samples'/'time_stamps'
+        without copying the samples; they stay valid until the next put (for a single thread doing both).
+        '''
+        count = min(self.capacity if count is None else count, self.num_put, self.capacity)
+        return (self._head - count + np.arange(count)) % self.capacity
+
+    def stats(self):
+        with self._condition:
+            return {'put': self.num_put, 'get': self.num_get, 'dropped': self.dropped,
+                    'depth': self._depth, 'max_depth': self.max_depth}
@@ -7,6 +7,12 @@
  *
  * Description:
  * This code interfaces with the gelsight mini sensor to detect slip in object.
+ * Slip detection service: every frame is compared to the previous one
+ * (grayscale, absdiff, threshold, pixel count) in preallocated buffers, the
+ * number of changed pixels is the slip score, and a debounced slip start/end
+ * event is derived from it. Score and events are published with monotonic
+ * time stamps over LSL and/or a local UDP socket as soon as each frame is
+ * processed, and every stage keeps a latency histogram.
  *
  * License:
  * This code is licensed under the MIT License.
@@ -32,78 +38,313 @@
 #!/usr/bin/env python3
 
 import cv2
-import numpy as np
-import time
 import yaml
+import time
+import socket
+import struct
+import argparse
+import threading
+import numpy as np
 from os.path import join, abspath, dirname
-from gelsight import gsdevice 
-from datetime import datetime
-from data_logger_methods import setup_csv, save_to_csv
-
-
-img_csv_file_name = 'slip_detection.csv'  # TODO
-thresholded_value = 5  # TODO; The less, the more sensitive
-fieldnames = ['time', 'pixel_diff']  # TODO
-img_buff = [] 
+from pylsl import StreamInfo, StreamOutlet, local_clock
+from gelsight_camera import AsyncGelsightCamera
+from replay_camera import add_replay_arguments, replay_camera_from_args
+from data_logger_methods import CsvSink
+from latency_histogram import LatencyHistogram, format_latencies
+from contact_roi import ContactRoi, pyramid_down, pyramid_buffers, roi_slices
 
 
 gelsight_mini_interface_dir = dirname(abspath(__file__))  # WHATEVER/digit_FT_sensors/scripts
 parent_dir = join(gelsight_mini_interface_dir, '..')
 parent_dir_abs = abspath(parent_dir)
 dir_to_config = join(parent_dir_abs, 'config', 'config.yml')
-with open(dir_to_config, 'r') as file:
-    config = yaml.load(file, Loader=yaml.SafeLoader)
 
-setup_csv(config["slip_detection"]["img_slip_detection_csv"], fieldnames)
-    
-sensor = gsdevice.Camera("GelSight Mini")
-sensor.connect()
 
+fieldnames = ['time', 'pixel_diff']
 
-def get_iso8601_time():
-    current_time = datetime.now().isoformat()
+# Slip events
+SLIP_NONE = 0
+SLIP_START = 1
+SLIP_END = -1
 
-    return current_time
+# Datagram of UdpSlipPublisher: time stamp [s] (float64), score (int32), event (int8), little endian.
+SLIP_MESSAGE = struct.Struct('<dib')
 
 
-if __name__ == '__main__':
+class SlipDetector:
+    '''
+    INPUT:
+        - 'pixel_threshold': a pixel has changed when its gray level differs by more than this between frames
+          (the less, the more sensitive).
+        - 'slip_score': number of changed pixels from which a frame counts as slipping.
+        - 'debounce_frames': consecutive slipping frames needed to raise SLIP_START.
+        - 'release_frames': consecutive non-slipping frames needed to raise SLIP_END.
+        - 'pyramid_levels': frames are compared after being reduced 2**levels times per side (cv2.pyrDown); the
+          score is scaled back to full-resolution pixels.
+    'gray' and 'diff' hold the last (reduced) grayscale frame and thresholded difference (buffers reused by the next call).
+    '''
+
+    def __init__(self, pixel_threshold=5, slip_score=500, debounce_frames=2, release_frames=5, pyramid_levels=0):
+        self.pixel_threshold = pixel_threshold
+        self.slip_score = slip_score
+        self.debounce_frames = debounce_frames
+        self.release_frames = release_frames
+        self.pyramid_levels = pyramid_levels
+
+        self.slipping = False
+        self._run = 0  # consecutive frames disagreeing with the current state
+        self._shape = None
+        self._has_previous = False
+
+    @property
+    def gray(self):
+        return self._gray[0]
+
+    @property
+    def diff(self):
+        return self._diff
+
+    def update(self, frame, roi=None):
+        '''
+        Process one BGR (or gray) frame; with 'roi' ((x, y, width, height) in frame pixels, e.g. from
+        contact_roi.ContactRoi) only changes inside it are counted.
+        OUTPUT: (score, event), event one of SLIP_NONE/SLIP_START/SLIP_END.
+        '''
+        self._allocate(frame.shape[:2])
+        self._gray.reverse()  # the previous frame's buffer becomes [1], [0] is overwritten
+        gray, previous = self._gray
+
+        if frame.ndim == 2:
+            np.copyto(self._full_gray, frame)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._full_gray)
+        np.copyto(gray, pyramid_down(self._full_gray, self.pyramid_levels, self._pyramid))
+
+        if not self._has_previous:
+            self._has_previous = True
+            return 0, SLIP_NONE
+
+        if roi is not None:
+            x, y, w, h = (value >> self.pyramid_levels for value in roi)
+            roi = (x, y, max(w, 1), max(h, 1))
+        rows, columns = roi_slices(roi)
+
+        diff = self._diff[rows, columns]
+        if roi is not None:
+            self._diff.fill(0)
+        cv2.absdiff(previous[rows, columns], gray[rows, columns], dst=diff)
+        cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=diff)
+        score = cv2.countNonZero(diff) << (2 * self.pyramid_levels)
+
+        return score, self._debounce(score >= self.slip_score)
+
+    def reset(self):
+        self.slipping = False
+        self._run = 0
+        self._has_previous = False
+
+    def _debounce(self, slipping):
+        if slipping == self.slipping:
+            self._run = 0
+            return SLIP_NONE
+
+        self._run = self._run + 1
+        if self._run < (self.debounce_frames if slipping else self.release_frames):
+            return SLIP_NONE
+
+        self.slipping = slipping
+        self._run = 0
+        return SLIP_START if slipping else SLIP_END
+
+    def _allocate(self, shape):
+        if self._shape == shape:
+            return
+
+        self._shape = shape
+        self._full_gray = np.empty(shape, dtype=np.uint8)
+        self._pyramid = pyramid_buffers(shape, self.pyramid_levels)
+
+        small_shape = self._pyramid[-1].shape if self._pyramid else shape
+        self._gray = [np.empty(small_shape, dtype=np.uint8), np.empty(small_shape, dtype=np.uint8)]
+        self._diff = np.empty(small_shape, dtype=np.uint8)
+        self._has_previous = False
 
-    img_buff = sensor.get_image()
-    img_buff = cv2.cvtColor(img_buff, cv2.COLOR_BGR2GRAY)
 
-    while True:
+class LslSlipPublisher:
+    '''
+    Two LSL outlets: '<name>' with channels (score, slipping) for every frame, and '<name>_events' with a
+    'slip_start'/'slip_end' marker per event. Samples are sent right away (chunk_size=1), not batched by LSL.
+    '''
 
-        start = time.time()
-        img_gray = sensor.get_image()
-        end = time.time()
-        # print("slip detection get image: ", end - start)
+    def __init__(self, name='GelSightSlip'):
+        info = StreamInfo(name, 'Slip', 2, 0, 'float32')
+        channels = info.desc().append_child('channels')
+        for label in ('score', 'slipping'):
+            channels.append_child('channel').append_child_value('label', label)
+        self.outlet = StreamOutlet(info, chunk_size=1)
 
-        start = time.time()
-        img_gray = cv2.cvtColor(img_gray, cv2.COLOR_BGR2GRAY)
-        end = time.time()
-        # print(end - start)
+        self.event_outlet = StreamOutlet(StreamInfo(name + '_events', 'Markers', 1, 0, 'string'), chunk_size=1)
+        self._sample = [0.0, 0.0]
+
+    def publish(self, time_stamp, score, event, slipping):
+        self._sample[0] = score
+        self._sample[1] = float(slipping)
+        self.outlet.push_sample(self._sample, time_stamp)
+
+        if event != SLIP_NONE:
+            self.event_outlet.push_sample(['slip_start' if event == SLIP_START else 'slip_end'], time_stamp)
+
+
+class UdpSlipPublisher:
+    ''' One SLIP_MESSAGE datagram per frame to 'address' (e.g. the gripper controller on this machine); never blocks. '''
+
+    def __init__(self, address=('127.0.0.1', 5005)):
+        self.address = address
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self._message = bytearray(SLIP_MESSAGE.size)
+        self.dropped = 0
+
+    def publish(self, time_stamp, score, event, slipping):
+        SLIP_MESSAGE.pack_into(self._message, 0, time_stamp, score, event)
+        try:
+            self.socket.sendto(self._message, self.address)
+        except (BlockingIOError, ConnectionRefusedError):
+            self.dropped = self.dropped + 1
+
+
+class SlipDetectionService:
+    '''
+    Live loop: grab a frame, run the SlipDetector and publish (time_stamp, score, event) to every publisher.
+    INPUT:
+        - 'sensor': an AsyncGelsightCamera (frames carry their capture time stamp), or any object with get_image()
+          (e.g. gsdevice.Camera, frames are then stamped when get_image returns).
+        - 'clock': time stamp source, monotonic, the camera's clock for an AsyncGelsightCamera; local_clock() keeps
+          the LSL time base.
+        - 'csv_sink': optional CsvSink receiving (time, pixel_diff) rows.
+        - 'roi_tracker': optional contact_roi.ContactRoi; slip is then only looked for around the contact patch.
+    'latencies' holds one LatencyHistogram per stage: grab (waiting for the frame), detect, publish, and total
+    (from frame capture to published).
+    '''
+
+    STAGES = ('grab', 'detect', 'publish', 'total')
+
+    def __init__(self, sensor, detector, publishers=(), clock=time.monotonic, csv_sink=None, roi_tracker=None):
+        self.sensor = sensor
+        self.detector = detector
+        self.roi_tracker = roi_tracker
+        self.publishers = list(publishers)
+        self.clock = clock
+        self.csv_sink = csv_sink
+
+        self.num_frames = 0
+        self.num_events = 0
+        self._frame_number = -1
+        self.latencies = {stage: LatencyHistogram() for stage in self.STAGES}
+
+    def step(self):
+        ''' Process one frame. OUTPUT: (time_stamp, score, event). '''
+        start = time.perf_counter()
+        if isinstance(self.sensor, AsyncGelsightCamera):
+            frame, time_stamp, self._frame_number = self.sensor.wait_next(after=self._frame_number)
+        else:
+            frame = self.sensor.get_image()
+            time_stamp = self.clock()
+        grabbed = time.perf_counter()
+
+        roi = None if self.roi_tracker is None else self.roi_tracker.update(frame)
+        score, event = self.detector.update(frame, roi)
+        detected = time.perf_counter()
+
+        for publisher in self.publishers:
+            publisher.publish(time_stamp, score, event, self.detector.slipping)
+        published = time.perf_counter()
+
+        if self.csv_sink is not None:
+            self.csv_sink.write_row((time_stamp, score))
+
+        self.latencies['grab'].add(grabbed - start)
+        self.latencies['detect'].add(detected - grabbed)
+        self.latencies['publish'].add(published - detected)
+        self.latencies['total'].add(self.clock() - time_stamp)
+
+        self.num_frames = self.num_frames + 1
+        if event != SLIP_NONE:
+            self.num_events = self.num_events + 1
+
+        return time_stamp, score, event
+
+    def run(self, stop_event, stats_period=None):
+        ''' Process frames until 'stop_event' is set, printing the latency histograms every 'stats_period' seconds. '''
+        last_stats = time.monotonic()
+
+        while not stop_event.is_set():
+            self.step()
+
+            if stats_period and time.monotonic() - last_stats >= stats_period:
+                last_stats = time.monotonic()
+                print(f"frames: {self.num_frames}, slip events: {self.num_events}")
+                print(format_latencies(self.latencies))
+                for histogram in self.latencies.values():
+                    histogram.reset()
+
+
+if __name__ == '__main__':
 
-        difference = cv2.absdiff(img_buff, img_gray)
+    with open(dir_to_config, 'r') as file:
+        config = yaml.load(file, Loader=yaml.SafeLoader)
 
-        img_buff = img_gray
+    parser = argparse.ArgumentParser(description="Detect slip from gelsight mini frames and publish it live.")
+    parser.add_argument('--pixel-threshold', type=int, default=5, help="gray level change of a changed pixel")
+    parser.add_argument('--slip-score', type=int, default=500, help="changed pixels from which a frame is slipping")
+    parser.add_argument('--debounce-frames', type=int, default=2)
+    parser.add_argument('--release-frames', type=int, default=5)
+    parser.add_argument('--pyramid-levels', type=int, default=0, help="compare frames reduced 2**levels times per side")
+    parser.add_argument('--roi', action='store_true', help="only look for slip around the tracked contact patch")
+    parser.add_argument('--no-lsl', action='store_true', help="do not publish on LSL")
+    parser.add_argument('--udp', default=None, help="also send every frame's score to host:port")
+    parser.add_argument('--csv', action='store_true', help="log (time, pixel_diff) to 'img_slip_detection_csv' of config.yml")
+    parser.add_argument('--stats-period', type=float, default=5.0, help="seconds between latency printouts")
+    add_replay_arguments(parser)
+    args = parser.parse_args()
 
-        _, thresholded_diff = cv2.threshold(difference, thresholded_value, 255, cv2.THRESH_BINARY)
+    replay = replay_camera_from_args(args)
+    if replay is not None and args.replay_mode == 'fast':
+        sensor = replay  # every frame is processed, back to back: deterministic throughput benchmark
+    else:
+        sensor = AsyncGelsightCamera(replay, clock=local_clock)
+    sensor.connect()
 
-        # Calculate the number of differing pixels
-        non_zero_count = np.count_nonzero(thresholded_diff)
-        current_time = get_iso8601_time()
+    publishers = []
+    if not args.no_lsl:
+        publishers.append(LslSlipPublisher())
+    if args.udp:
+        host, port = args.udp.rsplit(':', 1)
+        publishers.append(UdpSlipPublisher((host, int(port))))
 
-        data = {
-            fieldnames[0]: current_time,
-            fieldnames[1]: np.array([non_zero_count]).tolist()
-        }
+    detector = SlipDetector(args.pixel_threshold, args.slip_score, args.debounce_frames, args.release_frames,
+                            args.pyramid_levels)
+    roi_tracker = ContactRoi() if args.roi else None
+    csv_sink = CsvSink(config["slip_detection"]["img_slip_detection_csv"], fieldnames) if args.csv else None
+    service = SlipDetectionService(sensor, detector, publishers, clock=local_clock, csv_sink=csv_sink,
+                                   roi_tracker=roi_tracker)
 
-        row = [data[fieldnames[0]]] + data[fieldnames[1]]
-        # save_to_csv(config["slip_detection"]["img_slip_detection_csv"], img_csv_file_name, row)
+    stop_event = threading.Event()
+    start_time = time.monotonic()
+    try:
+        service.run(stop_event, args.stats_period)
+    except KeyboardInterrupt:
+        pass
+    except (EOFError, RuntimeError) as error:
+        if not isinstance(error, EOFError) and not isinstance(error.__cause__, EOFError):
+            raise
+        print("end of the replayed recording")
+    finally:
+        sensor.close()
+        if csv_sink is not None:
+            csv_sink.close()
 
-        # print(f"The images have {non_zero_count} differing pixels.")
-        
-        # cv2.imshow('Difference', difference)
-        # cv2.waitKey(0)
-        # cv2.destroyAllWindows()
-    
+        elapsed = time.monotonic() - start_time
+        print(f"frames: {service.num_frames} in {elapsed:.2f} s ({service.num_frames / elapsed:.1f} fps), "
+              f"slip events: {service.num_events}")
+        print(format_latencies(service.latencies))
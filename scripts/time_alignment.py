@@ -0,0 +1,189 @@
+''' ******************************************************************************
+ * Project: gelsight mini Sensor Interface
+ * File: time_alignment.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Time alignment of sensor streams (fabric voltage, ur5e wrench / tool
+ * velocity / joint states, gelsight frames, ...) on sorted time stamp arrays.
+ * Every stream is resampled onto a common timebase with one np.searchsorted
+ * and one vectorized gather, using a per-stream interpolation policy:
+ *   nearest: value of the closest sample in time
+ *   linear:  linear interpolation between the samples around each time
+ *   zoh:     zero-order hold, value of the last sample at or before each time
+ * Times outside a stream's recording (or farther than 'max_gap' from its
+ * samples) give NaN, or -1 for sample indices.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import numpy as np
+
+
+INTERPOLATIONS = ('nearest', 'linear', 'zoh')
+
+
+def sorted_stream(time_stamps, values=None):
+    ''' (time_stamps, values) as float64 time stamps in increasing order (stable sort only when needed). '''
+    time_stamps = np.asarray(time_stamps, dtype=np.float64)
+    if len(time_stamps) < 2 or np.all(time_stamps[1:] >= time_stamps[:-1]):
+        return time_stamps, values
+
+    order = np.argsort(time_stamps, kind='stable')
+    return time_stamps[order], None if values is None else np.asarray(values)[order]
+
+
+def nearest_index(time_stamps, times):
+    '''
+    Index of the sample closest to each of 'times' (sorted 'time_stamps'; binary search, not a full scan).
+    Raises ValueError for an empty stream, which has no closest sample (see sample_indices for -1 instead).
+    '''
+    time_stamps = np.asarray(time_stamps, dtype=np.float64)
+    times = np.asarray(times, dtype=np.float64)
+    if len(time_stamps) == 0:
+        raise ValueError("no nearest sample in an empty stream")
+
+    after = np.clip(np.searchsorted(time_stamps, times), 1, len(time_stamps) - 1)
+    before = after - 1
+    return np.where(times - time_stamps[before] <= time_stamps[after] - times, before, after) \
+        if len(time_stamps) > 1 else np.zeros(times.shape, dtype=np.intp)
+
+
+def crop_indices(time_stamps, start_time, stop_time):
+    ''' (first, last) index of the samples nearest to 'start_time' and 'stop_time', e.g. to crop a stream to another. '''
+    first, last = nearest_index(time_stamps, [start_time, stop_time])
+    return int(first), int(last)
+
+
+def sample_indices(time_stamps, timebase, interpolation='nearest', max_gap=None):
+    '''
+    Index of the sample of a (sorted) stream used at each time of 'timebase', -1 where there is none.
+    Handy for streams that are not interpolated, e.g. gelsight frames (frame numbers). 'interpolation' is
+    'nearest' or 'zoh'; with 'max_gap' [s], samples farther than that from the time are not used.
+    '''
+    if interpolation not in ('nearest', 'zoh'):
+        raise ValueError(f"sample indices need 'nearest' or 'zoh' interpolation, not {interpolation}")
+
+    time_stamps = np.asarray(time_stamps, dtype=np.float64)
+    timebase = np.asarray(timebase, dtype=np.float64)
+    if len(time_stamps) == 0:
+        return np.full(timebase.shape, -1, dtype=np.intp)
+
+    if interpolation == 'zoh':
+        indices = np.searchsorted(time_stamps, timebase, side='right') - 1
+    else:
+        indices = nearest_index(time_stamps, timebase)
+
+    outside = (timebase < time_stamps[0]) | (timebase > time_stamps[-1])
+    if max_gap is not None:
+        outside |= np.abs(timebase - time_stamps[np.maximum(indices, 0)]) > max_gap
+
+    indices[outside] = -1
+    return indices
+
+
+def resample(time_stamps, values, timebase, interpolation='linear', max_gap=None):
+    '''
+    Values of a (sorted) stream at every time of 'timebase'.
+    INPUT: 'values' is (N,) or (N, channels); 'interpolation' one of INTERPOLATIONS; with 'max_gap' [s], times whose
+    surrounding samples are farther apart than that (linear) or farther than that from the used sample (nearest/zoh)
+    give NaN, like times outside the stream.
+    OUTPUT: float64 array of shape (len(timebase),) or (len(timebase), channels).
+    '''
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"interpolation must be one of {INTERPOLATIONS}, not {interpolation}")
+
+    time_stamps = np.asarray(time_stamps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    timebase = np.asarray(timebase, dtype=np.float64)
+    resampled = np.full((len(timebase),) + values.shape[1:], np.nan)
+
+    if len(time_stamps) == 0:
+        return resampled
+
+    if interpolation != 'linear' or len(time_stamps) == 1:
+        indices = sample_indices(time_stamps, timebase, 'zoh' if interpolation == 'zoh' else 'nearest', max_gap)
+        valid = indices >= 0
+        resampled[valid] = values[indices[valid]]
+        return resampled
+
+    after = np.clip(np.searchsorted(time_stamps, timebase, side='right'), 1, len(time_stamps) - 1)
+    before = after - 1
+    span = time_stamps[after] - time_stamps[before]
+    weight = np.divide(timebase - time_stamps[before], span, out=np.zeros(len(timebase)), where=span > 0)
+    if values.ndim > 1:
+        weight = weight.reshape((-1,) + (1,) * (values.ndim - 1))
+
+    interpolated = values[before] + weight * (values[after] - values[before])
+
+    valid = (timebase >= time_stamps[0]) & (timebase <= time_stamps[-1])
+    if max_gap is not None:
+        valid &= span <= max_gap
+
+    resampled[valid] = interpolated[valid]
+    return resampled
+
+
+def common_timebase(time_stamps_list, rate=None, reference=None):
+    '''
+    Timebase covering the time all streams overlap: a uniform grid at 'rate' [Hz], or the time stamps of
+    'reference' (index into 'time_stamps_list') inside the overlap. Empty when the streams do not overlap
+    (or one of them is empty).
+    '''
+    if any(len(time_stamps) == 0 for time_stamps in time_stamps_list):
+        return np.zeros(0)
+
+    start = max(time_stamps[0] for time_stamps in time_stamps_list)
+    stop = min(time_stamps[-1] for time_stamps in time_stamps_list)
+
+    if stop < start:
+        return np.zeros(0)
+
+    if rate is not None:
+        return start + np.arange(int(np.floor((stop - start) * rate)) + 1) / rate
+
+    reference_time_stamps = time_stamps_list[0 if reference is None else reference]
+    first = np.searchsorted(reference_time_stamps, start, side='left')
+    last = np.searchsorted(reference_time_stamps, stop, side='right')
+    return reference_time_stamps[first:last]
+
+
+def align_streams(streams, timebase=None, interpolations=None, rate=None, reference=None, max_gaps=None):
+    '''
+    Resample several streams onto one timebase.
+    INPUT:
+        - 'streams': {name: (time_stamps, values)}, values (N,) or (N, channels).
+        - 'timebase': times to resample at; by default common_timebase(..., rate, reference) where 'reference'
+          is a stream name.
+        - 'interpolations', 'max_gaps': {name: policy / max gap [s]}, default 'linear' / None for unlisted streams.
+    OUTPUT: (timebase, {name: resampled values}).
+    '''
+    interpolations = interpolations or {}
+    max_gaps = max_gaps or {}
+    names = list(streams)
+    sorted_streams = {name: sorted_stream(*streams[name]) for name in names}
+
+    if timebase is None:
+        reference_index = None if reference is None else names.index(reference)
+        timebase = common_timebase([sorted_streams[name][0] for name in names], rate, reference_index)
+
+    aligned = {name: resample(time_stamps, values, timebase, interpolations.get(name, 'linear'), max_gaps.get(name))
+               for name, (time_stamps, values) in sorted_streams.items()}
+
+    return np.asarray(timebase, dtype=np.float64), aligned
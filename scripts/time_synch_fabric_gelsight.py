@@ -27,12 +27,12 @@
  ****************************************************************************** '''
 #!/usr/bin/env python3
 
+import argparse
 import numpy as np
-import cv2
 import yaml
 from os.path import join, abspath, dirname
-import pandas as pd
-from data_logger_methods import setup_csv, save_to_csv
+from data_logger_methods import save_columns, load_columns
+from time_alignment import INTERPOLATIONS, align_streams, crop_indices
 
 gelsight_mini_interface_dir = dirname(abspath(__file__))  # WHATEVER/digit_FT_sensors/scripts
 parent_dir = join(gelsight_mini_interface_dir, '..')
@@ -41,81 +41,58 @@ dir_to_config = join(parent_dir_abs, 'config', 'config.yml')
 with open(dir_to_config, 'r') as file:
     config = yaml.load(file, Loader=yaml.SafeLoader)
 
-if __name__ == '__main__':
-
-    estimated_vel = config["time_synch_fabric_gelsight"]["img_velocity_estimation"]
-
-    fabric_data = config["time_synch_fabric_gelsight"]["fabric_data"]
-    ur5e_tool_velocity = config["time_synch_fabric_gelsight"]["ur5e_tool_velocity"]
-    ur5e_wrench = config["time_synch_fabric_gelsight"]["ur5e_wrench"]
-
-    df_est_vel = pd.read_csv(estimated_vel)
-    est_vel_header = df_est_vel.columns.tolist()
-    est_vel_time = np.array(df_est_vel[est_vel_header[0]])
-    est_vel = np.array(df_est_vel[est_vel_header[1]])
-
-    time_synched_fabric_fieldnames = ['time', 'voltage']  # TODO
-    df_fabric_data = pd.read_csv(fabric_data)
-    fabric_header = df_fabric_data.columns.tolist()
-    fabric_time = np.array(df_fabric_data[fabric_header[0]])
-    fabric_voltage = np.array(df_fabric_data[fabric_header[1]])
-
-    time_synched_ur5e_tool_velocity_fieldnames = ['time', 'tool_vel_y']  # TODO
-    df_ur5e_tool_velocity = pd.read_csv(ur5e_tool_velocity)
-    ur5e_tool_velocity_header = df_ur5e_tool_velocity.columns.tolist()
-    ur5e_tool_velocity_time = np.array(df_ur5e_tool_velocity[ur5e_tool_velocity_header[0]])
-    ur5e_tool_velocity = np.array(df_ur5e_tool_velocity[ur5e_tool_velocity_header[2]])  # tool_vel_y
-
-    time_synched_ur5e_wrench_fieldnames = ['time', 'Fy']  # TODO
-    df_ur5e_wrench = pd.read_csv(ur5e_wrench)
-    ur5e_wrench_header = df_ur5e_wrench.columns.tolist()
-    ur5e_wrench_time = np.array(df_ur5e_wrench[ur5e_wrench_header[0]])
-    ur5e_wrench = np.array(df_ur5e_wrench[ur5e_wrench_header[2]])  # Fy
-    
-
-    init_index_fabric = np.where(np.abs(fabric_time - est_vel_time[0]) == np.abs(fabric_time - est_vel_time[0]).min())
-    final_index_fabric = np.where(np.abs(fabric_time - est_vel_time[-1]) == np.abs(fabric_time - est_vel_time[-1]).min())
-
-    init_index_ur5e_tool_velocity = np.where(np.abs(ur5e_tool_velocity_time - est_vel_time[0]) == np.abs(ur5e_tool_velocity_time - est_vel_time[0]).min())
-    final_index_ur5e_tool_velocity = np.where(np.abs(ur5e_tool_velocity_time - est_vel_time[-1]) == np.abs(ur5e_tool_velocity_time - est_vel_time[-1]).min())
+# Interpolation of each stream onto the gelsight timebase (see time_alignment.py)
+STREAM_INTERPOLATIONS = {'vel': 'zoh', 'voltage': 'linear', 'tool_vel_y': 'linear', 'Fy': 'linear'}
 
-    init_index_ur5e_wrench = np.where(np.abs(ur5e_wrench_time - est_vel_time[0]) == np.abs(ur5e_wrench_time - est_vel_time[0]).min())
-    final_index_ur5e_wrench = np.where(np.abs(ur5e_wrench_time - est_vel_time[-1]) == np.abs(ur5e_wrench_time - est_vel_time[-1]).min())
 
+def load_stream(file_name, column):
+    ''' (time, values) of the 'column'-th column of a file written by data_logger_methods (time is column 0). '''
+    df = load_columns(file_name)
+    header = df.columns.tolist()
+    return np.array(df[header[0]]), np.array(df[header[column]])
 
-    # setup_csv(config["time_synch_fabric_gelsight"]["time_synched_fabric_data"], time_synched_fabric_fieldnames)
-    # for i in range(init_index_fabric[0][0], final_index_fabric[0][0]):
 
-    #     data = {
-    #         time_synched_fabric_fieldnames[0]: fabric_time[i],
-    #         time_synched_fabric_fieldnames[1]: fabric_voltage[i]
-    #     }
+def parse_interpolations(options):
+    ''' {stream: interpolation} from 'stream=interpolation' options, on top of STREAM_INTERPOLATIONS. '''
+    interpolations = dict(STREAM_INTERPOLATIONS)
+    for option in options:
+        name, interpolation = option.split('=')
+        if name not in interpolations or interpolation not in INTERPOLATIONS:
+            raise ValueError(f"expected one of {list(interpolations)} = one of {INTERPOLATIONS}, not {option}")
+        interpolations[name] = interpolation
 
-    #     row = [data[time_synched_fabric_fieldnames[0]]] + [data[time_synched_fabric_fieldnames[1]]]
-    #     save_to_csv(config["time_synch_fabric_gelsight"]["time_synched_fabric_data"], row)
+    return interpolations
 
 
-    # setup_csv(config["time_synch_fabric_gelsight"]["time_synched_ur5e_tool_velocity"], time_synched_ur5e_tool_velocity_fieldnames)
-    # for i in range(init_index_ur5e_tool_velocity[0][0], final_index_ur5e_tool_velocity[0][0]):
-
-    #     data = {
-    #         time_synched_ur5e_tool_velocity_fieldnames[0]: ur5e_tool_velocity_time[i],
-    #         time_synched_ur5e_tool_velocity_fieldnames[1]: ur5e_tool_velocity[i]
-    #     }
-
-    #     row = [data[time_synched_ur5e_tool_velocity_fieldnames[0]]] + [data[time_synched_ur5e_tool_velocity_fieldnames[1]]]
-    #     save_to_csv(config["time_synch_fabric_gelsight"]["time_synched_ur5e_tool_velocity"], row)
-
-
-    # setup_csv(config["time_synch_fabric_gelsight"]["time_synched_ur5e_wrench"], time_synched_ur5e_wrench_fieldnames)
-    # for i in range(init_index_ur5e_wrench[0][0], final_index_ur5e_wrench[0][0]):
-
-    #     data = {
-    #         time_synched_ur5e_wrench_fieldnames[0]: ur5e_wrench_time[i],
-    #         time_synched_ur5e_wrench_fieldnames[1]: ur5e_wrench[i]
-    #     }
-
-    #     row = [data[time_synched_ur5e_wrench_fieldnames[0]]] + [data[time_synched_ur5e_wrench_fieldnames[1]]]
-    #     save_to_csv(config["time_synch_fabric_gelsight"]["time_synched_ur5e_wrench"], row)
-
+if __name__ == '__main__':
 
+    synch_config = config["time_synch_fabric_gelsight"]
+
+    parser = argparse.ArgumentParser(description="Resample fabric and ur5e data onto the gelsight velocity timebase.")
+    parser.add_argument('--rate', type=float, default=None,
+                        help="resample on a uniform grid at this rate [Hz] instead of the gelsight time stamps")
+    parser.add_argument('--interpolation', nargs='*', default=[], metavar='STREAM=METHOD',
+                        help=f"interpolation of a stream ({list(STREAM_INTERPOLATIONS)}), one of {INTERPOLATIONS}")
+    parser.add_argument('--output', default=synch_config.get("time_synched_data"),
+                        help="aligned table (.csv/.npz/.feather/.parquet)")
+    args = parser.parse_args()
+
+    streams = {
+        'vel': load_stream(synch_config["img_velocity_estimation"], 1),
+        'voltage': load_stream(synch_config["fabric_data"], 1),
+        'tool_vel_y': load_stream(synch_config["ur5e_tool_velocity"], 2),
+        'Fy': load_stream(synch_config["ur5e_wrench"], 2),
+    }
+
+    est_vel_time = streams['vel'][0]
+    for name, (time, _) in streams.items():
+        first, last = crop_indices(time, est_vel_time[0], est_vel_time[-1])
+        print(f"{name}: samples {first} to {last} overlap the gelsight recording")
+
+    timebase, aligned = align_streams(streams, interpolations=parse_interpolations(args.interpolation),
+                                      rate=args.rate, reference=None if args.rate else 'vel')
+
+    if args.output is not None:
+        fieldnames = ['time'] + list(aligned)
+        save_columns(args.output, fieldnames, [timebase] + [aligned[name] for name in aligned])
+        print(f"{len(timebase)} aligned samples saved to {args.output}")
@@ -35,10 +35,18 @@ import cv2
 import numpy as np
 import cv2
 import yaml
-import math
-from os.path import join, abspath, dirname
-import pandas as pd
-from data_logger_methods import setup_csv, save_to_csv
+import argparse
+from itertools import repeat
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from os.path import join, abspath, dirname, isdir, exists
+from scipy.spatial import cKDTree
+from contact_roi import ContactRoi
+from clock_sync import clock_corrections_file, load_clock_corrections
+from frame_index import frame_index_file
+from frame_sources import open_frame_source
+from marker_detection import MarkerDetector, VELOCITY_ESTIMATION_PARAMS, centroids_of
+from data_logger_methods import setup_csv, save_to_csv, save_columns, load_columns
 
 
 
@@ -46,104 +54,77 @@ gelsight_mini_interface_dir = dirname(abspath(__file__))  # WHATEVER/digit_FT_se
 parent_dir = join(gelsight_mini_interface_dir, '..')
 parent_dir_abs = abspath(parent_dir)
 dir_to_config = join(parent_dir_abs, 'config', 'config.yml')
-with open(dir_to_config, 'r') as file:
-    config = yaml.load(file, Loader=yaml.SafeLoader)
 
 
-def calc_vel_of_obj(current_centroids_list, prev_centroids_list, dt):
+# Result of matching every current centroid to its nearest previous centroid.
+#   displacements:   (N, 2) displacement of each current marker since the previous frame [m]
+#   matched_indices: (N,) index into the previous centroids of each current marker's match
+#   speeds:          (N,) per-marker speed [m/s]
+#   mean_speed, median_speed: over all markers [m/s] (inf when there is no previous frame to match)
+CentroidMatch = namedtuple('CentroidMatch', ['displacements', 'matched_indices', 'speeds', 'mean_speed', 'median_speed'])
 
-    min_euclidean_dist = np.inf
-    sum_min_velocity = 0
-    pixels_in_one_meter = 44000
 
-    for current_point in current_centroids_list:
-        for prev_point in prev_centroids_list:
+def calc_vel_of_obj(current_centroids_list, prev_centroids_list, dt, pixels_in_one_meter=44000):
+    '''
+    Nearest-neighbour matching of current to previous centroids (pixels) with a KD-tree, all markers at once.
+    OUTPUT: CentroidMatch; its 'mean_speed' [m/s] is the velocity of the object.
+    '''
+    current = np.asarray(current_centroids_list, dtype=np.float64).reshape(-1, 2)
+    prev = np.asarray(prev_centroids_list, dtype=np.float64).reshape(-1, 2)
 
-            euclidean_dist = math.sqrt(((current_point[0] - prev_point[0]) / pixels_in_one_meter)**2
-                                        + ((current_point[1] - prev_point[1]) / pixels_in_one_meter)**2)
+    if len(prev) == 0 or len(current) == 0:
+        speed = np.inf if len(prev) == 0 else np.nan
+        return CentroidMatch(np.zeros((0, 2)), np.zeros(0, dtype=int), np.zeros(0), speed, speed)
 
-            min_euclidean_dist = min(min_euclidean_dist, euclidean_dist)
+    distances, matched_indices = cKDTree(prev).query(current)
 
-            # print("euclidean dist: ", euclidean_dist)
-            # print()
+    displacements = (current - prev[matched_indices]) / pixels_in_one_meter
+    speeds = distances / pixels_in_one_meter / dt
 
-        sum_min_velocity = sum_min_velocity + min_euclidean_dist / dt
+    return CentroidMatch(displacements, matched_indices, speeds, speeds.mean(), np.median(speeds))
 
-    # if current_centroids_list == prev_centroids_list
-    N = len(current_centroids_list)
-    # print("N: ", N)
-    vel = sum_min_velocity / N
 
-    return vel
-
-
-def do_cv_stuff(img1_path):
+def do_cv_stuff(frame_source, csv_file, first_frame=285, last_frame=830):
+    '''
+    Interactive mode: shows the detection panels of every frame, any key for the next frame, 'q' to quit.
+    The velocities are appended to 'csv_file'.
+    '''
 
     current_centroids_list = []
     buf_centroids_list = []
     init_time = 0
 
-    df = pd.read_csv(config['velocity_estimation']['img_frame_times'])
+    frame_time = frame_source.time_stamps
 
-    index_frame_time = np.array(df['index'])
-    frame_time = np.array(df['time'])
+    marker_detector = MarkerDetector(**VELOCITY_ESTIMATION_PARAMS)
 
     velocity_estimation_fieldnames = ['time', 'vel']  # TODO
-    setup_csv(config["velocity_estimation"]["img_velocity_estimation"], velocity_estimation_fieldnames)
+    setup_csv(csv_file, velocity_estimation_fieldnames)
     
-    for i in range(285, 830):
-
-        img = img1_path + str(i) + ".jpg"
-
-        # Read the image from the file path
-        img1 = cv2.imread(img)
-        # cv2.imshow('Processed Image', img1)
-        # cv2.waitKey(0)
-        
-        if img1 is None:
-            print(f"Error: Image not found at {img}")
-            return
-
-        img2 = cv2.cvtColor(img1, cv2.COLOR_RGB2GRAY)
-
-        # Apply adaptive thresholding
-        img3 = cv2.adaptiveThreshold(img2, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 51, 4)
-        # cv2.imshow('Processed Image', img3)
-        # cv2.waitKey(0)
-        
-        # Further processing steps
-        img3 = cv2.medianBlur(img3, 9)
-        img3 = cv2.dilate(img3, (3, 3), iterations=2)
-        img3 = cv2.medianBlur(img3, 3)
-        img3 = cv2.dilate(img3, (3, 3), iterations=2)
-
-        num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(img3, 8, cv2.CV_32S)
+    for i, img1 in frame_source.read(first_frame, last_frame):
+
+        markers = marker_detector.detect(img1, i)
+        img2 = marker_detector.gray
+        img3 = marker_detector.thresholded
 
         imgC = cv2.cvtColor(img3, cv2.COLOR_GRAY2BGR)
-        # cv2.imshow('Processed Image', imgC)
-        # cv2.waitKey(0)
-        # print("stats: \n", stats)
-
-        for j in range(len(stats)):
-            stat = stats[j]
-            x, y, w, h, area = stat
-
-            if area != np.max(stats[:, 4]):  # Exclude background
-                if area > 150:
-                    cv2.rectangle(imgC, (x, y), (x + w, y + h), (255, 0, 0), 2)
-                    x, y = centroids[j].astype(int)
-                    cv2.circle(imgC, (x, y), 2, (0, 0, 255), 2)
-                    
-                    current_centroids_list.append([x,y])
+
+        for marker in markers:
+            x, y, w, h = marker['left'], marker['top'], marker['width'], marker['height']
+            cv2.rectangle(imgC, (int(x), int(y)), (int(x + w), int(y + h)), (255, 0, 0), 2)
+            x, y = int(marker['x']), int(marker['y'])
+            cv2.circle(imgC, (x, y), 2, (0, 0, 255), 2)
+
+            current_centroids_list.append([x,y])
 
         img2 = cv2.cvtColor(img2, cv2.COLOR_GRAY2BGR)
         img3 = cv2.cvtColor(img3, cv2.COLOR_GRAY2BGR)
         imgH = np.hstack((img1, img2, img3, imgC))
-        # cv2.imshow('Processed Image', imgH)
+        cv2.imshow('Processed Image', imgH)
 
-        if buf_centroids_list is not []:
-            delta_t = frame_time[i+1] - frame_time[i]
-            vel = calc_vel_of_obj(current_centroids_list, buf_centroids_list, delta_t)
+        if buf_centroids_list:
+            delta_t = frame_time[i] - frame_time[i-1] if i > 0 else np.nan
+            vel = calc_vel_of_obj(current_centroids_list, buf_centroids_list, delta_t).mean_speed
 
             data = {
                 velocity_estimation_fieldnames[0]: frame_time[i],
@@ -151,7 +132,7 @@ def do_cv_stuff(img1_path):
             }
 
             row = [data[velocity_estimation_fieldnames[0]]] + [data[velocity_estimation_fieldnames[1]]]
-            save_to_csv(config["velocity_estimation"]["img_velocity_estimation"], row)
+            save_to_csv(csv_file, row)
 
             init_time = init_time + delta_t
 
@@ -166,8 +147,108 @@ def do_cv_stuff(img1_path):
         # cv2.destroyAllWindows()
 
 
-if __name__ == '__main__':
+def estimate_velocity_chunk(frame_source, first_frame, last_frame, overlap=1, detector_params=VELOCITY_ESTIMATION_PARAMS,
+                            use_roi=False, reference_frame=None):
+    '''
+    Headless velocity estimation of frames [first_frame, last_frame) of 'frame_source' (see frame_sources.py).
+    The 'overlap' frames before 'first_frame' are only detected, so the first frame of the chunk still has a
+    previous frame to be matched against (the very first frame of a session has none, its velocity is inf).
+    With 'use_roi', markers are only detected around the contact patch (see contact_roi.py), found against the fixed
+    no-contact 'reference_frame' (default: the first frame of the source). The reference is not adapted to the frames
+    of the chunk, so every chunk sees the same ROIs and the result does not depend on how the range is split.
+    OUTPUT: (N, 2) array of (time, vel) rows.
+    '''
+    marker_detector = MarkerDetector(**detector_params)
+    contact_roi = None
+    if use_roi:
+        contact_roi = ContactRoi(reference_alpha=0.0)
+        contact_roi.set_reference(next(frame_source.read(0, 1))[1] if reference_frame is None else reference_frame)
+    frame_time = frame_source.time_stamps
+    prev_centroids = []
+    prev_time = np.nan
+    rows = []
+
+    for i, img in frame_source.read(max(first_frame - overlap, 0), last_frame):
+        roi = None if contact_roi is None else contact_roi.update(img)
+        centroids = centroids_of(marker_detector.detect(img, i, roi)).astype(int)
+
+        if i >= first_frame:
+            delta_t = frame_time[i] - prev_time  # time between the two matched frames
+            rows.append((frame_time[i], calc_vel_of_obj(centroids, prev_centroids, delta_t).mean_speed))
+
+        prev_centroids = centroids
+        prev_time = frame_time[i]
+
+    return np.array(rows).reshape(-1, 2)
+
+
+def estimate_velocity_batch(frame_source, first_frame, last_frame, workers=None, chunk_size=64, use_roi=False):
+    '''
+    Headless, parallel velocity estimation: [first_frame, last_frame) is split into chunks of 'chunk_size' frames
+    processed by a pool of 'workers' processes; each chunk but the first re-detects the frame just before it so no
+    consecutive frame pair is lost at chunk boundaries. With 'use_roi', the no-contact reference (frame 0) is read
+    once and handed to every chunk. The result is the same as a serial pass over the range.
+    OUTPUT: (N, 2) array of (time, vel) rows in time order.
+    '''
+    frame_source.time_stamps  # read once here instead of in every worker
+    reference_frame = next(frame_source.read(0, 1))[1] if use_roi else None
+    starts = list(range(first_frame, last_frame, chunk_size))
+    stops = [min(start + chunk_size, last_frame) for start in starts]
+    overlaps = [0] + [1] * (len(starts) - 1)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = list(executor.map(estimate_velocity_chunk, repeat(frame_source), starts, stops, overlaps,
+                                   repeat(VELOCITY_ESTIMATION_PARAMS), repeat(use_roi), repeat(reference_frame)))
+
+    if not chunks:
+        return np.zeros((0, 2))
+
+    rows = np.concatenate(chunks)
+    return rows[np.argsort(rows[:, 0], kind='stable')]
 
-    path_to_blobs = config["velocity_estimation"]["img_data_dir"]
 
-    do_cv_stuff(path_to_blobs)
+if __name__ == '__main__':
+
+    with open(dir_to_config, 'r') as file:
+        config = yaml.load(file, Loader=yaml.SafeLoader)
+
+    parser = argparse.ArgumentParser(description="Estimate the object velocity from gelsight marker motion.")
+    parser.add_argument('--source', default=None,
+                        help="xdf file, hdf5 recording or jpeg directory (default: 'frame_source', else 'img_data_dir' "
+                             "of config.yml)")
+    parser.add_argument('--stream', default='GelSightMini', help="image stream of an xdf source")
+    parser.add_argument('--first-frame', type=int, default=285)
+    parser.add_argument('--last-frame', type=int, default=830, help="exclusive")
+    parser.add_argument('--interactive', action='store_true', help="step through frames with the detection panels")
+    parser.add_argument('--workers', type=int, default=None, help="processes for the headless mode (default: all cpus)")
+    parser.add_argument('--chunk-size', type=int, default=64, help="frames per task in the headless mode")
+    parser.add_argument('--roi', action='store_true', help="only detect markers around the contact patch (headless mode)")
+    parser.add_argument('--no-clock-sync', action='store_true',
+                        help="keep the recorded time stamps of an xdf source even when '<xdf>.clock.json' exists "
+                             "(see xdf_post_processing.py --clock-sync)")
+    args = parser.parse_args()
+
+    source_path = args.source or config["velocity_estimation"].get("frame_source") \
+        or config["velocity_estimation"]["img_data_dir"]
+
+    frame_time, image_numbers = None, None
+    if isdir(source_path) and not exists(frame_index_file(source_path)):
+        # exported jpeg frames without a frame index, time stamps come from the csv of xdf_post_processing.py
+        df = load_columns(config['velocity_estimation']['img_frame_times'])
+        frame_time, image_numbers = np.array(df['time']), np.array(df['index'])
+
+    clock_correction = None
+    if not args.no_clock_sync and exists(clock_corrections_file(source_path)):
+        clock_correction = load_clock_corrections(clock_corrections_file(source_path)).get(args.stream)
+        print(f"{args.stream} time stamps corrected with {clock_correction}")
+
+    frame_source = open_frame_source(source_path, frame_time, image_numbers, args.stream, clock_correction)
+
+    if args.interactive:
+        do_cv_stuff(frame_source, config["velocity_estimation"]["img_velocity_estimation"], args.first_frame, args.last_frame)
+
+    else:
+        velocities = estimate_velocity_batch(frame_source, args.first_frame, args.last_frame,
+                                             args.workers, args.chunk_size, args.roi)
+        save_columns(config["velocity_estimation"]["img_velocity_estimation"], ['time', 'vel'],
+                     [velocities[:, 0], velocities[:, 1]])
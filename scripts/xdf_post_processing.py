@@ -30,15 +30,19 @@
 #!/usr/bin/env python3
 
 import cv2
+import argparse
 import ast
 import re
 import numpy as np
 import yaml
 import time
-import pyxdf
-from os import makedirs
 from os.path import join, abspath, dirname
-from data_logger_methods import setup_csv, save_to_csv
+from data_logger_methods import save_columns, open_column_sink
+from xdf_stream_reader import XdfStreamReader
+from frame_export import export_frames
+from frame_index import FrameIndex, frame_index_file
+from frame_sources import xdf_frame_shape, xdf_frame_encoding, decode_xdf_frames
+from clock_sync import xdf_clock_corrections, estimate_lag, save_clock_corrections, clock_corrections_file
 
 
 gelsight_mini_interface_dir = dirname(abspath(__file__))  # WHATEVER/digit_FT_sensors/scripts
@@ -49,19 +53,51 @@ with open(dir_to_config, 'r') as file:
     config = yaml.load(file, Loader=yaml.SafeLoader)
 
 
-def show_xdf_images(raw_images):
+class XdfFrameStack:
+    '''
+    GelSightMini frames as one contiguous (N, height, width, channels) uint8 array.
+    The raw xdf 'time_series' is converted once (int8 samples are only reinterpreted, not copied; jpeg/png
+    samples are decoded) and indexing hands out views of that buffer, so export, display and cv code can share
+    it without per-frame copies.
+    '''
+
+    def __init__(self, time_series, stream_info=None, time_stamps=None):
+        self.frame_shape = xdf_frame_shape(stream_info)
+        self.time_stamps = None if time_stamps is None else np.asarray(time_stamps, dtype=np.float64)
+
+        if xdf_frame_encoding(stream_info) != 'raw':
+            self.frames = decode_xdf_frames(time_series, self.frame_shape)
+            return
+
+        raw = np.asarray(time_series)
+        if raw.dtype == np.int8:
+            raw = np.ascontiguousarray(raw).view(np.uint8)
+        elif raw.dtype != np.uint8:
+            raw = raw.astype(np.uint8)
+
+        self.frames = np.ascontiguousarray(raw).reshape((-1,) + self.frame_shape)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        ''' A single frame (H, W, C) or a slice (n, H, W, C), both views into the shared buffer. '''
+        return self.frames[index]
+
+    def __iter__(self):
+        return iter(self.frames)
+
+
+def show_xdf_images(raw_images, stream_info=None):
 
     print("****************************")
     print("press 'q' to quit")
     print('Any key to see frames')
     print("****************************")
 
-    img_width = 320
-    img_height = 240
-    rgb_channels = 3
+    frames = raw_images if isinstance(raw_images, XdfFrameStack) else XdfFrameStack(raw_images, stream_info)
 
-    for img in raw_images:
-        i = np.reshape(img, (img_height, img_width, rgb_channels)).astype('uint8')
+    for i in frames:
         cv2.imshow('each image', i)
         
         key = cv2.waitKey(0) & 0xFF
@@ -74,225 +110,233 @@ def show_xdf_images(raw_images):
     cv2.destroyAllWindows()
 
 
-def save_xdf_images(raw_images, file_path, folder_name):
+def save_xdf_images(raw_images, file_path, folder_name, first_img_name=0, workers=None, progress=None, stream_info=None):
+    '''
+    Dump frames as '<index>.jpg', encoding them in parallel (see frame_export.export_frames).
+    INPUT: 'raw_images' is an XdfFrameStack or the raw xdf time_series (then 'stream_info' gives the frame shape).
+    'first_img_name' lets consecutive blocks of one stream continue the numbering.
+    OUTPUT: the image name following the last frame written.
+    '''
+    frames = raw_images if isinstance(raw_images, XdfFrameStack) else XdfFrameStack(raw_images, stream_info)
 
-    img_width = 320
-    img_height = 240
-    rgb_channels = 3
+    new_folder_path = file_path + folder_name
 
-    img_name = 0
+    return export_frames(frames, new_folder_path, '{}.jpg', first_index=first_img_name,
+                         workers=workers, progress=progress, total=len(frames))
 
-    new_folder_path = file_path + folder_name
-    makedirs(new_folder_path, exist_ok=True)
 
-    for img in raw_images:
-        i = np.reshape(img, (img_height, img_width, rgb_channels)).astype('uint8')
+# Column names of the csv file written for each LSL stream; the first column is always the LSL time stamp.
+XDF_STREAM_SCHEMAS = {
+    'Sensor_mV': ['time', 'voltage'],
+    'ur5e_joint_states': ['time', 'shoulder_pan_pos', 'shoulder_lift_pos', 'elbow_pos', 'wrist1_pos', 'wrist2_pos', 'wrist3_pos',
+                          'shoulder_pan_vel', 'shoulder_lift_vel', 'elbow_vel', 'wrist1_vel', 'wrist2_vel', 'wrist3_vel',
+                          'shoulder_pan_curr', 'shoulder_lift_curr', 'elbow_curr', 'wrist1_curr', 'wrist2_curr', 'wrist3_curr'],
+    'ur5e_wrench': ['time', 'Fx', 'Fy', 'Fz', 'Tx', 'Ty', 'Tz'],
+    'ur5e_tool_coordinate': ['time', 'trans_x', 'trans_y', 'trans_z', 'rot_x', 'rot_y', 'rot_z', 'rot_w'],
+    'ur5e_tool_velocity': ['time', 'tool_vel_x', 'tool_vel_y', 'tool_vel_z', 'tool_ang_vel_x', 'tool_ang_vel_y', 'tool_ang_vel_z'],
+}
 
-        cv2.imwrite(new_folder_path + '/' + str(img_name) + '.jpg', i)
 
-        img_name = img_name + 1
+def save_xdf_stream(stream_name, time_stamps, time_series, file_path):
+    '''
+    Write a whole LSL stream in one go, columns named after XDF_STREAM_SCHEMAS[stream_name].
+    INPUT: 'time_stamps' (N,) and 'time_series' (N, channels) exactly as returned by pyxdf.load_xdf.
+    The output format follows the extension of 'file_path' (.csv, .npz, .feather/.arrow, .parquet).
+    '''
+    save_columns(file_path, XDF_STREAM_SCHEMAS[stream_name], stream_columns(stream_name, time_stamps, time_series))
 
 
-def save_img_time_stamps(img_time_stamps, file_path):
+def stream_columns(stream_name, time_stamps, time_series):
+    ''' Split a block of a stream into the typed columns of its schema: float64 time stamps + one column per channel. '''
+    fieldnames = XDF_STREAM_SCHEMAS[stream_name]
 
-    index = 0
-    fieldnames = ['index', 'time']
-    setup_csv(file_path, fieldnames)
+    time_stamps = np.asarray(time_stamps, dtype=np.float64)
+    time_series = np.asarray(time_series).reshape(len(time_stamps), -1)
 
-    for tm in img_time_stamps:
+    if time_series.shape[1] != len(fieldnames) - 1:
+        raise ValueError(f"'{stream_name}' has {time_series.shape[1]} channels, "
+                         f"schema expects {len(fieldnames) - 1}")
 
-        data = {
-            fieldnames[0]: index,
-            fieldnames[1]: tm
-        }
+    return [time_stamps] + list(time_series.T)
 
-        row = [data[fieldnames[0]]] + [data[fieldnames[1]]]
-        save_to_csv(file_path, row)
 
-        index = index + 1
+def parse_fabric_voltages(raw_voltages):
+    ''' The fabric sensor pushes its reading as a '[value]' string channel. '''
+    return np.array([float(item[0].strip('[]')) for item in raw_voltages])
 
 
-def save_xdf_fabric_sensor(voltage_time_stamp, voltage_data, file_path):
+def save_img_time_stamps(img_time_stamps, file_path):
 
-    fieldnames = ['time', 'voltage']
-    setup_csv(file_path, fieldnames)
+    fieldnames = ['index', 'time']
+    img_time_stamps = np.asarray(img_time_stamps, dtype=np.float64)
 
-    for i in range(len(voltage_time_stamp)):
+    save_columns(file_path, fieldnames, [np.arange(len(img_time_stamps)), img_time_stamps])
 
-        data = {
-            fieldnames[0]: voltage_time_stamp[i],
-            fieldnames[1]: voltage_data[i]
-        }
 
-        row = [data[fieldnames[0]]] + [data[fieldnames[1]]]
-        save_to_csv(file_path, row)
+def save_xdf_fabric_sensor(voltage_time_stamp, voltage_data, file_path):
+    save_xdf_stream('Sensor_mV', voltage_time_stamp, voltage_data, file_path)
 
 
 def save_xdf_ur5e_joint_states(ur5e_joint_states_time_stamp, ur5e_joint_states, file_path):
-
-    fieldnames = ['time', 'shoulder_pan_pos', 'shoulder_lift_pos', 'elbow_pos', 'wrist1_pos', 'wrist2_pos', 'wrist3_pos',
-                  'shoulder_pan_vel', 'shoulder_lift_vel', 'elbow_vel', 'wrist1_vel', 'wrist2_vel', 'wrist3_vel',
-                  'shoulder_pan_curr', 'shoulder_lift_curr', 'elbow_curr', 'wrist1_curr', 'wrist2_curr', 'wrist3_curr']
-    setup_csv(file_path, fieldnames)
-
-    for i in range(len(ur5e_joint_states_time_stamp)):
-
-        data = {
-            fieldnames[0]: ur5e_joint_states_time_stamp[i],
-            fieldnames[1]: ur5e_joint_states[i][0],
-            fieldnames[2]: ur5e_joint_states[i][1],
-            fieldnames[3]: ur5e_joint_states[i][2],
-            fieldnames[4]: ur5e_joint_states[i][3],
-            fieldnames[5]: ur5e_joint_states[i][4],
-            fieldnames[6]: ur5e_joint_states[i][5],
-
-            fieldnames[7]: ur5e_joint_states[i][6],
-            fieldnames[8]: ur5e_joint_states[i][7],
-            fieldnames[9]: ur5e_joint_states[i][8],
-            fieldnames[10]: ur5e_joint_states[i][9],
-            fieldnames[11]: ur5e_joint_states[i][10],
-            fieldnames[12]: ur5e_joint_states[i][11],
-
-            fieldnames[13]: ur5e_joint_states[i][12],
-            fieldnames[14]: ur5e_joint_states[i][13],
-            fieldnames[15]: ur5e_joint_states[i][14],
-            fieldnames[16]: ur5e_joint_states[i][15],
-            fieldnames[17]: ur5e_joint_states[i][16],
-            fieldnames[18]: ur5e_joint_states[i][17]
-        }
-
-        row = [data[fieldnames[0]]] + \
-              [data[fieldnames[1]]] + [data[fieldnames[2]]] + [data[fieldnames[3]]] + \
-              [data[fieldnames[4]]] + [data[fieldnames[5]]] + [data[fieldnames[6]]] + \
-              [data[fieldnames[7]]] + [data[fieldnames[8]]] + [data[fieldnames[9]]] + \
-              [data[fieldnames[10]]] + [data[fieldnames[11]]] + [data[fieldnames[12]]] + \
-              [data[fieldnames[13]]] + [data[fieldnames[14]]] + [data[fieldnames[15]]] + \
-              [data[fieldnames[16]]] + [data[fieldnames[17]]] + [data[fieldnames[18]]]
-
-
-        save_to_csv(file_path, row)
+    save_xdf_stream('ur5e_joint_states', ur5e_joint_states_time_stamp, ur5e_joint_states, file_path)
 
 
 def save_xdf_ur5e_wrench(ur5e_wrench_time_stamp, ur5e_wrench, file_path):
-
-    fieldnames = ['time', 'Fx', 'Fy', 'Fz', 'Tx', 'Ty', 'Tz']
-    setup_csv(file_path, fieldnames)
-
-    for i in range(len(ur5e_wrench_time_stamp)):
-
-        data = {
-            fieldnames[0]: ur5e_wrench_time_stamp[i],
-            fieldnames[1]: ur5e_wrench[i][0],
-            fieldnames[2]: ur5e_wrench[i][1],
-            fieldnames[3]: ur5e_wrench[i][2],
-
-            fieldnames[4]: ur5e_wrench[i][3],
-            fieldnames[5]: ur5e_wrench[i][4],
-            fieldnames[6]: ur5e_wrench[i][5]
-        }
-
-        row = [data[fieldnames[0]]] + \
-              [data[fieldnames[1]]] + [data[fieldnames[2]]] + [data[fieldnames[3]]] + \
-              [data[fieldnames[4]]] + [data[fieldnames[5]]] + [data[fieldnames[6]]]
-
-
-        save_to_csv(file_path, row)
+    save_xdf_stream('ur5e_wrench', ur5e_wrench_time_stamp, ur5e_wrench, file_path)
 
 
 def save_xdf_ur5e_tool_coordinate(ur5e_tool_coordinate_time_stamp, ur5e_tool_coordinate, file_path):
-
-    fieldnames = ['time', 'trans_x', 'trans_y', 'trans_z', 'rot_x', 'rot_y', 'rot_z', 'rot_w']
-    setup_csv(file_path, fieldnames)
-
-    for i in range(len(ur5e_tool_coordinate_time_stamp)):
-
-        data = {
-            fieldnames[0]: ur5e_tool_coordinate_time_stamp[i],
-            fieldnames[1]: ur5e_tool_coordinate[i][0],
-            fieldnames[2]: ur5e_tool_coordinate[i][1],
-            fieldnames[3]: ur5e_tool_coordinate[i][2],
-
-            fieldnames[4]: ur5e_tool_coordinate[i][3],
-            fieldnames[5]: ur5e_tool_coordinate[i][4],
-            fieldnames[6]: ur5e_tool_coordinate[i][5],
-            fieldnames[7]: ur5e_tool_coordinate[i][6]
-        }
-
-        row = [data[fieldnames[0]]] + \
-              [data[fieldnames[1]]] + [data[fieldnames[2]]] + [data[fieldnames[3]]] + \
-              [data[fieldnames[4]]] + [data[fieldnames[5]]] + [data[fieldnames[6]]] + \
-              [data[fieldnames[7]]]
-
-
-        save_to_csv(file_path, row)
+    save_xdf_stream('ur5e_tool_coordinate', ur5e_tool_coordinate_time_stamp, ur5e_tool_coordinate, file_path)
 
 
 def save_xdf_ur5e_tool_velocity(ur5e_tool_velocity_time_stamp, ur5e_tool_velocity, file_path):
-
-    fieldnames = ['time', 'tool_vel_x', 'tool_vel_y', 'tool_vel_z', 'tool_ang_vel_x', 'tool_ang_vel_y', 'tool_ang_vel_z']
-    setup_csv(file_path, fieldnames)
-
-    for i in range(len(ur5e_tool_velocity_time_stamp)):
-
-        data = {
-            fieldnames[0]: ur5e_tool_velocity_time_stamp[i],
-            fieldnames[1]: ur5e_tool_velocity[i][0],
-            fieldnames[2]: ur5e_tool_velocity[i][1],
-            fieldnames[3]: ur5e_tool_velocity[i][2],
-
-            fieldnames[4]: ur5e_tool_velocity[i][3],
-            fieldnames[5]: ur5e_tool_velocity[i][4],
-            fieldnames[6]: ur5e_tool_velocity[i][5]
-        }
-
-        row = [data[fieldnames[0]]] + \
-              [data[fieldnames[1]]] + [data[fieldnames[2]]] + [data[fieldnames[3]]] + \
-              [data[fieldnames[4]]] + [data[fieldnames[5]]] + [data[fieldnames[6]]]
-
-
-        save_to_csv(file_path, row)
+    save_xdf_stream('ur5e_tool_velocity', ur5e_tool_velocity_time_stamp, ur5e_tool_velocity, file_path)
 
 
         
-if __name__ == '__main__':
-
-    streams, header = pyxdf.load_xdf(config["xdf_post_processing"]["fabric_gelsight_xdf"])
-
-    for stream in streams:
-        if stream["info"]["name"][0] == 'GelSightMini':
-            raw_xdf_images = stream["time_series"]
-            images_time_stamps =  stream["time_stamps"]  # time
-
-        if stream["info"]["name"][0] == 'Sensor_mV':
-            raw_xdf_voltages = stream["time_series"]
-            raw_xdf_voltages = [float(item[0].strip('[]')) for item in raw_xdf_voltages]
-            voltages_time_stamps =  stream["time_stamps"]  # time
-
-        if stream["info"]["name"][0] == 'ur5e_joint_states':
-            raw_xdf_ur5e_joint_states = stream["time_series"]
-            ur5e_joint_states_time_stamps =  stream["time_stamps"]  # time
-
-        if stream["info"]["name"][0] == 'ur5e_wrench':
-            raw_xdf_ur5e_wrench = stream["time_series"]
-            ur5e_wrench_time_stamps =  stream["time_stamps"]  # time
+def read_stream_channel(reader, stream_name, channel, clock_corrections=None):
+    ''' (time_stamps, values) of one channel (named as in XDF_STREAM_SCHEMAS) of a stream, time stamps corrected if given. '''
+    column = XDF_STREAM_SCHEMAS[stream_name].index(channel)
+    blocks = [stream_columns(stream_name, time_stamps, parse_fabric_voltages(samples) if stream_name == 'Sensor_mV' else samples)
+              for _, time_stamps, samples in reader.iter_chunks([stream_name])]
+    if not blocks:
+        raise ValueError(f"no samples of '{stream_name}' in {reader.file_name}")
+
+    time_stamps = np.concatenate([block[0] for block in blocks])
+    if clock_corrections is not None and stream_name in clock_corrections:
+        time_stamps = clock_corrections[stream_name].apply(time_stamps)
+
+    return time_stamps, np.concatenate([block[column] for block in blocks])
+
+
+def synchronize_xdf_streams(reader, lag_pairs=(), max_lag=0.5):
+    '''
+    Clock corrections of every stream of an xdf file: offset and drift fitted to its clock offset measurements,
+    then, for each ((reference_stream, channel), (stream, channel)) of 'lag_pairs', the lag of the stream with respect
+    to the reference found by cross-correlating the two channels (within +/- 'max_lag' seconds) is removed.
+    OUTPUT: {stream_name: ClockCorrection} (see clock_sync.py).
+    '''
+    corrections = xdf_clock_corrections(reader)
+
+    for (reference_stream, reference_channel), (stream_name, channel) in lag_pairs:
+        lag, score = estimate_lag(*read_stream_channel(reader, reference_stream, reference_channel, corrections),
+                                  *read_stream_channel(reader, stream_name, channel, corrections), max_lag=max_lag)
+        corrections[stream_name].lag = corrections[stream_name].lag - lag
+        print(f"{stream_name}.{channel} lags {reference_stream}.{reference_channel} by {1e3 * lag:.1f} ms "
+              f"(correlation {score:.2f})")
+
+    return corrections
+
+
+def export_xdf_streams(xdf_file, stream_outputs, img_file_path=None, img_folder_name=None, use_index=True,
+                       clock_corrections=None, workers=None, progress=None):
+    '''
+    Export streams of an .xdf file block by block, so peak memory stays at about one XDF chunk whatever the recording length.
+    INPUT: 'stream_outputs' maps stream name to output file; for 'GelSightMini' that file receives the frame time stamps
+    and the frames themselves go to 'img_file_path' + 'img_folder_name' (as in save_xdf_images), with their frame index
+    (see frame_index.py) saved next to that folder.
+    Only the streams in 'stream_outputs' are decoded. With 'use_index', the chunk index saved next to the xdf file
+    is used (and created on first use) so repeated selective exports skip straight to the wanted chunks.
+    'clock_corrections' ({stream_name: ClockCorrection}, see synchronize_xdf_streams) are applied to the time stamps.
+    The frames of all chunks go through one export_frames pool of 'workers'; 'progress' is its progress(num_written, total)
+    callback, where 'total' is the number of frames of the stream (None without the index).
+    '''
+    sinks = {}
+    img_time_stamps = []
+
+    reader = XdfStreamReader(xdf_file)
+    if use_index:
+        reader.load_index()
+
+    def iter_frames():
+        ''' Writes the non-frame streams to their sinks and yields the GelSightMini frames, chunk after chunk. '''
+        next_img_name = 0
+
+        for stream_name, time_stamps, samples in reader.iter_chunks(list(stream_outputs)):
+            if clock_corrections is not None and stream_name in clock_corrections:
+                time_stamps = clock_corrections[stream_name].apply(time_stamps)
+
+            if stream_name == 'GelSightMini':
+                if stream_name not in sinks:
+                    sinks[stream_name] = open_column_sink(stream_outputs[stream_name], ['index', 'time'])
+
+                indices = np.arange(next_img_name, next_img_name + len(time_stamps))
+                sinks[stream_name].write_columns([indices, time_stamps])
+                next_img_name = next_img_name + len(time_stamps)
+
+                if img_file_path is not None:
+                    img_time_stamps.append(time_stamps)
+                    yield from XdfFrameStack(samples, reader.stream_info(stream_name), time_stamps)
+                continue
+
+            if stream_name == 'Sensor_mV':
+                samples = parse_fabric_voltages(samples)
+
+            if stream_name not in sinks:
+                sinks[stream_name] = open_column_sink(stream_outputs[stream_name], XDF_STREAM_SCHEMAS[stream_name])
+
+            sinks[stream_name].write_columns(stream_columns(stream_name, time_stamps, samples))
+
+    try:
+        if img_file_path is not None and 'GelSightMini' in stream_outputs:
+            total = reader.stream_sample_count('GelSightMini') if reader.index is not None else None
+            export_frames(iter_frames(), img_file_path + img_folder_name, '{}.jpg', workers=workers,
+                          progress=progress, total=total)
+        else:
+            for _ in iter_frames():
+                pass
+
+    finally:
+        for sink in sinks.values():
+            sink.close()
+
+    if img_time_stamps:
+        # image number == frame number, so frame_sources.ImageDirFrameSource can use the folder without the csv.
+        nominal_srate = float(reader.stream_info('GelSightMini')['nominal_srate'][0])
+        FrameIndex.from_time_stamps(np.concatenate(img_time_stamps), nominal_srate=nominal_srate) \
+            .save(frame_index_file(img_file_path + img_folder_name))
 
-        if stream["info"]["name"][0] == 'ur5e_tool_coordinate':
-            raw_xdf_ur5e_tool_coordinate = stream["time_series"]
-            ur5e_tool_coordinate_time_stamps =  stream["time_stamps"]  # time
 
-        if stream["info"]["name"][0] == 'ur5e_tool_velocity':
-            raw_xdf_ur5e_tool_velocity = stream["time_series"]
-            ur5e_tool_velocity_time_stamps =  stream["time_stamps"]  # time
-
-
-
-    # save_img_time_stamps(images_time_stamps, config["xdf_post_processing"]["img_frame_times"])
-    # save_xdf_images(raw_xdf_images, config["xdf_post_processing"]["img_data"], folder_name="fabric_gelsight_test_2")
-
-    # save_xdf_fabric_sensor(voltages_time_stamps, raw_xdf_voltages, config["xdf_post_processing"]["fabric_data"])
-
-    # save_xdf_ur5e_joint_states(ur5e_joint_states_time_stamps, raw_xdf_ur5e_joint_states, config["xdf_post_processing"]["ur5e_joint_states"])
-    # save_xdf_ur5e_wrench(ur5e_wrench_time_stamps, raw_xdf_ur5e_wrench, config["xdf_post_processing"]["ur5e_wrench"])
+if __name__ == '__main__':
 
-    # save_xdf_ur5e_tool_coordinate(ur5e_tool_coordinate_time_stamps, raw_xdf_ur5e_tool_coordinate, config["xdf_post_processing"]["ur5e_tool_coordinate"])
-    # save_xdf_ur5e_tool_velocity(ur5e_tool_velocity_time_stamps, raw_xdf_ur5e_tool_velocity, config["xdf_post_processing"]["ur5e_tool_velocity"])
\ No newline at end of file
+    xdf_config = config["xdf_post_processing"]
+
+    stream_outputs = {
+        'GelSightMini': xdf_config["img_frame_times"],
+        'Sensor_mV': xdf_config["fabric_data"],
+        'ur5e_joint_states': xdf_config["ur5e_joint_states"],
+        'ur5e_wrench': xdf_config["ur5e_wrench"],
+        'ur5e_tool_coordinate': xdf_config["ur5e_tool_coordinate"],
+        'ur5e_tool_velocity': xdf_config["ur5e_tool_velocity"],
+    }
+
+    parser = argparse.ArgumentParser(description="Export streams of an xdf file (default: all of them).")
+    parser.add_argument('--xdf', default=xdf_config["fabric_gelsight_xdf"], help="xdf file to process")
+    parser.add_argument('--streams', nargs='+', choices=list(stream_outputs), default=list(stream_outputs),
+                        help="names of the streams to export, e.g. --streams Sensor_mV ur5e_wrench")
+    parser.add_argument('--no-index', action='store_true', help="do not use/create the '<xdf>.index.json' chunk index")
+    parser.add_argument('--clock-sync', action='store_true',
+                        help="correct the time stamps with the clock offset/drift fitted per stream (saved to '<xdf>.clock.json')")
+    parser.add_argument('--lag', nargs=2, action='append', default=[], metavar=('REFERENCE.CHANNEL', 'STREAM.CHANNEL'),
+                        help="with --clock-sync, remove the lag of STREAM found by cross-correlation, "
+                             "e.g. --lag Sensor_mV.voltage ur5e_wrench.Fy")
+    parser.add_argument('--max-lag', type=float, default=0.5, help="largest lag [s] searched by --lag")
+    args = parser.parse_args()
+
+    clock_corrections = None
+    if args.clock_sync:
+        reader = XdfStreamReader(args.xdf)
+        reader.load_index(save=not args.no_index)
+        lag_pairs = [tuple(tuple(channel.split('.', 1)) for channel in pair) for pair in args.lag]
+        clock_corrections = synchronize_xdf_streams(reader, lag_pairs, args.max_lag)
+        save_clock_corrections(clock_corrections_file(args.xdf), clock_corrections)
+        for stream_name, correction in clock_corrections.items():
+            print(f"{stream_name}: {correction}")
+
+    def print_progress(num_written, total):
+        if num_written % 500 == 0 or num_written == total:
+            print(f"  {num_written}/{total or '?'} images saved")
+
+    export_xdf_streams(args.xdf, {name: stream_outputs[name] for name in args.streams},
+                       img_file_path=xdf_config["img_data"], img_folder_name="fabric_gelsight_test_2",
+                       use_index=not args.no_index, clock_corrections=clock_corrections, progress=print_progress)
@@ -0,0 +1,437 @@
+''' ******************************************************************************
+ * Project: LSL configuration for gelsight mini Sensor
+ * File: xdf_stream_reader.py
+ * Date: October 18, 2026
+ *
+ * Description:
+ * Incremental reader for .xdf files. Instead of loading the whole recording
+ * like pyxdf.load_xdf, it walks the file chunk by chunk and yields
+ * (stream_name, timestamps_block, samples_block) tuples, so memory use is
+ * bounded by the size of a single chunk.
+ * Streams can be selected by name: chunks of other streams are skipped
+ * without being decoded. An index of stream headers and chunk offsets can be
+ * saved next to the file ('<file>.index.json') to make repeated selective
+ * loads jump straight to the wanted chunks, and the byte offset of every
+ * sample can be listed (iter_sample_offsets) so single samples, e.g. video
+ * frames, are read back with one seek (read_samples).
+ * NOTE: time stamps are the raw LSL time stamps of each stream; the clock
+ * offset measurements are collected (stream_clock_offsets) but not applied,
+ * see clock_sync.py. No dejittering is applied.
+ *
+ * License:
+ * This code is licensed under the MIT License.
+ * You may obtain a copy of the License at
+ *
+ *     https://opensource.org/licenses/MIT
+ *
+ * SPDX-License-Identifier: MIT
+ *
+ * Disclaimer:
+ * This software is provided "as is", without warranty of any kind, express or
+ * implied, including but not limited to the warranties of merchantability,
+ * fitness for a particular purpose, and noninfringement. In no event shall the
+ * authors be liable for any claim, damages, or other liability, whether in an
+ * action of contract, tort, or otherwise, arising from, out of, or in
+ * connection with the software or the use or other dealings in the software.
+ *
+ ****************************************************************************** '''
+#!/usr/bin/env python3
+
+import gzip
+import json
+import struct
+import numpy as np
+from os import stat
+from os.path import exists
+from collections import defaultdict
+from xml.etree.ElementTree import fromstring
+
+
+# XDF chunk tags
+FILE_HEADER = 1
+STREAM_HEADER = 2
+SAMPLES = 3
+CLOCK_OFFSET = 4
+BOUNDARY = 5
+STREAM_FOOTER = 6
+
+# content of a ClockOffset chunk: collection time, offset value
+CLOCK_OFFSET_RECORD = struct.Struct('<dd')
+
+CHANNEL_FORMATS = {
+    'double64': np.dtype('<f8'),
+    'float32': np.dtype('<f4'),
+    'int64': np.dtype('<i8'),
+    'int32': np.dtype('<i4'),
+    'int16': np.dtype('<i2'),
+    'int8': np.dtype('i1'),
+}
+
+
+class XdfStreamState:
+    ''' Per-stream parsing state, created from the stream header chunk. '''
+
+    def __init__(self, info):
+        self.info = info
+        self.name = info['info']['name'][0]
+        self.channel_count = int(info['info']['channel_count'][0])
+        self.channel_format = info['info']['channel_format'][0]
+        self.dtype = CHANNEL_FORMATS.get(self.channel_format)  # None for 'string' streams
+
+        nominal_srate = float(info['info']['nominal_srate'][0])
+        self.tdiff = 1.0 / nominal_srate if nominal_srate > 0 else 0.0
+        self.last_timestamp = 0.0
+
+
+class XdfStreamReader:
+    '''
+    Walks an .xdf file chunk by chunk.
+    'streams' maps stream id to XdfStreamState and fills up as stream headers are encountered;
+    'clock_offsets' maps stream id to the [collection_time, offset_value] pairs of its ClockOffset chunks read so far.
+    After load_index(), iter_chunks seeks directly to the samples chunks instead of walking the file.
+    '''
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.file_header = None
+        self.streams = {}
+        self.clock_offsets = defaultdict(list)
+        self.index = None
+
+    def iter_chunks(self, stream_names=None):
+        '''
+        Yields (stream_name, timestamps_block, samples_block) for every samples chunk in file order.
+        Numeric streams give an (N, channels) array of the stream's channel format; string streams a list of lists.
+        INPUT: 'stream_names' restricts the output to those streams, the other chunks are skipped undecoded.
+        '''
+        if self.index is not None:
+            yield from self._iter_indexed_chunks(stream_names)
+            return
+
+        with self._open() as f:
+            for tag, stream_id, content_len in self._iter_chunk_headers(f):
+
+                if tag == FILE_HEADER:
+                    self.file_header = _xml2dict(fromstring(f.read(content_len)))
+
+                elif tag == STREAM_HEADER:
+                    xml_string = f.read(content_len).decode('utf-8', 'replace')
+                    self.streams[stream_id] = XdfStreamState(_xml2dict(fromstring(xml_string)))
+
+                elif tag == SAMPLES and _is_selected(self.streams[stream_id], stream_names):
+                    stream = self.streams[stream_id]
+                    time_stamps, samples = _parse_samples(f.read(content_len), stream)
+                    yield stream.name, time_stamps, samples
+
+                elif tag == CLOCK_OFFSET:
+                    self.clock_offsets[stream_id].append(list(CLOCK_OFFSET_RECORD.unpack(f.read(content_len))))
+
+    def build_index(self):
+        '''
+        Scan the file once, recording every stream header, the (offset, length) of its samples chunks and its
+        clock offset measurements (a few hundred bytes per hour of recording).
+        '''
+        index = {'size': stat(self.file_name).st_size, 'mtime': stat(self.file_name).st_mtime, 'streams': {}}
+
+        with self._open() as f:
+            for tag, stream_id, content_len in self._iter_chunk_headers(f):
+
+                if tag == STREAM_HEADER:
+                    index['streams'][str(stream_id)] = {'header': f.read(content_len).decode('utf-8', 'replace'),
+                                                        'samples': [], 'clock_offsets': []}
+
+                elif tag == SAMPLES:
+                    index['streams'][str(stream_id)]['samples'].append([f.tell(), content_len])
+
+                elif tag == CLOCK_OFFSET:
+                    index['streams'][str(stream_id)]['clock_offsets'].append(
+                        list(CLOCK_OFFSET_RECORD.unpack(f.read(content_len))))
+
+        return index
+
+    def load_index(self, save=True):
+        ''' Use the saved '<file>.index.json' if it still matches the file, otherwise build (and save) a new one. '''
+        index_file = self.file_name + '.index.json'
+        file_stat = stat(self.file_name)
+
+        index = None
+        if exists(index_file):
+            with open(index_file, 'r') as f:
+                index = json.load(f)
+            if index['size'] != file_stat.st_size or index['mtime'] != file_stat.st_mtime or \
+                    any('clock_offsets' not in s for s in index['streams'].values()):  # or saved without clock offsets
+                index = None
+
+        if index is None:
+            index = self.build_index()
+            if save:
+                with open(index_file, 'w') as f:
+                    json.dump(index, f)
+
+        self.index = index
+        return index
+
+    def stream_names(self):
+        ''' Names of the streams found so far (all of them once the index is loaded). '''
+        if self.index is not None:
+            return [_xml2dict(fromstring(s['header']))['info']['name'][0] for s in self.index['streams'].values()]
+
+        return [stream.name for stream in self.streams.values()]
+
+    def stream_info(self, stream_name):
+        ''' The stream["info"] dict (same layout as pyxdf) of a stream seen so far, None if unknown. '''
+        stream = self.stream_state(stream_name)
+        return None if stream is None else stream.info['info']
+
+    def stream_state(self, stream_name):
+        ''' The XdfStreamState of a stream seen so far (any stream of the file once the index is loaded), None if unknown. '''
+        if self.index is not None and len(self.streams) < len(self.index['streams']):
+            for stream_id, indexed_stream in self.index['streams'].items():
+                if int(stream_id) not in self.streams:
+                    self.streams[int(stream_id)] = XdfStreamState(_xml2dict(fromstring(indexed_stream['header'])))
+
+        for stream in self.streams.values():
+            if stream.name == stream_name:
+                return stream
+
+        return None
+
+    def stream_clock_offsets(self, stream_name):
+        '''
+        Clock offset measurements of a stream: (collection_times, offset_values) float64 arrays, where adding the
+        offset value to a time stamp of the stream gives the recording computer's clock. Loads the index if needed.
+        '''
+        if self.index is None:
+            self.load_index()
+
+        for indexed_stream in self.index['streams'].values():
+            if _xml2dict(fromstring(indexed_stream['header']))['info']['name'][0] == stream_name:
+                clock_offsets = np.array(indexed_stream['clock_offsets'], dtype=np.float64).reshape(-1, 2)
+                return clock_offsets[:, 0], clock_offsets[:, 1]
+
+        raise KeyError(f"no stream '{stream_name}' in {self.file_name}")
+
+    def stream_sample_count(self, stream_name):
+        ''' Number of samples of a stream, read from the header of each of its samples chunks. Loads the index if needed. '''
+        if self.index is None:
+            self.load_index()
+
+        count = 0
+        with self._open() as f:
+            for offset, _, _ in self._indexed_chunks([stream_name]):
+                f.seek(offset)
+                count = count + _read_varlen_int(f)
+
+        return count
+
+    def iter_sample_offsets(self, stream_names=None):
+        '''
+        Yields (stream_name, timestamps_block, offsets, sizes) for every samples chunk in file order, where 'offsets'
+        and 'sizes' locate the stored values of each sample in the (uncompressed) file: the raw channel values of
+        numeric streams, the length-prefixed channel values of string streams (see decode_sample).
+        A single sample can then be read back with one seek, without parsing its chunk. Loads the index if needed.
+        '''
+        if self.index is None:
+            self.load_index()
+
+        with self._open() as f:
+            for offset, content_len, stream in self._indexed_chunks(stream_names):
+                f.seek(offset)
+                time_stamps, value_offsets, sizes = _parse_sample_offsets(f.read(content_len), stream)
+                yield stream.name, time_stamps, offset + value_offsets, sizes
+
+    def read_samples(self, stream_name, offsets, sizes):
+        ''' Yields the values (see decode_sample) of the samples of a stream stored at 'offsets'/'sizes' of iter_sample_offsets. '''
+        stream = self.stream_state(stream_name)
+
+        with self._open() as f:
+            for offset, size in zip(offsets, sizes):
+                f.seek(offset)
+                yield decode_sample(f.read(size), stream)
+
+    def _iter_indexed_chunks(self, stream_names):
+        with self._open() as f:
+            for offset, content_len, stream in self._indexed_chunks(stream_names):
+                f.seek(offset)
+                time_stamps, samples = _parse_samples(f.read(content_len), stream)
+                yield stream.name, time_stamps, samples
+
+    def _indexed_chunks(self, stream_names):
+        ''' (offset, length, stream) of the selected samples chunks, in file order. '''
+        chunks = []
+        for stream_id, indexed_stream in self.index['streams'].items():
+            stream = XdfStreamState(_xml2dict(fromstring(indexed_stream['header'])))
+            self.streams[int(stream_id)] = stream
+
+            if _is_selected(stream, stream_names):
+                chunks.extend((offset, length, stream) for offset, length in indexed_stream['samples'])
+
+        chunks.sort(key=lambda chunk: chunk[0])
+        return chunks
+
+    def _iter_chunk_headers(self, f):
+        ''' Yields (tag, stream_id, content_len) with the file positioned at the start of the chunk content. '''
+        while True:
+            try:
+                chunk_len = _read_varlen_int(f)
+            except EOFError:
+                break
+
+            tag = struct.unpack('<H', f.read(2))[0]
+            content_len = chunk_len - 2
+            stream_id = None
+
+            if tag in (STREAM_HEADER, SAMPLES, CLOCK_OFFSET, STREAM_FOOTER):
+                stream_id = struct.unpack('<I', f.read(4))[0]
+                content_len = content_len - 4
+
+            start = f.tell()
+            yield tag, stream_id, content_len
+
+            # the consumer reads the content or leaves it; either way continue at the next chunk.
+            if f.tell() != start + content_len:
+                f.seek(start + content_len)
+
+    def _open(self):
+        if self.file_name.endswith('.xdfz') or self.file_name.endswith('.xdf.gz'):
+            f = gzip.open(self.file_name, 'rb')
+        else:
+            f = open(self.file_name, 'rb')
+
+        if f.read(4) != b'XDF:':
+            f.close()
+            raise IOError(f"Invalid XDF file {self.file_name}")
+
+        return f
+
+
+def iter_xdf_chunks(file_name, stream_names=None, use_index=False):
+    ''' Shortcut for XdfStreamReader(file_name).iter_chunks(stream_names), optionally through the saved index. '''
+    reader = XdfStreamReader(file_name)
+    if use_index:
+        reader.load_index()
+
+    return reader.iter_chunks(stream_names)
+
+
+def _is_selected(stream, stream_names):
+    return stream_names is None or stream.name in stream_names
+
+
+def _parse_samples(content, stream):
+    ''' Decode the content of a [Samples] chunk into (timestamps, samples). '''
+    num_len_bytes = content[0]
+    num_samples = int.from_bytes(content[1:1 + num_len_bytes], 'little')
+    offset = 1 + num_len_bytes
+
+    if stream.dtype is not None:
+        sample_bytes = stream.channel_count * stream.dtype.itemsize
+        record = np.dtype([('flag', 'u1'), ('time', '<f8'), ('values', stream.dtype, (stream.channel_count,))])
+
+        # fast path: every sample carries its own time stamp, so all records have the same size.
+        if len(content) - offset == num_samples * record.itemsize:
+            records = np.frombuffer(content, dtype=record, count=num_samples, offset=offset)
+            if np.all(records['flag'] == 8):
+                if num_samples:
+                    stream.last_timestamp = float(records['time'][-1])
+                return records['time'].copy(), records['values'].copy()
+
+    time_stamps = np.zeros(num_samples)
+    if stream.dtype is not None:
+        samples = np.zeros((num_samples, stream.channel_count), dtype=stream.dtype)
+    else:
+        samples = [[None] * stream.channel_count for _ in range(num_samples)]
+
+    for k in range(num_samples):
+        if content[offset] != 0:
+            time_stamps[k] = struct.unpack_from('<d', content, offset + 1)[0]
+            offset = offset + 9
+        else:
+            time_stamps[k] = stream.last_timestamp + stream.tdiff
+            offset = offset + 1
+        stream.last_timestamp = time_stamps[k]
+
+        if stream.dtype is not None:
+            samples[k] = np.frombuffer(content, dtype=stream.dtype, count=stream.channel_count, offset=offset)
+            offset = offset + sample_bytes
+        else:
+            for ch in range(stream.channel_count):
+                num_len_bytes = content[offset]
+                value_len = int.from_bytes(content[offset + 1:offset + 1 + num_len_bytes], 'little')
+                offset = offset + 1 + num_len_bytes
+                samples[k][ch] = content[offset:offset + value_len].decode(errors='replace')
+                offset = offset + value_len
+
+    return time_stamps, samples
+
+
+def _parse_sample_offsets(content, stream):
+    ''' Like _parse_samples, but returns (timestamps, value_offsets, value_sizes) relative to the chunk content. '''
+    num_len_bytes = content[0]
+    num_samples = int.from_bytes(content[1:1 + num_len_bytes], 'little')
+    offset = 1 + num_len_bytes
+
+    time_stamps = np.zeros(num_samples)
+    offsets = np.zeros(num_samples, dtype=np.int64)
+    sizes = np.zeros(num_samples, dtype=np.int64)
+
+    for k in range(num_samples):
+        if content[offset] != 0:
+            time_stamps[k] = struct.unpack_from('<d', content, offset + 1)[0]
+            offset = offset + 9
+        else:
+            time_stamps[k] = stream.last_timestamp + stream.tdiff
+            offset = offset + 1
+        stream.last_timestamp = time_stamps[k]
+
+        offsets[k] = offset
+        if stream.dtype is not None:
+            offset = offset + stream.channel_count * stream.dtype.itemsize
+        else:
+            for ch in range(stream.channel_count):
+                num_len_bytes = content[offset]
+                value_len = int.from_bytes(content[offset + 1:offset + 1 + num_len_bytes], 'little')
+                offset = offset + 1 + num_len_bytes + value_len
+        sizes[k] = offset - offsets[k]
+
+    return time_stamps, offsets, sizes
+
+
+def decode_sample(buffer, stream):
+    ''' Values of one sample read at an offset of iter_sample_offsets: an array for numeric streams, a list of str otherwise. '''
+    if stream.dtype is not None:
+        return np.frombuffer(buffer, dtype=stream.dtype, count=stream.channel_count)
+
+    values = []
+    offset = 0
+    for ch in range(stream.channel_count):
+        num_len_bytes = buffer[offset]
+        value_len = int.from_bytes(buffer[offset + 1:offset + 1 + num_len_bytes], 'little')
+        offset = offset + 1 + num_len_bytes
+        values.append(bytes(buffer[offset:offset + value_len]).decode(errors='replace'))
+        offset = offset + value_len
+
+    return values
+
+
+def _read_varlen_int(f):
+    ''' Read an XDF variable-length integer: [NumLengthBytes][Length]. '''
+    num_len_bytes = f.read(1)
+    if not num_len_bytes:
+        raise EOFError()
+
+    num_len_bytes = num_len_bytes[0]
+    if num_len_bytes not in (1, 4, 8):
+        raise RuntimeError("invalid variable-length integer encountered.")
+
+    return int.from_bytes(f.read(num_len_bytes), 'little')
+
+
+def _xml2dict(element):
+    ''' Same layout as pyxdf's stream info: every child becomes a list of dicts/strings. '''
+    children = defaultdict(list)
+    for child in map(_xml2dict, list(element)):
+        for key, value in child.items():
+            children[key].append(value)
+
+    return {element.tag: children or element.text}
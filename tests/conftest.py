@@ -0,0 +1,5 @@
+import sys
+from os.path import join, abspath, dirname
+
+# the scripts import each other as top-level modules.
+sys.path.insert(0, join(dirname(abspath(__file__)), '..', 'scripts'))
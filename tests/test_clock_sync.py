@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from clock_sync import ClockCorrection, fit_clock_offsets, estimate_lag, xdf_clock_corrections, \
+    save_clock_corrections, load_clock_corrections
+from frame_sources import XdfFrameSource
+from xdf_stream_reader import XdfStreamReader
+from xdf_files import write_xdf
+
+
+def contact_signal(time, rng):
+    ''' Steps every 5 s (contact on/off) with a little noise. '''
+    return 5.0 * ((time % 10) > 5) + 0.05 * rng.standard_normal(len(time))
+
+
+def test_fit_recovers_offset_and_drift_despite_outlier():
+    rng = np.random.default_rng(0)
+    collection_times = 1000 + np.arange(0, 60, 5.0)
+    offsets = 2.0 + 1e-4 * collection_times + 1e-5 * rng.standard_normal(len(collection_times))
+    offsets[4] = offsets[4] + 0.3  # network hiccup
+
+    correction = fit_clock_offsets(collection_times, offsets)
+
+    assert correction.offset == pytest.approx(2.0, abs=1e-3)
+    assert correction.drift == pytest.approx(1e-4, rel=1e-2)
+    np.testing.assert_allclose(correction.apply(collection_times) - collection_times,
+                               2.0 + 1e-4 * collection_times, atol=1e-4)
+
+
+def test_fit_without_measurements():
+    assert fit_clock_offsets([], []).apply([5.0]) == [5.0]
+    assert fit_clock_offsets([10.0], [0.5]).apply([5.0]) == [5.5]
+
+
+def test_estimate_lag_recovers_delay():
+    rng = np.random.default_rng(1)
+    time_a = np.arange(0, 60, 1 / 100)
+    time_b = np.arange(0, 60, 1 / 500)
+
+    # b reacts 40 ms after a, in the opposite direction.
+    lag, score = estimate_lag(time_a, contact_signal(time_a, rng), time_b, -contact_signal(time_b - 0.040, rng))
+
+    assert lag == pytest.approx(0.040, abs=2e-3)
+    assert score < 0
+
+
+def test_xdf_clock_corrections_and_frame_time_stamps(tmp_path):
+    file_name = str(tmp_path / 'recording.xdf')
+    frame_shape = (4, 6, 3)
+    time_stamps = 1000 + np.arange(50) / 25
+    frames = np.arange(50 * np.prod(frame_shape)).reshape(50, -1) % 128
+    clock_offsets = [(t, 2.0 + 1e-4 * t) for t in time_stamps[::10]]
+
+    write_xdf(file_name, [{'name': 'GelSightMini', 'channel_format': 'int8', 'nominal_srate': 25,
+                           'time_stamps': time_stamps, 'samples': frames, 'clock_offsets': clock_offsets,
+                           'desc': '<height>4</height><width>6</width><channels>3</channels>'}])
+
+    corrections = xdf_clock_corrections(XdfStreamReader(file_name))
+    assert corrections['GelSightMini'].offset == pytest.approx(2.0, abs=1e-6)
+    assert corrections['GelSightMini'].drift == pytest.approx(1e-4, rel=1e-6)
+
+    save_clock_corrections(str(tmp_path / 'clock.json'), corrections)
+    correction = load_clock_corrections(str(tmp_path / 'clock.json'))['GelSightMini']
+    correction.lag = -0.040
+
+    raw = XdfFrameSource(file_name)
+    corrected = XdfFrameSource(file_name, clock_correction=correction)
+
+    np.testing.assert_array_equal(raw.time_stamps, time_stamps)
+    np.testing.assert_allclose(corrected.time_stamps, time_stamps + 2.0 + 1e-4 * time_stamps - 0.040, atol=1e-9)
+
+    i, frame = next(corrected.read(7, 8))
+    assert i == 7
+    np.testing.assert_array_equal(frame, frames[7].astype(np.uint8).reshape(frame_shape))
+
+
+def test_clock_correction_round_trip():
+    correction = ClockCorrection(1.5, 2e-5, -0.01)
+    assert ClockCorrection.from_dict(correction.to_dict()).to_dict() == correction.to_dict()
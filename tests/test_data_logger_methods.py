@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_logger_methods import CsvSink, save_columns, load_columns, open_column_sink
+
+
+def columns():
+    rng = np.random.default_rng(0)
+    return ['time', 'Fy', 'index'], [1.7e9 + np.arange(1000) / 500, rng.standard_normal(1000).astype(np.float32),
+                                      np.arange(1000)]
+
+
+@pytest.mark.parametrize('extension', ['.csv', '.npz', '.feather', '.arrow', '.parquet'])
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_load_round_trip(tmp_path, extension, mmap):
+    if extension not in ('.csv', '.npz'):
+        pytest.importorskip('pyarrow')
+    file_name = str(tmp_path / ('data' + extension))
+    fieldnames, data = columns()
+
+    save_columns(file_name, fieldnames, data)
+    df = load_columns(file_name, mmap=mmap)
+
+    assert df.columns.tolist() == fieldnames
+    np.testing.assert_array_equal(df['time'], data[0])  # float64 time stamps survive exactly, csv included
+    np.testing.assert_allclose(df['Fy'], data[1], rtol=1e-6)
+    np.testing.assert_array_equal(df['index'], data[2])
+    if extension != '.csv':
+        assert df['Fy'].dtype == np.float32 and df['index'].dtype == np.int64
+
+
+@pytest.mark.parametrize('extension', ['.csv', '.npz', '.feather', '.parquet'])
+def test_column_sink_blocks_equal_one_save(tmp_path, extension):
+    if extension in ('.feather', '.parquet'):
+        pytest.importorskip('pyarrow')
+    fieldnames, data = columns()
+
+    with open_column_sink(str(tmp_path / ('blocks' + extension)), fieldnames) as sink:
+        if extension != '.csv':
+            sink.chunk_rows = 128
+        for start in range(0, 1000, 77):
+            sink.write_columns([column[start:start + 77] for column in data])
+    save_columns(str(tmp_path / ('whole' + extension)), fieldnames, data)
+
+    pd.testing.assert_frame_equal(load_columns(str(tmp_path / ('blocks' + extension))),
+                                  load_columns(str(tmp_path / ('whole' + extension))))
+
+
+def test_csv_sink_appends_rows(tmp_path):
+    file_name = str(tmp_path / 'log.csv')
+
+    with CsvSink(file_name, ['a', 'b'], chunk_rows=3) as sink:
+        sink.write_row([1, 2])
+        sink.write_rows([[3, 4], [5, 6]])
+        sink.write_block(np.array([[7, 8], [9, 10]]))
+    with CsvSink(file_name, mode='a') as sink:
+        sink.write_row([11, 12])
+
+    np.testing.assert_array_equal(pd.read_csv(file_name).to_numpy(), np.arange(1, 13).reshape(-1, 2))
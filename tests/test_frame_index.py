@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+from os.path import exists
+from frame_index import FrameIndex, frame_index_file, load_frame_index
+from frame_sources import XdfFrameSource, ImageDirFrameSource
+from xdf_files import write_xdf
+
+
+def test_dropped_frames_from_gaps():
+    time_stamps = np.array([0.0, 0.04, 0.08, 0.20, 0.24, 0.32])  # 2 frames missing before 0.20, 1 before 0.32
+    index = FrameIndex.from_time_stamps(time_stamps, nominal_srate=25)
+
+    np.testing.assert_array_equal(index.records['dropped'], [0, 0, 0, 2, 0, 1])
+    np.testing.assert_array_equal(index.dropped, [False, False, False, True, False, True])
+    np.testing.assert_array_equal(FrameIndex.from_time_stamps(time_stamps).records['dropped'], [0, 0, 0, 2, 0, 1])
+
+
+def test_lookups_and_slices_keep_frame_numbers():
+    index = FrameIndex.from_time_stamps(10 + 0.04 * np.arange(100))
+
+    assert index.frame_at(9.0) == -1
+    assert index.frame_at(10 + 0.04 * 37 + 0.01) == 37
+    assert index[37]['offset'] == 37
+
+    part = index.frames_between(10 + 0.04 * 20, 10 + 0.04 * 30)
+    assert len(part) == 10 and part.first_frame == 20
+    assert part.frame_at(10 + 0.04 * 25) == 25
+    assert np.isnan(index.intervals()[0]) and np.allclose(index.intervals()[1:], 0.04)
+
+
+def test_save_load_and_staleness(tmp_path):
+    source = tmp_path / 'recording.bin'
+    source.write_bytes(b'frames')
+    index = FrameIndex.from_time_stamps(np.arange(5) * 0.5, sizes=np.full(5, 6))
+
+    built = []
+    def build():
+        built.append(True)
+        return index
+
+    loaded = load_frame_index(str(source), build)
+    assert exists(frame_index_file(str(source)))
+    np.testing.assert_array_equal(load_frame_index(str(source), build).records, loaded.records)
+    assert len(built) == 1
+
+    source.write_bytes(b'new frames')  # the recording changed, the saved index is stale
+    assert FrameIndex.load(frame_index_file(str(source)), str(source)) is None
+    load_frame_index(str(source), build)
+    assert len(built) == 2
+
+
+def test_xdf_frames_read_through_the_index(tmp_path):
+    file_name = str(tmp_path / 'recording.xdf')
+    frames = np.random.default_rng(0).integers(0, 128, (30, 4, 6, 3), dtype=np.int8)
+    time_stamps = 100 + 0.04 * np.delete(np.arange(32), [11, 12])  # two dropped frames
+
+    write_xdf(file_name, [{'name': 'GelSightMini', 'channel_format': 'int8', 'nominal_srate': 25,
+                           'time_stamps': time_stamps, 'samples': frames.reshape(30, -1),
+                           'desc': '<height>4</height><width>6</width><channels>3</channels>'}], samples_per_chunk=7)
+
+    source = XdfFrameSource(file_name)
+    assert len(source) == 30
+    np.testing.assert_array_equal(source.time_stamps, time_stamps)
+    assert source.index.records['dropped'][11] == 2
+    assert exists(frame_index_file(file_name))
+
+    for i, frame in XdfFrameSource(file_name).read(5, 15):  # second source: loads the saved index
+        np.testing.assert_array_equal(frame, frames[i].view(np.uint8))
+
+
+def test_image_folder_with_saved_index(tmp_path):
+    img_dir = str(tmp_path / 'images')
+    (tmp_path / 'images').mkdir()
+    for number in range(4):
+        cv2.imwrite(f"{img_dir}/{number}.jpg", np.full((8, 8, 3), 40 * number, dtype=np.uint8))
+    FrameIndex.from_time_stamps([1.0, 1.1, 1.2, 1.3]).save(frame_index_file(img_dir))
+
+    source = ImageDirFrameSource(img_dir)
+    np.testing.assert_allclose(source.time_stamps, [1.0, 1.1, 1.2, 1.3])
+    assert [i for i, _ in source.read(1, 3)] == [1, 2]
+    assert abs(int(next(source.read(3, 4))[1].mean()) - 120) <= 2
@@ -0,0 +1,99 @@
+import threading
+import time
+import numpy as np
+import pytest
+from gelsight_camera import AsyncGelsightCamera
+
+
+class FakeDevice:
+    '''
+    Camera whose frame k is filled with k (mod 256), one every 'period' seconds.
+    After 'fail_after' frames get_image raises; with 'paused' set it blocks.
+    '''
+
+    def __init__(self, period=0.002, fail_after=None):
+        self.period = period
+        self.fail_after = fail_after
+        self.paused = threading.Event()
+        self.num_connects = 0
+        self.num_disconnects = 0
+        self.count = 0
+
+    def connect(self):
+        self.num_connects = self.num_connects + 1
+
+    def disconnect(self):
+        self.num_disconnects = self.num_disconnects + 1
+
+    def get_image(self):
+        while self.paused.is_set():
+            time.sleep(0.001)
+        if self.fail_after is not None and self.count >= self.fail_after:
+            raise IOError("camera unplugged")
+        time.sleep(self.period)
+        frame = np.full((4, 6, 3), self.count % 256, dtype=np.uint8)
+        self.count = self.count + 1
+        return frame
+
+
+def test_connects_lazily_and_reconnects_after_close():
+    device = FakeDevice()
+    camera = AsyncGelsightCamera(device)
+    assert not camera.connected and device.num_connects == 0
+
+    frame, _, frame_number = camera.latest()
+    assert camera.connected and device.num_connects == 1
+    assert frame[0, 0, 0] == frame_number % 256
+
+    camera.close()
+    assert not camera.connected and device.num_disconnects == 1
+    camera.get_image()
+    assert device.num_connects == 2
+    camera.close()
+
+
+def test_get_image_never_repeats_a_frame():
+    with AsyncGelsightCamera(FakeDevice()) as camera:
+        values = []
+        for _ in range(20):
+            values.append(int(camera.get_image()[0, 0, 0]))
+            time.sleep(0.005)  # slower than the camera: frames in between are skipped, not queued
+
+    assert all(later > earlier for earlier, later in zip(values, values[1:]))
+
+
+def test_wait_next_time_stamps_and_timeout():
+    clock_values = iter(np.arange(1000.0, 2000.0, 0.5))
+    device = FakeDevice()
+
+    with AsyncGelsightCamera(device, clock=lambda: next(clock_values)) as camera:
+        _, first_time, first_number = camera.latest()
+        frame, time_stamp, frame_number = camera.wait_next(timeout=1.0)
+        assert frame_number > first_number and time_stamp > first_time
+        assert time_stamp == 1000.0 + 0.5 * frame_number  # stamped with the clock right after each read
+
+        device.paused.set()
+        time.sleep(0.02)
+        assert camera.wait_next(timeout=0.05) == (None, None, None)
+        device.paused.clear()
+
+
+def test_history_oldest_first():
+    with AsyncGelsightCamera(FakeDevice(), history=4) as camera:
+        _, _, frame_number = camera.wait_next(after=10, timeout=1.0)
+        frames, time_stamps = camera.history()
+
+    assert len(frames) == 4 and np.all(np.diff(time_stamps) > 0)
+    assert np.all(np.diff(frames[:, 0, 0, 0].astype(int)) == 1)
+
+
+def test_device_error_is_raised_to_the_consumer():
+    camera = AsyncGelsightCamera(FakeDevice(fail_after=5))
+
+    with pytest.raises(RuntimeError) as raised:
+        for _ in range(10):
+            camera.get_image()
+
+    assert isinstance(raised.value.__cause__, IOError)
+    assert isinstance(camera.error, IOError) and camera.num_frames == 5
+    camera.close()
@@ -0,0 +1,43 @@
+import h5py
+import numpy as np
+import pytest
+from hdf5_recorder import Hdf5FrameRecorder
+
+
+def frames(count=40, shape=(12, 16, 3)):
+    return np.random.default_rng(0).integers(0, 256, (count,) + shape, dtype=np.uint8)
+
+
+@pytest.mark.parametrize('compression_level', [5, None])
+def test_recorded_frames_read_back(tmp_path, compression_level):
+    file_name = str(tmp_path / 'frames.h5')
+    images = frames()
+    time_stamps = 1000.0 + np.arange(len(images)) / 25
+
+    with Hdf5FrameRecorder(file_name, images.shape[1:], chunk_frames=16, compression_level=compression_level,
+                           buffer_size=64) as recorder:
+        for frame, time_stamp in zip(images, time_stamps):
+            recorder.put(frame, time_stamp)
+
+    assert recorder.num_written == len(images) and recorder.dropped == 0
+    with h5py.File(file_name, 'r') as f:
+        np.testing.assert_array_equal(f['images'][:], images)
+        np.testing.assert_array_equal(f['timestamps'][:], time_stamps)
+
+
+def test_writer_error_is_raised_on_close(tmp_path):
+    recorder = Hdf5FrameRecorder(str(tmp_path / 'frames.h5'), (12, 16, 3), chunk_frames=4)
+
+    def fail(frames, time_stamps):
+        raise OSError("disk full")
+    recorder._append = fail
+
+    with pytest.raises(RuntimeError, match="failed") as raised:
+        with recorder:
+            for frame in frames(4):
+                recorder.put(frame, 0.0)
+
+    assert isinstance(raised.value.__cause__, OSError)
+    assert isinstance(recorder.error, OSError)
+    with pytest.raises(RuntimeError):
+        recorder.put(frames(1)[0], 0.0)
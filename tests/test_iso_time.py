@@ -0,0 +1,23 @@
+import os
+import numpy as np
+from iso_time import iso8601_to_seconds, load_time_seconds
+
+
+def test_seconds_do_not_wrap_at_the_hour():
+    seconds = iso8601_to_seconds(['2024-06-25T14:59:59.500', '2024-06-25T15:00:00.250', '2024-06-26T15:00:00.250'])
+    np.testing.assert_allclose(seconds, [0.0, 0.75, 86400.75])
+
+
+def test_load_time_seconds_caches_until_the_log_changes(tmp_path):
+    file_name = str(tmp_path / 'ft.csv')
+    with open(file_name, 'w') as f:
+        f.write('time_stamp,Fx\n2024-06-25T14:03:07.000,1\n2024-06-25T14:03:07.002,2\n')
+
+    np.testing.assert_allclose(load_time_seconds(file_name), [0.0, 0.002])
+    assert os.path.exists(file_name + '.time_stamp.npz')
+
+    with open(file_name, 'a') as f:
+        f.write('2024-06-25T14:03:08.002,3\n')
+    os.utime(file_name, (0, os.stat(file_name).st_mtime + 1))
+
+    np.testing.assert_allclose(load_time_seconds(file_name), [0.0, 0.002, 1.002])
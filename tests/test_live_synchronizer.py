@@ -0,0 +1,224 @@
+import numpy as np
+import pytest
+from live_synchronizer import LiveStream, LiveSynchronizer, LSL_STRING_FORMAT
+from frame_sources import DEFAULT_FRAME_SHAPE
+
+LSL_FLOAT32, LSL_DOUBLE64, LSL_INT8 = 1, 2, 6
+
+
+class FakeDesc:
+
+    def __init__(self, values):
+        self.values = values
+
+    def child_value(self, key):
+        return self.values.get(key, '')
+
+
+class FakeInfo:
+    ''' The parts of pylsl.StreamInfo read by LiveStream. '''
+
+    def __init__(self, name, channel_count, channel_format=LSL_DOUBLE64, nominal_srate=0.0, type='', desc=None):
+        self._name = name
+        self._channel_count = channel_count
+        self._channel_format = channel_format
+        self._nominal_srate = nominal_srate
+        self._type = type
+        self._desc = FakeDesc(desc or {})
+
+    def name(self):
+        return self._name
+
+    def channel_count(self):
+        return self._channel_count
+
+    def channel_format(self):
+        return self._channel_format
+
+    def nominal_srate(self):
+        return self._nominal_srate
+
+    def type(self):
+        return self._type
+
+    def desc(self):
+        return self._desc
+
+
+class FakeInlet:
+    ''' Samples handed to push() arrive in the inlet; pull_chunk behaves like pylsl's (dest_obj for numeric streams). '''
+
+    def __init__(self, info):
+        self._info = info
+        self.queue = []
+
+    def info(self):
+        return self._info
+
+    def push(self, time_stamps, samples):
+        self.queue.extend(zip(time_stamps, samples))
+
+    def pull_chunk(self, timeout=0.0, max_samples=1024, dest_obj=None):
+        pulled, self.queue = self.queue[:max_samples], self.queue[max_samples:]
+        if dest_obj is None:
+            return [list(sample) for _, sample in pulled], [time_stamp for time_stamp, _ in pulled]
+
+        for i, (_, sample) in enumerate(pulled):
+            dest_obj[i] = sample
+        return dest_obj, [time_stamp for time_stamp, _ in pulled]
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def signal_stream(name, srate=100.0, interpolation='linear'):
+    return LiveStream(FakeInlet(FakeInfo(name, 1, nominal_srate=srate)), interpolation)
+
+
+def push_signal(stream, start, stop, srate=100.0):
+    ''' Samples of value 10 * t at the times of [start, stop] on the 'srate' grid. '''
+    time_stamps = np.round(np.arange(round(start * srate), round(stop * srate) + 1) / srate, 9)
+    stream.inlet.push(time_stamps, 10 * time_stamps[:, None])
+
+
+@pytest.fixture
+def synchronized():
+    ''' (synchronizer, reference stream, signal stream, clock): emits at the 'ref' times, waiting up to 50 ms for 'sig'. '''
+    clock = FakeClock()
+    reference = signal_stream('ref', srate=10.0, interpolation='nearest')
+    signal = signal_stream('sig')
+    return LiveSynchronizer([reference, signal], reference='ref', lookahead=0.05, clock=clock), reference, signal, clock
+
+
+def test_waits_for_late_stream_within_lookahead(synchronized):
+    synchronizer, reference, signal, clock = synchronized
+    push_signal(reference, 0.0, 0.0, 10.0)
+    push_signal(signal, 0.0, 0.0)
+
+    [(time_stamp, values, late)] = synchronizer.poll()
+    assert time_stamp == 0.0 and late == ()
+
+    clock.now = 0.1
+    push_signal(reference, 0.1, 0.1, 10.0)
+    push_signal(signal, 0.01, 0.05)
+    assert synchronizer.poll() == []  # 'sig' is behind and the lookahead is not over
+
+    clock.now = 0.12
+    push_signal(signal, 0.06, 0.12)
+    [(time_stamp, values, late)] = synchronizer.poll()
+
+    assert time_stamp == pytest.approx(0.1) and late == ()
+    assert values['sig'][0] == pytest.approx(1.0)  # interpolated at the reference time, not the latest sample
+    assert values['ref'][0] == pytest.approx(1.0)
+
+
+def test_late_stream_is_held_after_lookahead(synchronized):
+    synchronizer, reference, signal, clock = synchronized
+    push_signal(reference, 0.0, 0.0, 10.0)
+    push_signal(signal, 0.0, 0.0)
+    synchronizer.poll()
+
+    clock.now = 0.2
+    push_signal(reference, 0.1, 0.2, 10.0)
+    push_signal(signal, 0.01, 0.12)
+    emitted = synchronizer.poll()
+    assert [time_stamp for time_stamp, _, _ in emitted] == pytest.approx([0.1])  # 0.2 waits for 'sig'
+
+    clock.now = 0.24
+    assert synchronizer.poll() == []
+
+    clock.now = 0.25
+    [(time_stamp, values, late)] = synchronizer.poll()
+    assert time_stamp == pytest.approx(0.2) and late == ('sig',)
+    assert values['sig'][0] == pytest.approx(1.2)  # last sample held
+    assert synchronizer.num_late == {'ref': 0, 'sig': 1}
+    assert synchronizer.stats()['emitted'] == 3
+
+
+def test_times_overdue_at_the_first_poll_are_skipped(synchronized):
+    synchronizer, reference, signal, clock = synchronized
+    push_signal(reference, 0.0, 0.3, 10.0)
+    push_signal(signal, 0.0, 0.3)
+
+    clock.now = 0.3
+    assert [time_stamp for time_stamp, _, _ in synchronizer.poll()] == pytest.approx([0.3])
+
+
+def test_uniform_grid_timebase():
+    clock = FakeClock()
+    signals = [signal_stream('a'), signal_stream('b')]
+    synchronizer = LiveSynchronizer(signals, rate=50.0, lookahead=0.05, clock=clock)
+
+    clock.now = 0.1
+    push_signal(signals[0], 0.0, 0.1)
+    push_signal(signals[1], 0.0, 0.1)
+    assert [time_stamp for time_stamp, _, _ in synchronizer.poll()] == pytest.approx([0.1])  # starts at the newest sample
+
+    clock.now = 0.2
+    push_signal(signals[0], 0.11, 0.2)
+    push_signal(signals[1], 0.11, 0.2)
+    emitted = synchronizer.poll()
+    np.testing.assert_allclose([time_stamp for time_stamp, _, _ in emitted], [0.12, 0.14, 0.16, 0.18, 0.2])
+    np.testing.assert_allclose([values['b'][0] for _, values, _ in emitted], [1.2, 1.4, 1.6, 1.8, 2.0])
+
+    clock.now = 0.3
+    push_signal(signals[0], 0.21, 0.3)  # 'b' stopped at 0.2
+    emitted = synchronizer.poll()
+    np.testing.assert_allclose([time_stamp for time_stamp, _, _ in emitted], [0.22, 0.24])
+    assert all(late == ('b',) and values['b'][0] == pytest.approx(2.0) for _, values, late in emitted)
+
+
+def test_string_stream_is_parsed():
+    stream = LiveStream(FakeInlet(FakeInfo('Sensor_mV', 1, LSL_STRING_FORMAT, 100.0)))
+    stream.inlet.push([0.0, 0.01], [['[1.5]'], ['[2.5]']])
+
+    assert stream.pull() == 2
+    np.testing.assert_allclose(stream.values_at(np.array([0.005])), [[2.0]])
+
+
+def test_raw_frame_stream_keeps_images():
+    frame_shape = (4, 6, 3)
+    info = FakeInfo('GelSightMini', 72, LSL_INT8, desc={'encoding': 'raw', 'height': '4', 'width': '6', 'channels': '3'})
+    stream = LiveStream(FakeInlet(info), 'nearest')
+    frames = np.arange(3 * 72).reshape(3, 72) % 256
+    stream.inlet.push([0.0, 0.04, 0.08], frames.astype(np.uint8).view(np.int8))
+
+    stream.pull()
+    before, first, held = stream.values_at(np.array([-1.0, 0.01, 0.5]))
+
+    assert stream.ring.samples.dtype == np.uint8 and stream.ring.samples.shape[1:] == frame_shape
+    assert before is None
+    np.testing.assert_array_equal(first, frames[0].reshape(frame_shape))
+    np.testing.assert_array_equal(held, frames[2].reshape(frame_shape))
+
+
+def test_frame_stream_without_desc():
+    ''' lsl_gelsight.py streams without <desc> give DEFAULT_FRAME_SHAPE frames, not 230400 int8 signal channels. '''
+    info = FakeInfo('GelSightMini', int(np.prod(DEFAULT_FRAME_SHAPE)), LSL_INT8, type='Video')
+    stream = LiveStream(FakeInlet(info), 'nearest', capacity=8)
+
+    assert stream.frame_shape == DEFAULT_FRAME_SHAPE
+    assert stream.ring.samples.shape == (8,) + DEFAULT_FRAME_SHAPE and stream.ring.samples.dtype == np.uint8
+
+
+@pytest.mark.parametrize('info', [
+    FakeInfo('GelSightMini', 1000, LSL_INT8),  # no geometry and not DEFAULT_FRAME_SHAPE
+    FakeInfo('camera', 4 * 6 * 3, LSL_INT8, type='Video'),
+    FakeInfo('big', 5000, LSL_FLOAT32),  # too many channels for a signal
+    FakeInfo('GelSightMini', 1, LSL_STRING_FORMAT, desc={'encoding': 'jpeg'}),
+])
+def test_unusable_frame_streams_are_rejected(info):
+    with pytest.raises(ValueError):
+        LiveStream(FakeInlet(info), 'nearest')
+
+
+def test_frame_stream_cannot_be_interpolated():
+    info = FakeInfo('GelSightMini', int(np.prod(DEFAULT_FRAME_SHAPE)), LSL_INT8)
+    with pytest.raises(ValueError):
+        LiveStream(FakeInlet(info), 'linear')
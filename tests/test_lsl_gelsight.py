@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from lsl_gelsight import push_frame
+from frame_sources import decode_xdf_frames
+
+
+class FakeOutlet:
+    ''' Keeps the samples pushed on it, as an xdf file would record them. '''
+
+    def __init__(self):
+        self.time_series = []
+        self.time_stamps = []
+
+    def push_chunk(self, chunk, timestamp):
+        self.time_series.extend(np.array(chunk))
+        self.time_stamps.append(timestamp)
+
+    def push_sample(self, sample, timestamp):
+        self.time_series.append(list(sample))
+        self.time_stamps.append(timestamp)
+
+
+def frames(shape=(24, 32, 3)):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, shape, dtype=np.uint8) for _ in range(3)]
+
+
+@pytest.mark.parametrize('encoding', ['raw', 'png'])
+def test_push_frame_round_trip_is_lossless(encoding):
+    outlet = FakeOutlet()
+    for i, frame in enumerate(frames()):
+        push_frame(outlet, frame, encoding, timestamp=10.0 + i)
+
+    if encoding == 'raw':
+        assert all(sample.dtype == np.int8 and sample.shape == (24 * 32 * 3,) for sample in outlet.time_series)
+        decoded = np.stack(outlet.time_series).view(np.uint8).reshape(-1, 24, 32, 3)
+    else:
+        decoded = decode_xdf_frames(outlet.time_series, (24, 32, 3))
+
+    np.testing.assert_array_equal(decoded, np.stack(frames()))
+    assert outlet.time_stamps == [10.0, 11.0, 12.0]
+
+
+def test_push_frame_jpeg_round_trip():
+    smooth = np.zeros((24, 32, 3), dtype=np.uint8)
+    smooth[..., 0] = np.arange(32) * 8
+    smooth[..., 1] = np.arange(24)[:, None] * 10
+    smooth[..., 2] = 128
+    outlet = FakeOutlet()
+
+    push_frame(outlet, smooth, 'jpeg', jpeg_quality=95)
+    decoded = decode_xdf_frames(outlet.time_series, smooth.shape)
+
+    assert decoded.shape == (1,) + smooth.shape
+    assert np.abs(decoded[0].astype(int) - smooth).mean() < 2.0
@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+import pytest
+from marker_detection import MarkerDetector, VELOCITY_ESTIMATION_PARAMS, LIVE_SENSOR_PARAMS, centroids_of
+
+
+def marker_frame(seed=0, height=240, width=320):
+    ''' RGB frame of dark markers at jittered grid positions on a noisy, unevenly lit gel. '''
+    rng = np.random.default_rng(seed)
+    ys, xs = np.mgrid[0:height, 0:width]
+    frame = (150 + 40 * xs / width + rng.normal(0, 3, (height, width)))[..., None].repeat(3, axis=2)
+    frame = np.clip(frame, 0, 255).astype(np.uint8)
+    for y in range(20, height, 30):
+        for x in range(20, width, 30):
+            center = (int(x + rng.integers(-3, 4)), int(y + rng.integers(-3, 4)))
+            cv2.circle(frame, center, int(rng.integers(7, 11)), (40, 50, 60), -1)
+    return frame
+
+
+def original_chain(frame, block_size, C, min_area):
+    ''' The per-frame detection previously copy-pasted in velocity_estimation.py and gelsight_mini_interface.py. '''
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    thresholded = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, block_size, C)
+    thresholded = cv2.medianBlur(thresholded, 9)
+    thresholded = cv2.dilate(thresholded, (3, 3), iterations=2)
+    thresholded = cv2.medianBlur(thresholded, 3)
+    thresholded = cv2.dilate(thresholded, (3, 3), iterations=2)
+
+    _, _, stats, centroids = cv2.connectedComponentsWithStats(thresholded, 8, cv2.CV_32S)
+    markers = [(centroids[j], stats[j]) for j in range(len(stats))
+               if stats[j, 4] != np.max(stats[:, 4]) and stats[j, 4] > min_area]
+    return thresholded, markers
+
+
+@pytest.mark.parametrize('params', [VELOCITY_ESTIMATION_PARAMS, LIVE_SENSOR_PARAMS])
+def test_detector_matches_original_chain(params):
+    detector = MarkerDetector(**params)
+
+    for seed in range(3):  # buffers are reused between frames
+        frame = marker_frame(seed)
+        thresholded, expected = original_chain(frame, **params)
+        markers = detector.detect(frame, frame_index=seed)
+
+        assert len(markers) == len(expected) > 0
+        np.testing.assert_array_equal(detector.thresholded, thresholded)
+        np.testing.assert_allclose(centroids_of(markers), [centroid for centroid, _ in expected], atol=1e-4)
+        np.testing.assert_array_equal(markers['area'], [stat[4] for _, stat in expected])
+        np.testing.assert_array_equal(markers['frame'], seed)
+
+
+def test_detect_stack_tags_frames():
+    frames = np.stack([marker_frame(seed) for seed in range(3)])
+    detector = MarkerDetector(**LIVE_SENSOR_PARAMS)
+
+    markers = detector.detect_stack(frames, first_frame_index=10)
+
+    assert set(markers['frame']) == {10, 11, 12}
+    np.testing.assert_array_equal(markers[markers['frame'] == 11], MarkerDetector(**LIVE_SENSOR_PARAMS).detect(frames[1], 11))
+
+
+def test_roi_positions_are_in_frame_pixels():
+    frame = marker_frame()
+    detector = MarkerDetector(**LIVE_SENSOR_PARAMS)
+    full = centroids_of(detector.detect(frame))
+
+    roi = (95, 65, 90, 90)
+    in_roi = centroids_of(detector.detect(frame, roi=roi))
+
+    assert len(in_roi) > 0
+    distances = np.linalg.norm(in_roi[:, None] - full[None], axis=2).min(axis=1)
+    assert np.all(distances < 1.0)
@@ -0,0 +1,52 @@
+import numpy as np
+from marker_tracking import MarkerTracker
+from marker_detection import MarkerDetector, LIVE_SENSOR_PARAMS, centroids_of
+
+
+def marker_grid(shift=(0.0, 0.0), height=240, width=320, spacing=30):
+    ''' Grayscale frame of dark gaussian markers off the pixel grid, moved by 'shift' (x, y) [px]. '''
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float64)
+    frame = np.full((height, width), 200.0)
+    for y in range(20, height, spacing):
+        for x in range(20, width, spacing):
+            frame -= 150 * np.exp(-((xs - x - 0.3 - shift[0]) ** 2 + (ys - y + 0.2 - shift[1]) ** 2) / (2 * 2.5 ** 2))
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def detections_of(frame):
+    return centroids_of(MarkerDetector(**LIVE_SENSOR_PARAMS).detect(frame))
+
+
+def test_static_frame_gives_zero_displacement():
+    frame = marker_grid()
+    detections = detections_of(frame)
+    tracker = MarkerTracker()
+
+    ids, start = tracker.update(frame, detections)
+    assert len(ids) == len(detections) > 0
+
+    for frame_detections in (None, None, detections, None):
+        frame_ids, positions = tracker.update(frame, frame_detections)
+        np.testing.assert_array_equal(frame_ids, ids)
+        np.testing.assert_allclose(positions, start, atol=1e-6)
+        np.testing.assert_allclose(tracker.velocities, 0, atol=1e-6)
+
+
+def test_shift_is_measured_without_bias():
+    tracker = MarkerTracker()
+    _, start = tracker.update(marker_grid(), detections_of(marker_grid()))
+    _, moved = tracker.update(marker_grid((2.0, 1.0)))
+
+    np.testing.assert_allclose(moved - start, np.tile([2.0, 1.0], (len(start), 1)), atol=0.02)
+
+
+def test_redetection_keeps_ids_and_resets_velocity():
+    tracker = MarkerTracker()
+    ids, _ = tracker.update(marker_grid(), detections_of(marker_grid()))
+    tracker.update(marker_grid((2.0, 0.0)))
+
+    frame = marker_grid((2.0, 0.0))
+    frame_ids, _ = tracker.update(frame, detections_of(frame))
+
+    np.testing.assert_array_equal(frame_ids, ids)
+    np.testing.assert_array_equal(tracker.velocities, 0)
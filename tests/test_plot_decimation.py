@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+from plot_decimation import MinMaxPyramid, DecimatedLine, plot_decimated
+
+
+class FakeLine:
+
+    def __init__(self, x, y):
+        self.set_data(x, y)
+
+    def set_data(self, x, y):
+        self.x, self.y = np.asarray(x), np.asarray(y)
+
+
+class FakeCallbacks:
+
+    def __init__(self):
+        self.callbacks = []
+
+    def connect(self, name, callback):
+        self.callbacks.append((name, callback))
+
+    def mpl_connect(self, name, callback):
+        self.connect(name, callback)
+
+    def process(self, name, *args):
+        for callback_name, callback in self.callbacks:
+            if callback_name == name:
+                callback(*args)
+
+
+class FakeAx:
+    ''' The parts of a matplotlib Axes used by DecimatedLine: plot, x limits with their callback, width in pixels. '''
+
+    def __init__(self, width=200):
+        self.bbox = type('Bbox', (), {'width': width})()
+        self.callbacks = FakeCallbacks()
+        self.figure = type('Figure', (), {'canvas': FakeCallbacks()})()
+        self.lines = []
+        self.xlim = (0.0, 1.0)
+
+    def plot(self, x, y, *args, **kwargs):
+        self.lines.append(FakeLine(x, y))
+        return self.lines[-1],
+
+    def get_xlim(self):
+        return self.xlim
+
+    def set_xlim(self, left, right):
+        self.xlim = (left, right)
+        self.callbacks.process('xlim_changed', self)
+
+    def resize(self, width):
+        self.bbox.width = width
+        self.figure.canvas.process('resize_event', None)
+
+
+def spiky_signal(count=100_003, seed=0):
+    ''' 500 Hz noise with a few single-sample spikes (what a naive every-Nth-sample decimation loses). '''
+    rng = np.random.default_rng(seed)
+    time = np.arange(count) / 500
+    values = rng.standard_normal(count)
+    values[[17, count // 2 + 1, count - 2]] = [25.0, -30.0, 40.0]
+    return time, values
+
+
+@pytest.mark.parametrize('base', [2, 4])
+def test_envelope_keeps_extrema_of_every_block(base):
+    time, values = spiky_signal(10_007)
+    pyramid = MinMaxPyramid(time, values, base)
+
+    for level, (start_time, min_time, min_value, max_time, max_value) in enumerate(pyramid.levels, start=1):
+        size = base ** level
+        assert len(start_time) == -(-len(values) // size)
+        for block in range(0, len(start_time), max(len(start_time) // 50, 1)):
+            samples = slice(block * size, (block + 1) * size)
+            assert start_time[block] == time[samples][0]
+            assert min_value[block] == values[samples].min() and max_value[block] == values[samples].max()
+            assert values[np.searchsorted(time, min_time[block])] == min_value[block]
+            assert values[np.searchsorted(time, max_time[block])] == max_value[block]
+
+    assert len(pyramid.levels[-1][0]) == 1
+    assert pyramid.levels[-1][2][0] == values.min() and pyramid.levels[-1][4][0] == values.max()
+
+
+def test_decimated_range_keeps_its_extrema():
+    time, values = spiky_signal()
+    pyramid = MinMaxPyramid(time, values)
+
+    for start, stop in [(0.0, time[-1]), (20.0, 120.0), (79.9, 80.1)]:
+        drawn_time, drawn_values = pyramid.decimate(start, stop, 100)
+        visible = (time >= start) & (time <= stop)
+
+        assert np.all(np.diff(drawn_time) >= 0)
+        assert drawn_values.max() >= values[visible].max() and drawn_values.min() <= values[visible].min()
+        if time[0] < start and stop < time[-1]:  # runs to the edges of the axis
+            assert drawn_time[0] <= start and drawn_time[-1] >= stop
+
+
+def test_points_stay_bounded_by_axis_width_when_zooming():
+    time, values = spiky_signal()
+    ax = FakeAx(width=200)
+    line = plot_decimated(ax, time, values, 'b-')
+
+    assert 0 < len(line.x) <= 2 * 200
+    for span in [100.0, 10.0, 1.0, 0.3]:
+        ax.set_xlim(50.0, 50.0 + span)
+        assert len(line.x) <= 2 * 200
+        assert line.x[0] <= 50.0 and line.x[-1] >= 50.0 + span
+
+    ax.set_xlim(50.0, 50.1)  # 50 samples: drawn raw
+    visible = slice(np.searchsorted(time, 50.0, side='right') - 1, np.searchsorted(time, 50.1, side='right') + 1)
+    np.testing.assert_array_equal(line.x, time[visible])
+    np.testing.assert_array_equal(line.y, values[visible])
+
+    ax.set_xlim(0.0, time[-1])
+    ax.resize(50)
+    assert len(line.x) <= 2 * 50 and line.y.max() == 40.0
+
+
+def test_short_signal_is_drawn_raw():
+    time, values = spiky_signal(300)
+    ax = FakeAx(width=400)
+
+    line = plot_decimated(ax, time, values)
+
+    np.testing.assert_array_equal(line.x, time)
+    np.testing.assert_array_equal(line.y, values)
+
+
+def test_empty_and_single_sample_signals():
+    ax = FakeAx()
+    empty = DecimatedLine(ax, [], [])
+    empty.update()
+    assert len(empty.line.x) == 0
+
+    single = plot_decimated(ax, [1.0], [2.0])
+    ax.set_xlim(0.0, 2.0)
+    np.testing.assert_array_equal(single.y, [2.0])
@@ -0,0 +1,104 @@
+import h5py
+import numpy as np
+import pytest
+import replay_camera
+from replay_camera import ReplayCamera
+from frame_sources import Hdf5FrameSource
+
+
+# recorded at ~25 fps with one late frame
+TIME_STAMPS = 500.0 + np.array([0.0, 0.04, 0.08, 0.20, 0.24, 0.28])
+
+
+class FakeTime:
+    ''' Stands in for the time module of replay_camera: sleep() advances monotonic() instantly. '''
+
+    def __init__(self):
+        self.now = 10.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now = self.now + seconds
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(replay_camera, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def recording(tmp_path):
+    file_name = str(tmp_path / 'recording.h5')
+    with h5py.File(file_name, 'w') as f:
+        f['images'] = np.broadcast_to(np.arange(len(TIME_STAMPS), dtype=np.uint8)[:, None, None, None],
+                                      (len(TIME_STAMPS), 4, 6, 3))  # frame k is filled with k
+        f['timestamps'] = TIME_STAMPS
+    return Hdf5FrameSource(file_name, block_size=4)
+
+
+def serve(camera, clock, count):
+    ''' (frame value, time.monotonic() offset since connect) of the next 'count' frames. '''
+    start = clock.now
+    served = []
+    for _ in range(count):
+        frame = camera.get_image()
+        served.append((int(frame[0, 0, 0]), round(clock.now - start, 9)))
+    return served
+
+
+@pytest.mark.parametrize('speed', [1.0, 2.0])
+def test_recorded_mode_follows_time_stamps(recording, fake_time, speed):
+    camera = ReplayCamera(recording, mode='recorded', speed=speed)
+    camera.connect()
+
+    served = serve(camera, fake_time, len(TIME_STAMPS))
+
+    assert [value for value, _ in served] == list(range(len(TIME_STAMPS)))
+    np.testing.assert_allclose([at for _, at in served], (TIME_STAMPS - TIME_STAMPS[0]) / speed)
+
+
+def test_fixed_mode_ignores_time_stamps(recording, fake_time):
+    camera = ReplayCamera(recording, mode='fixed', rate=10.0, first_frame=2, last_frame=5)
+    camera.connect()
+
+    assert serve(camera, fake_time, 3) == [(2, 0.0), (3, 0.1), (4, 0.2)]
+
+
+def test_fast_mode_never_sleeps(recording, fake_time):
+    camera = ReplayCamera(recording, mode='fast')
+    camera.connect()
+
+    assert serve(camera, fake_time, len(TIME_STAMPS)) == [(value, 0.0) for value in range(len(TIME_STAMPS))]
+    assert camera.num_frames == len(TIME_STAMPS)
+
+
+def test_end_of_recording(recording, fake_time):
+    camera = ReplayCamera(recording, mode='fast', first_frame=4)
+    with pytest.raises(RuntimeError):
+        camera.get_image()  # not connected yet
+
+    camera.connect()
+    assert camera.while_condition
+    serve(camera, fake_time, 2)
+
+    with pytest.raises(EOFError):
+        camera.get_image()
+    assert not camera.while_condition
+
+    camera.connect()  # reconnecting starts over
+    assert serve(camera, fake_time, 1) == [(4, 0.0)]
+
+
+def test_loop_restarts_the_timing(recording, fake_time):
+    camera = ReplayCamera(recording, mode='recorded', loop=True, first_frame=3)
+    camera.connect()
+
+    served = serve(camera, fake_time, 6)
+
+    assert [value for value, _ in served] == [3, 4, 5, 3, 4, 5]
+    np.testing.assert_allclose([at for _, at in served], [0.0, 0.04, 0.08, 0.08, 0.12, 0.16])
+    assert camera.while_condition
@@ -0,0 +1,94 @@
+import threading
+import numpy as np
+from ring_buffer import RingBuffer
+
+
+def drain(ring):
+    ''' (values, time_stamps) of every pending sample, oldest first. '''
+    values, time_stamps = [], []
+    while ring.depth > 0:
+        sample, time_stamp = ring.get(timeout=0)
+        values.append(int(sample[0]))
+        time_stamps.append(time_stamp)
+    return values, time_stamps
+
+
+def test_wraparound_keeps_fifo_order():
+    ring = RingBuffer(4, (1,), np.int64)
+
+    for round_start in range(0, 30, 3):  # head and tail wrap several times
+        for value in range(round_start, round_start + 3):
+            ring.put([value], value / 10)
+        values, time_stamps = drain(ring)
+        assert values == list(range(round_start, round_start + 3))
+        np.testing.assert_allclose(time_stamps, np.array(values) / 10)
+
+    assert ring.stats() == {'put': 30, 'get': 30, 'dropped': 0, 'depth': 0, 'max_depth': 3}
+
+
+def test_full_buffer_overwrites_oldest():
+    ring = RingBuffer(4, (1,), np.int64)
+
+    for value in range(7):
+        ring.put([value], float(value))
+
+    assert ring.dropped == 3 and ring.depth == 4 and ring.max_depth == 4
+    assert drain(ring) == ([3, 4, 5, 6], [3.0, 4.0, 5.0, 6.0])
+    assert ring.get(timeout=0) == (None, None)
+
+
+def test_put_chunk_larger_than_capacity():
+    ring = RingBuffer(4, (1,), np.int64)
+    ring.put([100], 100.0)
+    ring.get(timeout=0)
+    ring.put([101], 101.0)
+
+    ring.put_chunk(np.arange(10).reshape(-1, 1), np.arange(10.0))
+
+    assert ring.num_put == 12 and ring.dropped == 7 and ring.depth == 4
+    assert drain(ring) == ([6, 7, 8, 9], [6.0, 7.0, 8.0, 9.0])
+
+
+def test_put_chunk_matches_single_puts():
+    chunked, single = RingBuffer(5, (2,)), RingBuffer(5, (2,))
+    samples = np.arange(22, dtype=np.uint8).reshape(11, 2)
+
+    for start, stop in [(0, 3), (3, 4), (4, 11)]:
+        chunked.put_chunk(samples[start:stop], np.arange(start, stop, dtype=float))
+    for i, sample in enumerate(samples):
+        single.put(sample, float(i))
+
+    np.testing.assert_array_equal(chunked.samples, single.samples)
+    np.testing.assert_array_equal(chunked.time_stamps, single.time_stamps)
+    assert chunked.stats() == single.stats()
+
+
+def test_latest_and_recent_slots():
+    ring = RingBuffer(4, (1,), np.int64)
+    assert ring.latest() == (None, None)
+    assert len(ring.recent_slots()) == 0
+
+    for value in range(2):
+        ring.put([value], float(value))
+    np.testing.assert_array_equal(ring.samples[ring.recent_slots()][:, 0], [0, 1])
+
+    for value in range(2, 6):
+        ring.put([value], float(value))
+    ring.get(timeout=0)  # consuming does not change latest/recent
+
+    sample, time_stamp = ring.latest()
+    assert sample[0] == 5 and time_stamp == 5.0
+    np.testing.assert_array_equal(ring.samples[ring.recent_slots()][:, 0], [2, 3, 4, 5])
+    np.testing.assert_array_equal(ring.time_stamps[ring.recent_slots(2)], [4.0, 5.0])
+    samples, time_stamps = ring.recent(10)
+    np.testing.assert_array_equal(samples[:, 0], [2, 3, 4, 5])
+
+
+def test_get_waits_for_producer():
+    ring = RingBuffer(2, (1,), np.int64)
+    threading.Timer(0.05, ring.put, args=([7], 1.5)).start()
+
+    sample, time_stamp = ring.get(timeout=5)
+
+    assert sample[0] == 7 and time_stamp == 1.5
+    assert ring.wait_for_put(0, timeout=0) and not ring.wait_for_put(1, timeout=0)
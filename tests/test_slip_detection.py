@@ -0,0 +1,94 @@
+import cv2
+import numpy as np
+import pytest
+from slip_detection import SlipDetector, SLIP_NONE, SLIP_START, SLIP_END
+
+
+def gel_frame(shift=0, height=120, width=160):
+    ''' BGR frame of a smooth random texture (the gel with its markers), slid 'shift' pixels to the right. '''
+    rng = np.random.default_rng(0)
+    texture = cv2.GaussianBlur(rng.uniform(0, 255, (height, width + 64)), (0, 0), 1.5)
+    texture = cv2.normalize(texture, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    gray = texture[:, 32 - shift:32 - shift + width]
+    return np.ascontiguousarray(np.stack([gray, gray // 2, 255 - gray], axis=2))
+
+
+def run(detector, shifts, rois=None):
+    return [detector.update(gel_frame(shift), None if rois is None else rois[i]) for i, shift in enumerate(shifts)]
+
+
+def test_static_frames_do_not_slip():
+    scores = [score for score, _ in run(SlipDetector(slip_score=100), [0] * 5)]
+    assert scores == [0] * 5
+
+
+def test_debounce_and_release():
+    detector = SlipDetector(slip_score=100, debounce_frames=2, release_frames=3)
+    shifts = [0, 0, 2, 4, 6, 8, 8, 8, 8, 8]  # slides for 4 frames, then holds still
+
+    events = [event for _, event in run(detector, shifts)]
+
+    assert events == [SLIP_NONE] * 3 + [SLIP_START] + [SLIP_NONE] * 4 + [SLIP_END, SLIP_NONE]
+    assert not detector.slipping
+
+
+def test_single_slipping_frame_is_debounced():
+    detector = SlipDetector(slip_score=100, debounce_frames=2)
+    results = run(detector, [0, 3, 3, 3])
+
+    assert results[1][0] >= 100
+    assert all(event == SLIP_NONE for _, event in results) and not detector.slipping
+
+
+def test_bgr_frames_use_bgr_weights():
+    frames = [gel_frame(0), gel_frame(3)]
+    color, gray = SlipDetector(), SlipDetector()
+
+    for frame in frames:
+        color_score, _ = color.update(frame)
+        gray_score, _ = gray.update(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+    assert color_score == gray_score > 0
+    np.testing.assert_array_equal(color.gray, cv2.cvtColor(frames[1], cv2.COLOR_BGR2GRAY))
+
+
+def changed_patch(frame, rows=slice(10, 30), columns=slice(10, 40)):
+    ''' Copy of 'frame' with a patch inverted (a local change, e.g. a marker pulled away), by default 20x30 px top left. '''
+    changed = frame.copy()
+    changed[rows, columns] = 255 - changed[rows, columns]
+    return changed
+
+
+@pytest.mark.parametrize('levels', [1, 2])
+def test_pyramid_score_is_in_full_resolution_pixels(levels):
+    still = gel_frame(0)
+    full, reduced = SlipDetector(), SlipDetector(pyramid_levels=levels)
+
+    for detector in (full, reduced):
+        detector.update(still)
+    changed = changed_patch(still, slice(16, 64), slice(32, 96))  # 48x64 px
+    full_score, _ = full.update(changed)
+    reduced_score, _ = reduced.update(changed)
+
+    assert reduced.gray.shape == (120 >> levels, 160 >> levels)
+    assert reduced_score % (4 ** levels) == 0
+    assert reduced_score == pytest.approx(full_score, rel=0.25)
+    assert full_score == pytest.approx(48 * 64, rel=0.1)
+
+
+@pytest.mark.parametrize('levels', [0, 1])
+def test_roi_ignores_changes_outside(levels):
+    still = gel_frame(0)
+    changed = changed_patch(still)  # top left corner only
+
+    detector = SlipDetector(pyramid_levels=levels)
+    detector.update(still, roi=(80, 60, 64, 48))
+    outside_score, _ = detector.update(changed, roi=(80, 60, 64, 48))
+
+    detector.reset()
+    detector.update(still, roi=(0, 0, 64, 48))
+    inside_score, _ = detector.update(changed, roi=(0, 0, 64, 48))
+
+    assert outside_score == 0
+    assert inside_score == pytest.approx(20 * 30, rel=0.3)
+    assert np.count_nonzero(detector.diff) == inside_score >> (2 * levels)
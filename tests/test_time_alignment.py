@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from time_alignment import sorted_stream, nearest_index, crop_indices, sample_indices, resample, common_timebase, \
+    align_streams
+
+
+TIME_STAMPS = np.array([0.0, 1.0, 2.0, 4.0])
+VALUES = 10 * TIME_STAMPS
+TIMEBASE = np.array([-0.5, 0.0, 0.4, 0.6, 1.5, 3.0, 3.9, 4.0, 5.0])
+nan = np.nan
+
+
+@pytest.mark.parametrize('interpolation, expected', [
+    ('nearest', [nan, 0, 0, 10, 10, 20, 40, 40, nan]),  # ties go to the earlier sample
+    ('linear', [nan, 0, 4, 6, 15, 30, 39, 40, nan]),
+    ('zoh', [nan, 0, 0, 0, 10, 20, 20, 40, nan]),
+])
+def test_resample_hand_computed(interpolation, expected):
+    np.testing.assert_array_equal(resample(TIME_STAMPS, VALUES, TIMEBASE, interpolation), expected)
+
+    channels = resample(TIME_STAMPS, np.column_stack((VALUES, -VALUES)), TIMEBASE, interpolation)
+    np.testing.assert_array_equal(channels, np.column_stack((expected, -np.array(expected))))
+
+
+def test_sample_indices_hand_computed():
+    np.testing.assert_array_equal(sample_indices(TIME_STAMPS, TIMEBASE, 'nearest'), [-1, 0, 0, 1, 1, 2, 3, 3, -1])
+    np.testing.assert_array_equal(sample_indices(TIME_STAMPS, TIMEBASE, 'zoh'), [-1, 0, 0, 0, 1, 2, 2, 3, -1])
+    with pytest.raises(ValueError):
+        sample_indices(TIME_STAMPS, TIMEBASE, 'linear')
+
+
+@pytest.mark.parametrize('interpolation, expected', [
+    ('linear', [5, nan, nan, 55]),  # 2 -> 5 s samples are 3 s apart
+    ('nearest', [0, 20, nan, 50]),  # 3.5 s is 1.5 s from its nearest sample
+    ('zoh', [0, 20, nan, 50]),
+])
+def test_max_gap_masking(interpolation, expected):
+    time_stamps = np.array([0.0, 1.0, 2.0, 5.0, 6.0])
+
+    resampled = resample(time_stamps, 10 * time_stamps, [0.5, 3.0, 3.5, 5.5], interpolation, max_gap=1.0)
+
+    np.testing.assert_array_equal(resampled, expected)
+
+
+def test_common_timebase():
+    a = np.arange(5.0)
+    b = a + 0.5
+
+    np.testing.assert_allclose(common_timebase([a, b], rate=2), np.arange(0.5, 4.01, 0.5))
+    np.testing.assert_array_equal(common_timebase([a, b]), [1, 2, 3, 4])
+    np.testing.assert_array_equal(common_timebase([a, b], reference=1), [0.5, 1.5, 2.5, 3.5])
+    assert len(common_timebase([a, a + 10])) == 0
+    assert len(common_timebase([a, np.zeros(0)])) == 0
+
+
+def test_unsorted_input_is_sorted_first():
+    time_stamps = np.array([2.0, 0.0, 3.0, 1.0])
+    values = 10 * time_stamps
+
+    sorted_time_stamps, sorted_values = sorted_stream(time_stamps, values)
+    np.testing.assert_array_equal(sorted_time_stamps, [0, 1, 2, 3])
+    np.testing.assert_array_equal(sorted_values, [0, 10, 20, 30])
+    assert sorted_stream(sorted_time_stamps, sorted_values)[1] is sorted_values  # no copy when already sorted
+
+    timebase, aligned = align_streams({'a': (time_stamps, values), 'b': (np.array([0.5, 2.5]), np.array([1.0, 2.0]))},
+                                      reference='a', interpolations={'b': 'zoh'})
+    np.testing.assert_array_equal(timebase, [1, 2])
+    np.testing.assert_array_equal(aligned['a'], [10, 20])
+    np.testing.assert_array_equal(aligned['b'], [1, 1])
+
+
+def test_empty_stream():
+    with pytest.raises(ValueError):
+        nearest_index([], [1.0])
+    with pytest.raises(ValueError):
+        crop_indices([], 0.0, 1.0)
+
+    np.testing.assert_array_equal(sample_indices([], [0.0, 1.0]), [-1, -1])
+    assert np.all(np.isnan(resample([], [], [0.0, 1.0])))
+
+    timebase, aligned = align_streams({'a': (TIME_STAMPS, VALUES), 'b': (np.zeros(0), np.zeros(0))})
+    assert len(timebase) == 0 and len(aligned['a']) == len(aligned['b']) == 0
+
+
+def test_crop_indices():
+    assert crop_indices(np.arange(0, 10, 0.5), 1.2, 3.8) == (2, 8)
+    assert nearest_index([5.0], [0.0, 9.0]).tolist() == [0, 0]
@@ -0,0 +1,53 @@
+import cv2
+import h5py
+import numpy as np
+import pytest
+from frame_sources import Hdf5FrameSource
+from velocity_estimation import calc_vel_of_obj, estimate_velocity_chunk, estimate_velocity_batch
+
+
+def write_recording(file_name, num_frames=40, height=240, width=320):
+    '''
+    hdf5 recording brightening over the first 14 frames (lighting drift); from frame 10 a darker contact patch drags the markers under it
+    to the right while the others stay put.
+    '''
+    images = np.empty((num_frames, height, width, 3), dtype=np.uint8)
+    for k in range(num_frames):
+        frame = np.full((height, width, 3), 170 + min(k, 14), dtype=np.uint8)
+        slip = max(k - 10, 0)
+        if k >= 10:
+            cv2.circle(frame, (150 + slip, 120), 50, (140, 140, 140), -1)
+        for y in range(20, height, 30):
+            for x in range(20, width, 30):
+                in_contact = k >= 10 and (x - 150) ** 2 + (y - 120) ** 2 < 40 ** 2
+                cv2.circle(frame, (x + slip if in_contact else x, y), 9, (40, 50, 60), -1)
+        images[k] = frame
+
+    with h5py.File(file_name, 'w') as f:
+        f['images'] = images
+        f['timestamps'] = 100 + 0.04 * np.arange(num_frames)
+
+
+def test_calc_vel_of_obj_matches_every_marker():
+    match = calc_vel_of_obj([[0, 0], [10, 0]], [[1, 0], [10, 2]], dt=0.5, pixels_in_one_meter=1)
+
+    np.testing.assert_array_equal(match.matched_indices, [0, 1])
+    np.testing.assert_allclose(match.displacements, [[-1, 0], [0, -2]])
+    np.testing.assert_allclose(match.speeds, [2, 4])
+    assert match.mean_speed == 3 and match.median_speed == 3
+    assert calc_vel_of_obj([[0, 0]], [], dt=0.5).mean_speed == np.inf
+
+
+@pytest.mark.parametrize('use_roi', [False, True])
+@pytest.mark.parametrize('chunk_size', [3, 7, 64])
+def test_chunked_velocities_equal_serial(tmp_path, use_roi, chunk_size):
+    file_name = str(tmp_path / 'recording.h5')
+    write_recording(file_name)
+    frame_source = Hdf5FrameSource(file_name)
+
+    serial = estimate_velocity_chunk(frame_source, 0, len(frame_source), overlap=0, use_roi=use_roi)
+    chunked = estimate_velocity_batch(frame_source, 0, len(frame_source), workers=2, chunk_size=chunk_size,
+                                      use_roi=use_roi)
+
+    assert serial.shape == (len(frame_source), 2)
+    np.testing.assert_array_equal(chunked, serial)
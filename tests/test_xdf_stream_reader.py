@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from os.path import exists
+from xdf_stream_reader import XdfStreamReader
+from xdf_files import write_xdf
+
+
+def recording_streams():
+    rng = np.random.default_rng(0)
+    wrench_time = 100 + np.arange(95) / 500
+    fabric_time = 100 + np.arange(23) / 100
+    return [
+        {'name': 'ur5e_wrench', 'channel_format': 'double64', 'nominal_srate': 500,
+         'time_stamps': wrench_time, 'samples': rng.standard_normal((95, 6))},
+        {'name': 'Sensor_mV', 'channel_format': 'string', 'nominal_srate': 100,
+         'time_stamps': fabric_time, 'samples': [[f'[{v:.3f}]'] for v in rng.standard_normal(23)]},
+        {'name': 'ur5e_joint_states', 'channel_format': 'float32', 'nominal_srate': 125, 'with_time_stamps': False,
+         'time_stamps': 100 + np.arange(37) / 125, 'samples': rng.standard_normal((37, 18)).astype(np.float32)},
+    ]
+
+
+def read_streams(reader, stream_names=None):
+    ''' {stream_name: (time_stamps, samples)} of the chunks iter_chunks yields. '''
+    blocks = {}
+    for stream_name, time_stamps, samples in reader.iter_chunks(stream_names):
+        blocks.setdefault(stream_name, []).append((time_stamps, samples))
+
+    return {name: (np.concatenate([time_stamps for time_stamps, _ in stream_blocks]),
+                   [list(sample) for _, samples in stream_blocks for sample in samples])
+            for name, stream_blocks in blocks.items()}
+
+
+@pytest.fixture
+def xdf_file(tmp_path):
+    file_name = str(tmp_path / 'recording.xdf')
+    write_xdf(file_name, recording_streams(), samples_per_chunk=10)
+    return file_name
+
+
+def test_reader_matches_written_streams(xdf_file):
+    streams = read_streams(XdfStreamReader(xdf_file))
+
+    for stream in recording_streams():
+        time_stamps, samples = streams[stream['name']]
+        np.testing.assert_allclose(time_stamps, stream['time_stamps'], rtol=0, atol=1e-9)
+        if stream['channel_format'] == 'string':
+            assert samples == stream['samples']
+        else:
+            np.testing.assert_array_equal(np.array(samples), stream['samples'])
+
+
+def test_reader_matches_pyxdf(xdf_file):
+    pyxdf = pytest.importorskip('pyxdf')
+    expected, _ = pyxdf.load_xdf(xdf_file, synchronize_clocks=False, dejitter_timestamps=False,
+                                 handle_clock_resets=False)
+    streams = read_streams(XdfStreamReader(xdf_file))
+
+    assert len(expected) == len(streams) == 3
+    for stream in expected:
+        time_stamps, samples = streams[stream['info']['name'][0]]
+        np.testing.assert_allclose(time_stamps, stream['time_stamps'], rtol=0, atol=1e-9)
+        if stream['info']['channel_format'][0] == 'string':
+            assert samples == [list(sample) for sample in stream['time_series']]
+        else:
+            np.testing.assert_array_equal(np.array(samples), stream['time_series'])
+
+
+@pytest.mark.parametrize('use_index', [False, True])
+def test_selective_loading(xdf_file, use_index):
+    all_streams = read_streams(XdfStreamReader(xdf_file))
+
+    reader = XdfStreamReader(xdf_file)
+    if use_index:
+        reader.load_index()
+        assert exists(xdf_file + '.index.json')
+
+    selected = read_streams(reader, ['Sensor_mV', 'ur5e_joint_states'])
+
+    assert set(selected) == {'Sensor_mV', 'ur5e_joint_states'}
+    for name, (time_stamps, samples) in selected.items():
+        np.testing.assert_array_equal(time_stamps, all_streams[name][0])
+        assert samples == all_streams[name][1]
+
+
+def test_saved_index_is_reused(xdf_file):
+    first = XdfStreamReader(xdf_file)
+    first.load_index()
+
+    reader = XdfStreamReader(xdf_file)
+    reader.load_index()
+    assert reader.index == first.index
+    assert sorted(reader.stream_names()) == ['Sensor_mV', 'ur5e_joint_states', 'ur5e_wrench']
+
+    time_stamps, samples = read_streams(reader, ['ur5e_wrench'])['ur5e_wrench']
+    np.testing.assert_array_equal(np.array(samples), recording_streams()[0]['samples'])
+
+
+def test_stream_sample_count(xdf_file):
+    reader = XdfStreamReader(xdf_file)
+
+    assert {stream['name']: reader.stream_sample_count(stream['name']) for stream in recording_streams()} == \
+        {'ur5e_wrench': 95, 'Sensor_mV': 23, 'ur5e_joint_states': 37}
@@ -0,0 +1,74 @@
+import struct
+import numpy as np
+
+BOUNDARY_UUID = bytes.fromhex('43a5466bfa4b5ca4e3e6a2a0c87e5c2d')
+
+
+def chunk(tag, content, stream_id=None):
+    ''' One xdf chunk with an 8-byte length. '''
+    body = struct.pack('<H', tag) + (b'' if stream_id is None else struct.pack('<I', stream_id)) + content
+    return bytes([8]) + struct.pack('<Q', len(body)) + body
+
+
+def stream_header(name, channel_count, channel_format, nominal_srate, desc=''):
+    return (f"<?xml version='1.0'?><info><name>{name}</name><type>test</type>"
+            f"<channel_count>{channel_count}</channel_count><channel_format>{channel_format}</channel_format>"
+            f"<nominal_srate>{nominal_srate}</nominal_srate><desc>{desc}</desc></info>").encode()
+
+
+def samples_content(time_stamps, samples, channel_format, with_time_stamps):
+    ''' Content of a samples chunk; samples of a 'string' stream are lists of str, otherwise numeric rows. '''
+    content = bytes([4]) + struct.pack('<I', len(time_stamps))
+    for k, (time_stamp, sample) in enumerate(zip(time_stamps, samples)):
+        # the first sample of a chunk always carries its time stamp, the others only when 'with_time_stamps'.
+        content += bytes([8]) + struct.pack('<d', time_stamp) if with_time_stamps or k == 0 else bytes([0])
+        if channel_format == 'string':
+            for value in sample:
+                value = value.encode()
+                content += bytes([1, len(value)]) + value
+        else:
+            content += np.asarray(sample, dtype=FORMATS[channel_format]).tobytes()
+    return content
+
+
+FORMATS = {'double64': '<f8', 'float32': '<f4', 'int64': '<i8', 'int32': '<i4', 'int16': '<i2', 'int8': 'i1'}
+
+
+def write_xdf(file_name, streams, samples_per_chunk=10):
+    '''
+    Write a small xdf file. 'streams' is a list of dicts with 'name', 'channel_format', 'nominal_srate',
+    'time_stamps', 'samples' and optionally 'desc' (xml), 'clock_offsets' ([(collection_time, offset_value)]) and
+    'with_time_stamps' (False: only the first sample of each chunk has a time stamp, the file must then use the
+    nominal rate). Samples chunks of the streams are interleaved, as LabRecorder does.
+    '''
+    out = b'XDF:' + chunk(1, b"<?xml version='1.0'?><info><version>1.0</version></info>")
+
+    for stream_id, stream in enumerate(streams, 1):
+        channel_count = len(stream['samples'][0])
+        out += chunk(2, stream_header(stream['name'], channel_count, stream['channel_format'],
+                                      stream['nominal_srate'], stream.get('desc', '')), stream_id)
+
+    num_chunks = max(int(np.ceil(len(stream['time_stamps']) / samples_per_chunk)) for stream in streams)
+    for k in range(num_chunks):
+        for stream_id, stream in enumerate(streams, 1):
+            block = slice(k * samples_per_chunk, (k + 1) * samples_per_chunk)
+            if len(stream['time_stamps'][block]):
+                out += chunk(3, samples_content(stream['time_stamps'][block], stream['samples'][block],
+                                                stream['channel_format'], stream.get('with_time_stamps', True)),
+                             stream_id)
+
+            clock_offsets = stream.get('clock_offsets', [])
+            if k < len(clock_offsets):
+                out += chunk(4, struct.pack('<dd', *clock_offsets[k]), stream_id)
+
+        if k == num_chunks // 2:
+            out += chunk(5, BOUNDARY_UUID)
+
+    for stream_id, stream in enumerate(streams, 1):
+        footer = (f"<?xml version='1.0'?><info><first_timestamp>{stream['time_stamps'][0]}</first_timestamp>"
+                  f"<last_timestamp>{stream['time_stamps'][-1]}</last_timestamp>"
+                  f"<sample_count>{len(stream['time_stamps'])}</sample_count></info>").encode()
+        out += chunk(6, footer, stream_id)
+
+    with open(file_name, 'wb') as f:
+        f.write(out)